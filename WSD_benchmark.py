@@ -0,0 +1,821 @@
+##############################################################################
+# Problem
+# Description       :  The bundled Senseval corpora have a few thousand
+#                      instances only, which is not enough to see how the
+#                      WSD program scales. This program generates synthetic
+#                      corpora in Senseval format with any number of
+#                      instances and benchmarks the parse -> features ->
+#                      model -> score -> evaluate path of WSD_naive_bayes.py
+#                      on them.
+#
+# Usage             : This program has two sub commands:
+#
+#                     1) generate = writes a synthetic training file, test
+#                                   file and gold std. key file. e.g.
+#
+# python WSD_benchmark.py generate --prefix synth --instances 100000
+#                                  --senses 4 --vocab 20000 --context-length 30
+#
+#                        writes synth_train.xml, synth.xml and synth.key.
+#
+#                     2) scale = generates corpora of each of the given sizes
+#                                and runs every stage of the WSD path on
+#                                them, measuring the time and memory taken
+#                                by each stage. e.g.
+#
+# python WSD_benchmark.py scale --sizes 1000 10000 100000
+#
+#                        The results are written into
+#                        benchmark_scaling.csv (and benchmark_scaling.png if
+#                        matplotlib is installed). The growth exponent of
+#                        each stage (slope of log time against log size) is
+#                        printed and stages growing worse than linear are
+#                        flagged.
+#
+#                     Every size is run in a fresh child process, so the
+#                     memory of a stage is the increase of peak resident
+#                     memory of that process during the stage.
+#
+#                     The "score_scan" stage scores the test file with
+#                     get_coll_feature_prob, which scans all training
+#                     contexts of a sense for every instance. As it grows
+#                     quadratically it is run only up to --max-scan-size.
+#
+#                     3) engines = compares the classifiers of 
+#                                  WSD_naive_bayes.py on the bundled 
+#                                  corpora: the scan of all training 
+#                                  contexts (get_coll_feature_prob), naive
+#                                  Bayes with count tables, the k-NN 
+#                                  classifier with its inverted index and
+#                                  the compiled decision list. The
+#                                  accuracy and the mean and p95 latency 
+#                                  of classifying an instance (features 
+#                                  already extracted) are printed and 
+#                                  written into benchmark_engines.csv. e.g.
+#
+# python WSD_benchmark.py engines --knn 5
+#
+#                        The senses given by each engine are written into
+#                        benchmark_engines_<corpus>.<engine>.op and scored
+#                        against the key file like the op_file of 
+#                        WSD_naive_bayes.py (see evaluate_tagging), which
+#                        also writes their confusion matrices.
+#
+#                     This program needs MontyLingua (see
+#                     WSD_naive_bayes.py) as the features are extracted
+#                     with it.
+###############################################################################
+
+#!/usr/bin/python
+
+'''
+import statements to include Python's in-built module functionalities in the
+program
+'''
+# sys and os modules are used for command line and file handling
+import sys
+import os
+
+# random and bisect modules are used to draw words of synthetic contexts
+import random
+import bisect
+
+# time and resource modules are used to measure time and memory of stages
+import time
+import resource
+
+# math module for logarithmic functionalities
+import math
+
+# csv module is used to write the results
+import csv
+
+# argparse module is used to parse the command line arguments
+import argparse
+
+# multiprocessing module is used to run every size in a fresh process
+import multiprocessing
+
+# the WSD program being benchmarked, and the bundled corpora found by its
+# load test
+import WSD_naive_bayes
+import WSD_load_test
+
+
+'''
+Names of benchmark stages in the order they are run
+'''
+STAGE_LIST = ['parse', 'features', 'model', 'score', 'score_scan', \
+              'evaluate']
+
+'''
+Number of words on each side of the ambiguous word which are drawn from the
+collocates of its sense in synthetic contexts
+'''
+COLLOCATE_DISTANCE = 3
+
+'''
+Classifiers compared by the engines sub command (see run_engine_benchmark)
+'''
+ENGINE_LIST = ['scan', 'bayes', 'knn', 'decision']
+
+###############################################################################
+# Function      : generate_corpus(file_prefix, instance_count, sense_count,
+#                                 vocab_size, context_length, test_fraction,
+#                                 seed)
+# Description   : This function writes a synthetic Senseval format training
+#                 file (<prefix>_train.xml), test file (<prefix>.xml) and
+#                 gold std. key file (<prefix>.key) for an ambiguous word
+#                 "synth". Senses follow a skewed distribution and every
+#                 sense has its own collocates, which are likely to appear
+#                 near the ambiguous word. Other context words are drawn
+#                 from a Zipf distribution over the vocabulary.
+# Arguments     : file_prefix - prefix of names of files written
+#                 instance_count - number of training instances
+#                 sense_count - number of senses of the ambiguous word
+#                 vocab_size - number of distinct context words
+#                 context_length - number of words in each context
+#                 test_fraction - number of test instances as a fraction of
+#                                 training instances
+#                 seed - seed of random number generator
+# Returns       : None.
+###############################################################################
+
+def generate_corpus(file_prefix, instance_count, sense_count, vocab_size, \
+                    context_length, test_fraction, seed):
+
+    random_obj = random.Random(seed)
+    lexelt = "synth-n"
+
+    # cumulative Zipf weights of vocabulary words
+    word_cum_weight_list = []
+    total_weight = 0.0
+    for rank in range(0, vocab_size):
+        total_weight = total_weight + 1.0 / (rank + 1)
+        word_cum_weight_list.append(total_weight)
+
+    # cumulative skewed weights of senses
+    sense_cum_weight_list = []
+    total_sense_weight = 0.0
+    for rank in range(0, sense_count):
+        total_sense_weight = total_sense_weight + 1.0 / (rank + 1)
+        sense_cum_weight_list.append(total_sense_weight)
+
+    sense_list = ["SYNTH" + str(i + 1) for i in range(0, sense_count)]
+
+    collocates_list = []
+    for sense in sense_list:
+        collocates_list.append(["w" + str(random_obj.randrange(vocab_size)) \
+                                for i in range(0, 20)])
+
+    train_file_handle = open(file_prefix + "_train.xml", 'w')
+    test_file_handle = open(file_prefix + ".xml", 'w')
+    key_file_handle = open(file_prefix + ".key", 'w')
+
+    for file_handle in (train_file_handle, test_file_handle):
+        file_handle.write('<corpus lang="en">\n')
+        file_handle.write('<lexelt item="' + lexelt + '">\n')
+
+    test_count = int(instance_count * test_fraction)
+
+    for instance_no in range(0, instance_count + test_count):
+
+        sense_no = bisect.bisect_left(sense_cum_weight_list, \
+                                      random_obj.random() * total_sense_weight)
+        head_pos = random_obj.randrange(context_length)
+
+        word_list = []
+        for word_pos in range(0, context_length):
+            if abs(word_pos - head_pos) <= COLLOCATE_DISTANCE and \
+               random_obj.random() < 0.5:
+                word_list.append(random_obj.choice(collocates_list[sense_no]))
+            else:
+                word_list.append("w" + str(bisect.bisect_left(\
+                                 word_cum_weight_list, \
+                                 random_obj.random() * total_weight)))
+
+        word_list[head_pos] = "<head>synth</head>"
+
+        instance_id = lexelt + "." + str(instance_no) + ":"
+
+        if instance_no < instance_count:
+            file_handle = train_file_handle
+        else:
+            file_handle = test_file_handle
+            key_file_handle.write(lexelt + " " + instance_id + " " + \
+                                  sense_list[sense_no] + "\n")
+
+        file_handle.write('<instance id="' + instance_id + '">\n')
+        if instance_no < instance_count:
+            file_handle.write('<answer instance="' + instance_id + \
+                              '" senseid="' + sense_list[sense_no] + '"/>\n')
+        file_handle.write('<context>\n <s> ' + " ".join(word_list) + \
+                          ' . </s> \n</context>\n</instance>\n')
+
+    for file_handle in (train_file_handle, test_file_handle):
+        file_handle.write('</lexelt>\n</corpus>\n')
+        file_handle.close()
+
+    key_file_handle.close()
+
+###############################################################################
+# End of generate_corpus function
+###############################################################################
+
+###############################################################################
+# Function      : get_training_lists(instance_table)
+# Description   : This function gives the senses and contexts of the 
+#                 training instances kept in an instance table. Instances
+#                 without <answer> tag can not be learnt from and are 
+#                 skipped, as in train_WSD_models.
+# Arguments     : instance_table - a dict object holding the columns of 
+#                                  instances (see read_WSD_instances)
+# Returns       : 1) The word to be tagged (lexelt item of the instances)
+#                 2) A list containing the sense of each instance
+#                 3) A list containing the context sentence of each 
+#                    instance
+###############################################################################
+
+def get_training_lists(instance_table):
+
+    ambiguous_word = None
+    sense_id_list = []
+    context_sent_list = []
+
+    for instance in WSD_naive_bayes.iter_WSD_instance_table(instance_table):
+        if instance.sense_id is None:
+            continue
+        ambiguous_word = instance.lexelt
+        sense_id_list.append(instance.sense_id)
+        context_sent_list.append(instance.context_sent)
+
+    return ambiguous_word, sense_id_list, context_sent_list
+
+###############################################################################
+# End of get_training_lists function
+###############################################################################
+
+###############################################################################
+# Function      : run_scaling_stages(file_prefix, window_size, scan_flag,
+#                                    result_queue)
+# Description   : This function runs every stage of the WSD path on one
+#                 corpus and puts the time (in seconds) and memory (increase
+#                 of peak resident memory in MB) of each stage into the
+#                 result queue. It is run in a child process.
+# Arguments     : file_prefix - prefix of names of corpus files
+#                 window_size - window size of collocational features
+#                 scan_flag - whether to run the score_scan stage
+#                 result_queue - multiprocessing queue to put results into
+# Returns       : None.
+###############################################################################
+
+def run_scaling_stages(file_prefix, window_size, scan_flag, result_queue):
+
+    # evaluate_tagging writes its confusion matrix into current directory
+    os.chdir(os.path.dirname(os.path.abspath(file_prefix)))
+
+    stage_result_dict = {}
+    stage_state = {}
+
+    def run_stage(stage, stage_function):
+        peak_memory = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        start_time = time.time()
+        stage_function()
+        stage_result_dict[stage] = (time.time() - start_time, \
+            (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - \
+             peak_memory) / 1024.0)
+
+    def parse_stage():
+        stage_state['train_table'] = WSD_naive_bayes.read_WSD_instances(\
+                                            file_prefix + "_train.xml")
+        stage_state['test_table'] = WSD_naive_bayes.read_WSD_instances(\
+                                            file_prefix + ".xml")
+
+    def features_stage():
+        stage_state['train_data'] = get_training_lists(\
+                                            stage_state['train_table'])
+        ambiguous_word, sense_id_list, context_sent_list = \
+                                            stage_state['train_data']
+
+        sense_context_words_mapping_dict, sense_pos_tags_mapping_dict = \
+            WSD_naive_bayes.get_coll_features(sense_id_list, \
+                                              context_sent_list, window_size)
+        stage_state['sense_context_words_mapping_dict'] = \
+                                            sense_context_words_mapping_dict
+        stage_state['sense_pos_tags_mapping_dict'] = \
+                                            sense_pos_tags_mapping_dict
+
+        stage_state['test_context_sent_list'] = [instance.context_sent \
+            for instance in WSD_naive_bayes.iter_WSD_instance_table(\
+                                            stage_state['test_table'])]
+
+        query_obj = WSD_naive_bayes.get_tagger()
+        stage_state['feature_vector_list'] = \
+            [WSD_naive_bayes.get_coll_feature_vector(context_sent, \
+                                                     window_size, query_obj) \
+             for context_sent in stage_state['test_context_sent_list']]
+
+    def model_stage():
+        ambiguous_word, sense_id_list, context_sent_list = \
+                                            stage_state['train_data']
+
+        stage_state['model'] = WSD_naive_bayes.get_WSD_model(ambiguous_word,\
+                    sense_id_list, context_sent_list, \
+                    stage_state['sense_context_words_mapping_dict'], \
+                    window_size)
+
+    def score_stage():
+        model = stage_state['model']
+
+        op_file_handle = open(file_prefix + ".op", 'w')
+        for instance, (lemma_list, pos_tags_list) in \
+            zip(WSD_naive_bayes.iter_WSD_instance_table(\
+                                            stage_state['test_table']), \
+                stage_state['feature_vector_list']):
+            op_file_handle.write(instance.lexelt + " " + \
+                instance.instance_id + " " + \
+                WSD_naive_bayes.get_max_prob_sense(lemma_list, \
+                                                   pos_tags_list, model) + \
+                "\n")
+        op_file_handle.close()
+
+    def score_scan_stage():
+        for lemma_list, pos_tags_list in stage_state['feature_vector_list']:
+            WSD_naive_bayes.get_coll_feature_prob(lemma_list, \
+                    pos_tags_list, \
+                    stage_state['sense_context_words_mapping_dict'], \
+                    stage_state['sense_pos_tags_mapping_dict'], \
+                    stage_state['model']['sense_list'])
+
+    def evaluate_stage():
+        WSD_naive_bayes.evaluate_tagging(file_prefix + ".op", \
+                                         file_prefix + ".key")
+
+    run_stage('parse', parse_stage)
+    run_stage('features', features_stage)
+    run_stage('model', model_stage)
+    run_stage('score', score_stage)
+    if scan_flag:
+        run_stage('score_scan', score_scan_stage)
+    run_stage('evaluate', evaluate_stage)
+
+    result_queue.put(stage_result_dict)
+
+###############################################################################
+# End of run_scaling_stages function
+###############################################################################
+
+###############################################################################
+# Function      : get_growth_exponent(size_list, value_list)
+# Description   : This function fits value = c * size ^ k by least squares
+#                 in log space and gives k. k close to 1 means linear
+#                 growth, k close to 2 means quadratic growth.
+# Arguments     : size_list - list of corpus sizes
+#                 value_list - list of measured values for these sizes
+# Returns       : 1) The growth exponent k, or None if there are less than
+#                    two positive values
+###############################################################################
+
+def get_growth_exponent(size_list, value_list):
+
+    point_list = [(math.log(size), math.log(value)) for size, value in \
+                  zip(size_list, value_list) if value > 0]
+
+    if len(point_list) < 2:
+        return None
+
+    mean_x = sum([point[0] for point in point_list]) / len(point_list)
+    mean_y = sum([point[1] for point in point_list]) / len(point_list)
+
+    covariance = sum([(point[0] - mean_x) * (point[1] - mean_y) \
+                      for point in point_list])
+    variance = sum([(point[0] - mean_x) ** 2 for point in point_list])
+
+    if variance == 0:
+        return None
+
+    return covariance / variance
+
+###############################################################################
+# End of get_growth_exponent function
+###############################################################################
+
+###############################################################################
+# Function      : plot_scaling_results(result_dict, size_list, output_prefix)
+# Description   : This function plots the time and memory curves of stages
+#                 into <output_prefix>.png, if matplotlib is installed.
+# Arguments     : result_dict - dict mapping (size, stage) to (time, memory)
+#                 size_list - list of corpus sizes
+#                 output_prefix - prefix of name of the plot file
+# Returns       : None.
+###############################################################################
+
+def plot_scaling_results(result_dict, size_list, output_prefix):
+
+    try:
+        import matplotlib
+        matplotlib.use('Agg')
+        import matplotlib.pyplot as pyplot
+    except ImportError:
+        print "matplotlib is not installed, skipping the plot"
+        return
+
+    figure, axes_list = pyplot.subplots(1, 2, figsize=(12, 5))
+
+    for stage in STAGE_LIST:
+        stage_size_list = [size for size in size_list \
+                           if (size, stage) in result_dict]
+        if len(stage_size_list) == 0:
+            continue
+
+        axes_list[0].plot(stage_size_list, [result_dict[(size, stage)][0] \
+                          for size in stage_size_list], marker='o', \
+                          label=stage)
+        axes_list[1].plot(stage_size_list, [result_dict[(size, stage)][1] \
+                          for size in stage_size_list], marker='o', \
+                          label=stage)
+
+    for axes, label in ((axes_list[0], "time (s)"), \
+                        (axes_list[1], "memory (MB)")):
+        axes.set_xscale('log')
+        axes.set_yscale('symlog')
+        axes.set_xlabel("training instances")
+        axes.set_ylabel(label)
+        axes.legend()
+
+    figure.savefig(output_prefix + ".png")
+
+###############################################################################
+# End of plot_scaling_results function
+###############################################################################
+
+###############################################################################
+# Function      : scale_command(args)
+# Description   : This function runs the scale sub command. It generates a
+#                 corpus of every size, runs the stages on it in a child
+#                 process, writes the results and flags the stages growing
+#                 worse than linear.
+# Arguments     : args - parsed command line arguments
+# Returns       : None.
+###############################################################################
+
+def scale_command(args):
+
+    if not os.path.isdir(args.work_dir):
+        os.makedirs(args.work_dir)
+
+    result_dict = {}
+
+    for size in args.size_list:
+
+        file_prefix = os.path.abspath(os.path.join(args.work_dir, \
+                                                   "synth_" + str(size)))
+
+        start_time = time.time()
+        generate_corpus(file_prefix, size, args.sense_count, \
+                        args.vocab_size, args.context_length, \
+                        args.test_fraction, args.seed)
+        print "Generated", size, "instances in", time.time() - start_time, \
+              "seconds"
+
+        result_queue = multiprocessing.Queue()
+        process = multiprocessing.Process(target=run_scaling_stages, \
+                        args=(file_prefix, args.window_size, \
+                              size <= args.max_scan_size, result_queue))
+        process.start()
+        process.join()
+
+        if process.exitcode != 0:
+            print "Stages failed for size", size
+            continue
+
+        stage_result_dict = result_queue.get()
+
+        for stage in stage_result_dict.keys():
+            result_dict[(size, stage)] = stage_result_dict[stage]
+            print "%10d %-12s %10.3f s %10.1f MB" % ((size, stage) + \
+                                                     stage_result_dict[stage])
+
+    csv_file_handle = open(args.output_prefix + ".csv", 'w')
+    out = csv.writer(csv_file_handle, delimiter=',')
+    out.writerow(['size', 'stage', 'seconds', 'memory_mb'])
+    for size in args.size_list:
+        for stage in STAGE_LIST:
+            if (size, stage) in result_dict:
+                out.writerow([size, stage] + list(result_dict[(size, stage)]))
+    csv_file_handle.close()
+
+    plot_scaling_results(result_dict, args.size_list, args.output_prefix)
+
+    '''
+    Flag the stages whose time grows worse than linear with the size of
+    corpus.
+    '''
+    print
+    print "Growth exponents of time (1 = linear):"
+
+    for stage in STAGE_LIST:
+        stage_size_list = [size for size in args.size_list \
+                           if (size, stage) in result_dict]
+        growth_exponent = get_growth_exponent(stage_size_list, \
+                            [result_dict[(size, stage)][0] \
+                             for size in stage_size_list])
+
+        if growth_exponent is None:
+            continue
+
+        flag = ""
+        if growth_exponent > args.max_exponent:
+            flag = "  <-- worse than linear"
+
+        print "%-12s %6.2f%s" % (stage, growth_exponent, flag)
+
+###############################################################################
+# End of scale_command function
+###############################################################################
+
+###############################################################################
+# Function      : get_scan_sense(lemma_list, pos_tags_list, model, 
+#                                sense_context_words_mapping_dict,
+#                                sense_pos_tags_mapping_dict)
+# Description   : This function finds the most probable sense of an 
+#                 instance like get_max_prob_sense, but with the likelihood
+#                 Probabilities of get_coll_feature_prob, which scans all 
+#                 training contexts of every sense.
+# Arguments     : lemma_list - list of lemmas of context words
+#                 pos_tags_list - list of pos tags of context words
+#                 model - dict object holding the trained model
+#                 sense_context_words_mapping_dict, 
+#                 sense_pos_tags_mapping_dict - training contexts (as 
+#                 returned by get_coll_features)
+# Returns       : 1) The sense with maximum final probability
+###############################################################################
+
+def get_scan_sense(lemma_list, pos_tags_list, model, \
+                   sense_context_words_mapping_dict, \
+                   sense_pos_tags_mapping_dict):
+
+    sense_to_lkhd_mapping_dict = WSD_naive_bayes.get_coll_feature_prob(\
+                                    lemma_list, pos_tags_list, \
+                                    sense_context_words_mapping_dict, \
+                                    sense_pos_tags_mapping_dict, \
+                                    model['sense_list'])
+
+    final_prob_list = [math.log10(model['sense_to_prior_mapping_dict']\
+                                  [sense]) + \
+                       math.log10(sense_to_lkhd_mapping_dict[sense]) \
+                       for sense in model['sense_list']]
+
+    return model['sense_list'][final_prob_list.index(max(final_prob_list))]
+
+###############################################################################
+# End of get_scan_sense function
+###############################################################################
+
+###############################################################################
+# Function      : run_engine_benchmark(train_file_name, test_file_name,
+#                                      key_file_name, window_size, knn_k,
+#                                      op_file_prefix)
+# Description   : This function trains the models of one corpus, extracts
+#                 the features of its test instances and classifies them 
+#                 with every engine of ENGINE_LIST, timing each instance.
+#                 The senses of each engine are written into an output 
+#                 file, which is scored with evaluate_tagging.
+# Arguments     : train_file_name - Name of training file
+#                 test_file_name - Name of test file
+#                 key_file_name - Name of gold std. key file
+#                 window_size - window size of collocational features
+#                 knn_k - number of neighbours of the k-NN classifier
+#                 op_file_prefix - prefix of names of output files, which 
+#                                  are <op_file_prefix>.<engine>.op
+# Returns       : 1) A dict mapping each engine to a tuple of accuracy (in
+#                    percentage), mean and p95 latency (in milliseconds)
+###############################################################################
+
+def run_engine_benchmark(train_file_name, test_file_name, key_file_name, \
+                         window_size, knn_k, op_file_prefix):
+
+    ambiguous_word, sense_id_list, context_sent_list = get_training_lists(\
+                        WSD_naive_bayes.read_WSD_instances(train_file_name))
+
+    sense_context_words_mapping_dict, sense_pos_tags_mapping_dict = \
+        WSD_naive_bayes.get_coll_features(sense_id_list, context_sent_list, \
+                                          window_size, train_file_name)
+
+    model = WSD_naive_bayes.get_WSD_model(ambiguous_word, sense_id_list, \
+                                context_sent_list, \
+                                sense_context_words_mapping_dict, \
+                                window_size)
+    knn_model = WSD_naive_bayes.get_WSD_model(ambiguous_word, \
+                                sense_id_list, context_sent_list, \
+                                sense_context_words_mapping_dict, \
+                                window_size, knn_k=knn_k)
+    decision_model = WSD_naive_bayes.compile_decision_list(model)
+
+    test_instance_list = list(WSD_naive_bayes.iter_WSD_instance_table(\
+                        WSD_naive_bayes.read_WSD_instances(test_file_name)))
+    lemma_rows, pos_tags_rows = WSD_naive_bayes.get_context_feature_rows(\
+                                [instance.context_sent for instance in \
+                                 test_instance_list], window_size, \
+                                test_file_name)
+
+    engine_result_dict = {}
+
+    for engine in ENGINE_LIST:
+
+        latency_list = []
+        op_file_name = op_file_prefix + "." + engine + ".op"
+        op_file_handle = open(op_file_name, 'w')
+
+        for i in range(0, len(lemma_rows)):
+            start_time = time.time()
+
+            if engine == 'scan':
+                sense = get_scan_sense(lemma_rows[i], pos_tags_rows[i], \
+                                       model, \
+                                       sense_context_words_mapping_dict, \
+                                       sense_pos_tags_mapping_dict)
+            elif engine == 'bayes':
+                sense = WSD_naive_bayes.get_max_prob_sense(lemma_rows[i], \
+                                                pos_tags_rows[i], model)
+            elif engine == 'knn':
+                sense = WSD_naive_bayes.get_max_prob_sense(lemma_rows[i], \
+                                                pos_tags_rows[i], knn_model)
+            else:
+                sense = WSD_naive_bayes.get_max_prob_sense(lemma_rows[i], \
+                                                pos_tags_rows[i], \
+                                                decision_model)
+
+            latency_list.append((time.time() - start_time) * 1000)
+
+            op_file_handle.write(test_instance_list[i].lexelt + " " + \
+                                 test_instance_list[i].instance_id + " " + \
+                                 sense + "\n")
+
+        op_file_handle.close()
+
+        latency_list.sort()
+        engine_result_dict[engine] = (\
+            WSD_naive_bayes.evaluate_tagging(op_file_name, key_file_name), \
+            sum(latency_list) / max(len(latency_list), 1), \
+            WSD_load_test.get_percentile(latency_list, 95))
+
+    return engine_result_dict
+
+###############################################################################
+# End of run_engine_benchmark function
+###############################################################################
+
+###############################################################################
+# Function      : engines_command(args)
+# Description   : This function runs the engines sub command on every 
+#                 bundled corpus which has a key file and writes the 
+#                 results.
+# Arguments     : args - parsed command line arguments
+# Returns       : None.
+###############################################################################
+
+def engines_command(args):
+
+    train_file_name_list, test_file_name_list = \
+                                        WSD_load_test.get_bundled_files()
+
+    csv_file_handle = open(args.output_prefix + ".csv", 'w')
+    out = csv.writer(csv_file_handle, delimiter=',')
+    out.writerow(['corpus', 'engine', 'accuracy', 'mean_ms', 'p95_ms'])
+
+    print "%-16s %-8s %9s %9s %9s" % ('corpus', 'engine', 'accuracy', \
+                                      'mean ms', 'p95 ms')
+
+    for train_file_name, test_file_name in zip(train_file_name_list, \
+                                               test_file_name_list):
+        key_file_name = test_file_name[:-len(".xml")] + ".key"
+        if not os.path.isfile(key_file_name):
+            continue
+
+        corpus = os.path.basename(test_file_name)[:-len(".xml")]
+        engine_result_dict = run_engine_benchmark(train_file_name, \
+                                test_file_name, key_file_name, \
+                                args.window_size, args.knn_k, \
+                                args.output_prefix + "_" + corpus)
+
+        for engine in ENGINE_LIST:
+            out.writerow([corpus, engine] + list(engine_result_dict[engine]))
+            print "%-16s %-8s %9.2f %9.3f %9.3f" % ((corpus, engine) + \
+                                                    engine_result_dict[engine])
+
+    csv_file_handle.close()
+
+###############################################################################
+# End of engines_command function
+###############################################################################
+
+###############################################################################
+# Function      : generate_command(args)
+# Description   : This function runs the generate sub command.
+# Arguments     : args - parsed command line arguments
+# Returns       : None.
+###############################################################################
+
+def generate_command(args):
+
+    generate_corpus(args.file_prefix, args.instance_count, args.sense_count,\
+                    args.vocab_size, args.context_length, args.test_fraction,\
+                    args.seed)
+
+###############################################################################
+# End of generate_command function
+###############################################################################
+
+###############################################################################
+# Function      : main()
+# Description   : Entry point for the benchmark.
+# Arguments     : None. Command Line Arguments in Python are retrieved from
+#                 sys.argv variable of sys module.
+# Returns       : None.
+###############################################################################
+
+def main():
+
+    parser = argparse.ArgumentParser(prog="WSD_benchmark.py", \
+                description="Synthetic corpora and scaling benchmark")
+    subparsers = parser.add_subparsers()
+
+    generate_parser = subparsers.add_parser('generate', \
+                        help="write a synthetic corpus")
+    generate_parser.add_argument('--prefix', dest='file_prefix', \
+                                 default='synth', help="prefix of file names")
+    generate_parser.add_argument('--instances', dest='instance_count', \
+                                 type=int, default=1000, \
+                                 help="number of training instances")
+    generate_parser.set_defaults(command_function=generate_command)
+
+    scale_parser = subparsers.add_parser('scale', \
+                        help="benchmark the WSD path on growing corpora")
+    scale_parser.add_argument('--sizes', dest='size_list', type=int, \
+                              nargs='+', default=[1000, 10000, 100000], \
+                              help="numbers of training instances")
+    scale_parser.add_argument('--window', dest='window_size', type=int, \
+                              default=2, help="window size (default 2)")
+    scale_parser.add_argument('--max-scan-size', dest='max_scan_size', \
+                              type=int, default=20000, help="largest size " \
+                              "for which score_scan stage is run")
+    scale_parser.add_argument('--max-exponent', dest='max_exponent', \
+                              type=float, default=1.2, help="growth " \
+                              "exponent above which a stage is flagged")
+    scale_parser.add_argument('--work-dir', dest='work_dir', \
+                              default='benchmark_data', \
+                              help="directory for generated corpora")
+    scale_parser.add_argument('--output', dest='output_prefix', \
+                              default='benchmark_scaling', \
+                              help="prefix of result files")
+    scale_parser.set_defaults(command_function=scale_command)
+
+    engines_parser = subparsers.add_parser('engines', \
+                        help="compare the classifiers on bundled corpora")
+    engines_parser.add_argument('--window', dest='window_size', type=int, \
+                                default=2, help="window size (default 2)")
+    engines_parser.add_argument('--knn', dest='knn_k', type=int, \
+                                default=WSD_naive_bayes.KNN_NEIGHBOUR_COUNT, \
+                                help="number of neighbours of k-NN " \
+                                     "classifier (default " + \
+                                str(WSD_naive_bayes.KNN_NEIGHBOUR_COUNT) + ")")
+    engines_parser.add_argument('--output', dest='output_prefix', \
+                                default='benchmark_engines', \
+                                help="prefix of result file")
+    engines_parser.set_defaults(command_function=engines_command)
+
+    # corpus shape options common to both sub commands
+    for sub_parser in (generate_parser, scale_parser):
+        sub_parser.add_argument('--senses', dest='sense_count', type=int, \
+                                default=4, help="number of senses")
+        sub_parser.add_argument('--vocab', dest='vocab_size', type=int, \
+                                default=20000, help="vocabulary size")
+        sub_parser.add_argument('--context-length', dest='context_length', \
+                                type=int, default=30, \
+                                help="words in each context")
+        sub_parser.add_argument('--test-fraction', dest='test_fraction', \
+                                type=float, default=0.3, \
+                                help="test instances per training instance")
+        sub_parser.add_argument('--seed', dest='seed', type=int, default=1, \
+                                help="random seed")
+
+    args = parser.parse_args()
+    args.command_function(args)
+
+###############################################################################
+# End of main function
+###############################################################################
+
+'''
+Boilerplate syntax to specify that main() method is the entry point for
+this program.
+'''
+
+if __name__ == '__main__':
+
+    main()
+
+##############################################################################
+# End of WSD_benchmark.py program
+#############################################################################
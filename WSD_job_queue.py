@@ -0,0 +1,669 @@
+##############################################################################
+# Problem
+# Description       :  Nightly evaluations run hundreds of (training file,
+#                      test file, key file) jobs, each as a separate
+#                      "python WSD_naive_bayes.py -tr .. -ts .. -tk .."
+#                      process which loads MontyLingua and trains its models
+#                      again. This program keeps such jobs in a queue (an
+#                      SQLite database) and runs them with a pool of worker
+#                      processes which share a loaded tagger and a cache of
+#                      trained models.
+#
+# Usage             : This program has three sub commands:
+#
+#                     1) add = adds a job to the queue. The job is given
+#                              with the original options of
+#                              WSD_naive_bayes.py after "--". e.g.
+#
+# python WSD_job_queue.py add --priority 5 --retries 2 --memory-mb 2000
+#                             -- -tr hat.xml -ts ha.xml -tk ha.key
+#
+#                        With --file <jobs file>, one job is added for
+#                        every line of the file (options of
+#                        WSD_naive_bayes.py, lines starting with # are
+#                        skipped).
+#
+#                     2) run = runs the queued jobs with a pool of workers
+#                              until the queue is empty. e.g.
+#
+# python WSD_job_queue.py run --workers 8
+#
+#                     3) status = prints the state of every job.
+#
+#                     Jobs with higher priority are run first and jobs of
+#                     the same priority in the order they were added. A
+#                     failed job is queued again until it has been tried
+#                     1 + --retries times.
+#
+#                     The tagger is loaded once, before the workers are
+#                     started, and every job is run in a child process
+#                     forked from its worker, so no job loads the tagger
+#                     again. The resource limits of a job (--memory-mb for
+#                     the address space and --cpu-seconds for CPU time) are
+#                     set in this child, so a job going over them fails
+#                     alone. Trained models are kept in the model cache
+#                     directory (--model-cache, see WSD_naive_bayes.py -mcd)
+#                     and jobs with the same training file and settings
+#                     use them instead of training again.
+#
+#                     Each job runs in its own directory under --work-dir
+#                     (default "jobs/<job id>"), where its op_file,
+#                     confusion matrix, output log "job.log" and error log
+#                     "job.err" are written. Relative file names of a job 
+#                     are taken from the directory it was added from. The 
+#                     last line of the output log (the accuracy, when a key
+#                     file is given) is kept as the result of job, or the
+#                     last line of the error log if the job failed.
+###############################################################################
+
+#!/usr/bin/python
+
+'''
+import statements to include Python's in-built module functionalities in the
+program
+'''
+# sys and os modules are used for command line, file and process handling
+import sys
+import os
+
+# shlex module is used to split the lines of jobs files into options
+import shlex
+
+# time module is used to time the jobs
+import time
+
+# json module is used to keep the options of jobs in the database
+import json
+
+# sqlite3 module is used for the job queue database
+import sqlite3
+
+# resource module is used to set the resource limits of jobs
+import resource
+
+# signal and traceback modules are used to report why a job failed
+import signal
+import traceback
+
+# argparse module is used to parse the command line arguments
+import argparse
+
+# multiprocessing module is used to run the worker processes
+import multiprocessing
+
+# the WSD program whose runs are queued
+import WSD_naive_bayes
+
+
+'''
+States of a job in the queue
+'''
+JOB_STATES = ['queued', 'running', 'done', 'failed']
+
+'''
+Options of WSD_naive_bayes.py (destinations in its legacy argument parser)
+which name files or directories, and are made absolute before a job is run
+in its own directory
+'''
+PATH_OPTION_LIST = ['train_file_name_list', 'test_file_name', \
+                    'gold_std_file_name', 'raw_file_name_list', 'model_dir', \
+                    'model_file_name', 'compact_model_file_name', \
+                    'tagger_snapshot_file_name', 'feature_store_dir', \
+                    'checkpoint_dir', 'model_cache_dir', \
+                    'lemma_table_file_name']
+
+###############################################################################
+# Function      : open_job_db(db_file_name)
+# Description   : This function opens the job queue database, creating its
+#                 table if needed. Transactions are started explicitly (see
+#                 claim_job), so the connection is in autocommit mode.
+# Arguments     : db_file_name - Name of the database file
+# Returns       : 1) An sqlite3 connection
+###############################################################################
+
+def open_job_db(db_file_name):
+
+    connection = sqlite3.connect(db_file_name, timeout=60, \
+                                 isolation_level=None)
+    connection.row_factory = sqlite3.Row
+
+    connection.execute("CREATE TABLE IF NOT EXISTS job (" \
+                       "id INTEGER PRIMARY KEY AUTOINCREMENT, " \
+                       "priority INTEGER NOT NULL, " \
+                       "state TEXT NOT NULL, " \
+                       "attempts INTEGER NOT NULL, " \
+                       "max_attempts INTEGER NOT NULL, " \
+                       "arguments TEXT NOT NULL, " \
+                       "base_dir TEXT NOT NULL, " \
+                       "memory_limit_mb INTEGER, " \
+                       "cpu_limit_seconds INTEGER, " \
+                       "worker_pid INTEGER, " \
+                       "start_time REAL, " \
+                       "end_time REAL, " \
+                       "result TEXT)")
+
+    return connection
+
+###############################################################################
+# End of open_job_db function
+###############################################################################
+
+###############################################################################
+# Function      : parse_job_arguments(job_arg_list)
+# Description   : This function parses the options of a job with the
+#                 argument parser of WSD_naive_bayes.py.
+# Arguments     : job_arg_list - list of options of the job
+# Returns       : 1) The parsed options
+###############################################################################
+
+def parse_job_arguments(job_arg_list):
+
+    parser = WSD_naive_bayes.get_legacy_argument_parser()
+    args = parser.parse_args(job_arg_list)
+    WSD_naive_bayes.check_model_arguments(parser, args)
+
+    if args.raw_file_name_list is not None:
+        if args.train_file_name_list is None and args.model_dir is None:
+            parser.error("-rw needs -tr or -md")
+    elif args.train_file_name_list is None or args.test_file_name is None:
+        parser.error("-tr and -ts (or -rw) are needed")
+
+    return args
+
+###############################################################################
+# End of parse_job_arguments function
+###############################################################################
+
+###############################################################################
+# Function      : add_job(connection, job_arg_list, priority, max_attempts,
+#                         memory_limit_mb, cpu_limit_seconds)
+# Description   : This function checks the options of a job and adds it to
+#                 the queue.
+# Arguments     : connection - connection to the job queue database
+#                 job_arg_list - list of options of WSD_naive_bayes.py
+#                 priority - jobs with higher priority run first
+#                 max_attempts - number of times the job is tried
+#                 memory_limit_mb - limit of address space of the job in
+#                                   MB (or None)
+#                 cpu_limit_seconds - limit of CPU time of the job (or None)
+# Returns       : 1) Id of the job
+###############################################################################
+
+def add_job(connection, job_arg_list, priority, max_attempts, \
+            memory_limit_mb, cpu_limit_seconds):
+
+    parse_job_arguments(job_arg_list)
+
+    cursor = connection.execute("INSERT INTO job (priority, state, " \
+                    "attempts, max_attempts, arguments, base_dir, " \
+                    "memory_limit_mb, cpu_limit_seconds) " \
+                    "VALUES (?, 'queued', 0, ?, ?, ?, ?, ?)", \
+                    (priority, max_attempts, json.dumps(job_arg_list), \
+                     os.getcwd(), memory_limit_mb, cpu_limit_seconds))
+
+    return cursor.lastrowid
+
+###############################################################################
+# End of add_job function
+###############################################################################
+
+###############################################################################
+# Function      : claim_job(connection)
+# Description   : This function takes the queued job of highest priority
+#                 and marks it running. The select and update are done in
+#                 one write transaction, so two workers never take the
+#                 same job.
+# Arguments     : connection - connection to the job queue database
+# Returns       : 1) The row of the job, or None if no job is queued
+###############################################################################
+
+def claim_job(connection):
+
+    connection.execute("BEGIN IMMEDIATE")
+
+    job = connection.execute("SELECT * FROM job WHERE state = 'queued' " \
+                             "ORDER BY priority DESC, id LIMIT 1").fetchone()
+
+    if job is not None:
+        connection.execute("UPDATE job SET state = 'running', " \
+                           "attempts = attempts + 1, worker_pid = ?, " \
+                           "start_time = ?, end_time = NULL WHERE id = ?", \
+                           (os.getpid(), time.time(), job['id']))
+
+    connection.execute("COMMIT")
+
+    if job is None:
+        return None
+
+    return connection.execute("SELECT * FROM job WHERE id = ?", \
+                              (job['id'],)).fetchone()
+
+###############################################################################
+# End of claim_job function
+###############################################################################
+
+###############################################################################
+# Function      : finish_job(connection, job, success_flag, result)
+# Description   : This function records the end of a run of a job. A job
+#                 which failed is queued again while it has attempts left.
+# Arguments     : connection - connection to the job queue database
+#                 job - row of the job (as returned by claim_job)
+#                 success_flag - whether the run succeeded
+#                 result - result or error message of the run
+# Returns       : 1) The new state of the job
+###############################################################################
+
+def finish_job(connection, job, success_flag, result):
+
+    if success_flag:
+        state = 'done'
+    elif job['attempts'] < job['max_attempts']:
+        state = 'queued'
+    else:
+        state = 'failed'
+
+    connection.execute("UPDATE job SET state = ?, end_time = ?, " \
+                       "result = ? WHERE id = ?", \
+                       (state, time.time(), result, job['id']))
+
+    return state
+
+###############################################################################
+# End of finish_job function
+###############################################################################
+
+###############################################################################
+# Function      : run_job(job, job_dir)
+# Description   : This function is run in the child process of a job. It
+#                 sets the resource limits of the job, moves into its
+#                 directory, sends the standard output into "job.log" 
+#                 and standard error into "job.err", and runs it
+#                 like WSD_naive_bayes.py would, with the tagger and model
+#                 cache of the worker. It never returns.
+# Arguments     : job - row of the job (as returned by claim_job)
+#                 job_dir - directory to run the job in
+# Returns       : None. The child exits with status 0 if the job succeeded.
+###############################################################################
+
+def run_job(job, job_dir):
+
+    exit_status = 1
+
+    try:
+        if job['memory_limit_mb'] is not None:
+            memory_limit = job['memory_limit_mb'] * 1024 * 1024
+            resource.setrlimit(resource.RLIMIT_AS, \
+                               (memory_limit, memory_limit))
+
+        if job['cpu_limit_seconds'] is not None:
+            resource.setrlimit(resource.RLIMIT_CPU, \
+                               (job['cpu_limit_seconds'], \
+                                job['cpu_limit_seconds'] + 1))
+
+        log_file_handle = open(os.path.join(job_dir, "job.log"), 'w')
+        error_file_handle = open(os.path.join(job_dir, "job.err"), 'w')
+        sys.stdout.flush()
+        sys.stderr.flush()
+        os.dup2(log_file_handle.fileno(), 1)
+        os.dup2(error_file_handle.fileno(), 2)
+
+        args = parse_job_arguments([job_arg.encode('utf-8') for job_arg \
+                                    in json.loads(job['arguments'])])
+
+        # file names of job are relative to the directory it was added from
+        for option_name in PATH_OPTION_LIST:
+            value = getattr(args, option_name)
+            if isinstance(value, list):
+                setattr(args, option_name, [os.path.join(job['base_dir'], \
+                        file_name) for file_name in value])
+            elif value is not None:
+                setattr(args, option_name, os.path.join(job['base_dir'], \
+                                                        value))
+
+        '''
+        Train with one process unless the job asks for more, as the workers
+        already keep all CPUs busy.
+        '''
+        if args.process_count is None:
+            args.process_count = 1
+
+        WSD_naive_bayes.tagger_snapshot_file_name = \
+                                            args.tagger_snapshot_file_name
+        WSD_naive_bayes.feature_store_dir = args.feature_store_dir
+        if args.model_cache_dir is not None:
+            WSD_naive_bayes.model_cache_dir = args.model_cache_dir
+
+        WSD_naive_bayes.set_lemma_cache(args)
+
+        os.chdir(job_dir)
+
+        if args.raw_file_name_list is not None:
+            WSD_naive_bayes.run_raw_tagging(args)
+        else:
+            WSD_naive_bayes.run_WSD(args)
+
+        WSD_naive_bayes.close_lemma_cache(args)
+
+        exit_status = 0
+
+    except SystemExit, exit_error:
+        # raised by the argument parser on bad options
+        exit_status = exit_error.code or 1
+
+    except BaseException:
+        traceback.print_exc()
+
+    sys.stdout.flush()
+    sys.stderr.flush()
+    os._exit(exit_status)
+
+###############################################################################
+# End of run_job function
+###############################################################################
+
+###############################################################################
+# Function      : get_job_result(job_dir, wait_status)
+# Description   : This function finds the result of a run of a job from its
+#                 exit status and its logs.
+# Arguments     : job_dir - directory the job was run in
+#                 wait_status - exit status of the child process of job
+#                               (as returned by os.waitpid)
+# Returns       : 1) Whether the run succeeded
+#                 2) The last line of output log of job (of error log if
+#                    it failed), or the signal which killed it
+###############################################################################
+
+def get_job_result(job_dir, wait_status):
+
+    last_line_dict = {}
+
+    for log_name in ["job.log", "job.err"]:
+        last_line_dict[log_name] = ""
+        log_file_name = os.path.join(job_dir, log_name)
+        if os.path.isfile(log_file_name):
+            log_file_handle = open(log_file_name, 'r')
+            for line in log_file_handle:
+                if line.strip() != "":
+                    last_line_dict[log_name] = line.strip()
+            log_file_handle.close()
+
+    if os.WIFSIGNALED(wait_status):
+        signal_no = os.WTERMSIG(wait_status)
+        signal_name_list = [name for name in dir(signal) if \
+                            name.startswith('SIG') and \
+                            not name.startswith('SIG_') and \
+                            getattr(signal, name) == signal_no]
+        if len(signal_name_list) > 0:
+            return False, "killed by " + signal_name_list[0]
+        return False, "killed by signal " + str(signal_no)
+
+    if os.WEXITSTATUS(wait_status) == 0:
+        return True, last_line_dict["job.log"]
+
+    return False, last_line_dict["job.err"] or last_line_dict["job.log"]
+
+###############################################################################
+# End of get_job_result function
+###############################################################################
+
+###############################################################################
+# Function      : run_worker(db_file_name, work_dir)
+# Description   : This function is run in each worker process. It takes
+#                 jobs from the queue and runs each in a child process
+#                 until no job is queued.
+# Arguments     : db_file_name - Name of the database file
+#                 work_dir - directory under which jobs are run
+# Returns       : None.
+###############################################################################
+
+def run_worker(db_file_name, work_dir):
+
+    connection = open_job_db(db_file_name)
+
+    while True:
+        job = claim_job(connection)
+        if job is None:
+            break
+
+        job_dir = os.path.join(work_dir, str(job['id']))
+        if not os.path.isdir(job_dir):
+            os.makedirs(job_dir)
+
+        start_time = time.time()
+
+        child_pid = os.fork()
+        if child_pid == 0:
+            connection = None
+            run_job(job, job_dir)
+
+        wait_status = os.waitpid(child_pid, 0)[1]
+
+        success_flag, result = get_job_result(job_dir, wait_status)
+        state = finish_job(connection, job, success_flag, result)
+
+        print "Job %d %s in %.1f s (attempt %d of %d) : %s" % (job['id'], \
+              state, time.time() - start_time, job['attempts'], \
+              job['max_attempts'], result)
+        sys.stdout.flush()
+
+    connection.close()
+
+###############################################################################
+# End of run_worker function
+###############################################################################
+
+###############################################################################
+# Function      : add_command(args)
+# Description   : This function runs the add sub command.
+# Arguments     : args - parsed command line arguments
+# Returns       : None.
+###############################################################################
+
+def add_command(args):
+
+    job_arg_list_list = []
+
+    if args.jobs_file_name is not None:
+        jobs_file_handle = open(args.jobs_file_name, 'r')
+        for line in jobs_file_handle:
+            if line.strip() != "" and not line.strip().startswith('#'):
+                job_arg_list_list.append(shlex.split(line))
+        jobs_file_handle.close()
+
+    job_arg_list = args.job_arg_list
+    if len(job_arg_list) > 0 and job_arg_list[0] == '--':
+        job_arg_list = job_arg_list[1:]
+    if len(job_arg_list) > 0:
+        job_arg_list_list.append(job_arg_list)
+
+    if len(job_arg_list_list) == 0:
+        print "No job to add"
+        return
+
+    connection = open_job_db(args.db_file_name)
+
+    # add all jobs or none of them, if the options of one are wrong
+    connection.execute("BEGIN")
+    try:
+        for job_arg_list in job_arg_list_list:
+            job_id = add_job(connection, job_arg_list, args.priority, \
+                             args.retry_count + 1, args.memory_limit_mb, \
+                             args.cpu_limit_seconds)
+            print "Added job", job_id, ":", " ".join(job_arg_list)
+    except BaseException:
+        connection.execute("ROLLBACK")
+        raise
+    connection.execute("COMMIT")
+
+    connection.close()
+
+###############################################################################
+# End of add_command function
+###############################################################################
+
+###############################################################################
+# Function      : run_command(args)
+# Description   : This function runs the run sub command. It loads the
+#                 tagger, starts the workers and waits for them to empty
+#                 the queue.
+# Arguments     : args - parsed command line arguments
+# Returns       : None.
+###############################################################################
+
+def run_command(args):
+
+    connection = open_job_db(args.db_file_name)
+
+    '''
+    Jobs left running by a run which was stopped are queued again. Their
+    attempt is not counted.
+    '''
+    connection.execute("UPDATE job SET state = 'queued', " \
+                       "attempts = attempts - 1 WHERE state = 'running'")
+
+    queued_count = connection.execute("SELECT COUNT(*) FROM job WHERE " \
+                                      "state = 'queued'").fetchone()[0]
+    connection.close()
+
+    if queued_count == 0:
+        print "No job is queued"
+        return
+
+    WSD_naive_bayes.tagger_snapshot_file_name = \
+                                            args.tagger_snapshot_file_name
+    WSD_naive_bayes.model_cache_dir = os.path.abspath(args.model_cache_dir)
+    work_dir = os.path.abspath(args.work_dir)
+
+    # the forked workers and jobs share the tagger loaded here
+    start_time = time.time()
+    WSD_naive_bayes.get_tagger()
+    print "Loaded tagger in %.1f s" % (time.time() - start_time)
+    sys.stdout.flush()
+
+    worker_count = min(args.worker_count, queued_count)
+    worker_list = []
+    for i in range(0, worker_count):
+        worker = multiprocessing.Process(target=run_worker, \
+                                         args=(args.db_file_name, work_dir))
+        worker.start()
+        worker_list.append(worker)
+
+    for worker in worker_list:
+        worker.join()
+
+    print "Ran jobs with", worker_count, "workers in %.1f s" % \
+          (time.time() - start_time)
+    status_command(args)
+
+###############################################################################
+# End of run_command function
+###############################################################################
+
+###############################################################################
+# Function      : status_command(args)
+# Description   : This function runs the status sub command. It prints the
+#                 number of jobs in each state and a line for every job.
+# Arguments     : args - parsed command line arguments
+# Returns       : None.
+###############################################################################
+
+def status_command(args):
+
+    connection = open_job_db(args.db_file_name)
+
+    job_list = connection.execute("SELECT * FROM job ORDER BY " \
+                                  "priority DESC, id").fetchall()
+    connection.close()
+
+    for state in JOB_STATES:
+        print "%-8s : %d" % (state, len([job for job in job_list \
+                                         if job['state'] == state]))
+
+    for job in job_list:
+        if job['start_time'] is not None and job['end_time'] is not None:
+            run_seconds = "%8.1f" % (job['end_time'] - job['start_time'])
+        else:
+            run_seconds = "%8s" % "-"
+
+        print "%5d %4d %-8s %d/%d %s s  %s  %s" % (job['id'], \
+              job['priority'], job['state'], job['attempts'], \
+              job['max_attempts'], run_seconds, job['result'] or "", \
+              " ".join(json.loads(job['arguments'])))
+
+###############################################################################
+# End of status_command function
+###############################################################################
+
+###############################################################################
+# Function      : main()
+# Description   : Entry point for the job queue.
+# Arguments     : None. Command Line Arguments in Python are retrieved from
+#                 sys.argv variable of sys module.
+# Returns       : None.
+###############################################################################
+
+def main():
+
+    parser = argparse.ArgumentParser(prog="WSD_job_queue.py", \
+                description="Queue of WSD_naive_bayes.py runs")
+    parser.add_argument('--db', dest='db_file_name', default='jobs.db', \
+                        help="job queue database (default jobs.db)")
+    subparsers = parser.add_subparsers()
+
+    add_parser = subparsers.add_parser('add', help="add jobs to the queue")
+    add_parser.add_argument('--priority', dest='priority', type=int, \
+                            default=0, help="jobs with higher priority " \
+                                            "run first (default 0)")
+    add_parser.add_argument('--retries', dest='retry_count', type=int, \
+                            default=0, help="times a failed job is tried " \
+                                            "again (default 0)")
+    add_parser.add_argument('--memory-mb', dest='memory_limit_mb', \
+                            type=int, help="limit of address space of a " \
+                                           "job in MB")
+    add_parser.add_argument('--cpu-seconds', dest='cpu_limit_seconds', \
+                            type=int, help="limit of CPU time of a job")
+    add_parser.add_argument('--file', dest='jobs_file_name', \
+                            help="file with the options of one job on " \
+                                 "each line")
+    add_parser.add_argument('job_arg_list', nargs=argparse.REMAINDER, \
+                            help="options of WSD_naive_bayes.py after --")
+    add_parser.set_defaults(command_function=add_command)
+
+    run_parser = subparsers.add_parser('run', help="run the queued jobs")
+    run_parser.add_argument('--workers', dest='worker_count', type=int, \
+                            default=multiprocessing.cpu_count(), \
+                            help="number of worker processes (default " \
+                                 "number of CPUs)")
+    run_parser.add_argument('--work-dir', dest='work_dir', default='jobs', \
+                            help="directory to run jobs in (default jobs)")
+    run_parser.add_argument('--model-cache', dest='model_cache_dir', \
+                            default='model_cache', help="directory to " \
+                            "cache trained models in (default model_cache)")
+    run_parser.add_argument('--tagger-snapshot', \
+                            dest='tagger_snapshot_file_name', \
+                            help="file to warm-start the tagger from")
+    run_parser.set_defaults(command_function=run_command)
+
+    status_parser = subparsers.add_parser('status', \
+                        help="print the state of jobs")
+    status_parser.set_defaults(command_function=status_command)
+
+    args = parser.parse_args()
+    args.command_function(args)
+
+###############################################################################
+# End of main function
+###############################################################################
+
+'''
+Boilerplate syntax to specify that main() method is the entry point for
+this program.
+'''
+
+if __name__ == '__main__':
+
+    main()
+
+##############################################################################
+# End of WSD_job_queue.py program
+#############################################################################
@@ -0,0 +1,534 @@
+##############################################################################
+# Problem
+# Description       :  WSD_benchmark.py measures how the batch WSD path
+#                      scales with corpus size. This program measures how
+#                      classification of single contexts behaves under
+#                      concurrent load, as in an online service. It replays
+#                      the contexts of test files against the classification
+#                      path of WSD_naive_bayes.py from several threads and
+#                      reports throughput and latency percentiles, with the
+#                      time of waiting for the tagger, tagging and scoring
+#                      broken down separately.
+#
+# Usage             : python WSD_load_test.py --concurrency 4 --rate 200
+#                                             --duration 30
+#
+#                     By default the models are trained from the bundled
+#                     training files (<lexelt>_train.xml) and the contexts
+#                     of the bundled test files (<lexelt>.xml) are replayed.
+#                     Other files can be given with --train and --test, or
+#                     saved models with --model-dir. Each context is routed
+#                     to the model of its lexelt item.
+#
+#                     --concurrency <n> = number of client threads
+#                     --rate <r>        = requests per second over all
+#                                         threads (0 = as fast as possible)
+#                     --duration <s>    = seconds to run the load for
+#                     --requests <n>    = stop after n requests instead
+#                     --warmup <n>      = requests run first and not
+#                                         measured (default 20)
+#
+#                     With a rate, requests are scheduled at fixed times and
+#                     the latency of a request is measured from its
+#                     scheduled time, so that time spent waiting for a free
+#                     thread when the program falls behind is counted.
+#
+#                     The results are printed and written as JSON into
+#                     load_test.json (--output). Latencies are in
+#                     milliseconds e.g.
+#
+#                     {"throughput_rps": 180.2,
+#                      "latency_ms": {"total": {"p50": 4.1, "p99": 19.8, ..},
+#                                     "tagger_wait": {...},
+#                                     "tagging": {...},
+#                                     "scoring": {...}}, ...}
+#
+#                     Requests which fail, in the warm-up or while 
+#                     measuring, are counted as errors, and the first 
+#                     error of each kind is printed on standard error.
+#
+#                     All client threads tag with the one MontyLingua 
+#                     object of the process (see get_tagger of 
+#                     WSD_naive_bayes.py), which is not made to be called
+#                     from several threads at once. So the threads take
+#                     turns to tag, holding tagger_lock of 
+#                     WSD_naive_bayes.py. The time a request waits for the
+#                     lock is reported as "tagger_wait", apart from the
+#                     tagging itself, and is part of its total latency.
+#
+#                     This program needs MontyLingua (see
+#                     WSD_naive_bayes.py) as the contexts are tagged with
+#                     it.
+###############################################################################
+
+#!/usr/bin/python
+
+'''
+import statements to include Python's in-built module functionalities in the
+program
+'''
+# sys, os and glob modules are used for command line and file handling
+import sys
+import os
+import glob
+
+# time module is used to schedule and time the requests
+import time
+
+# threading module is used to run the client threads
+import threading
+
+# json module is used to write the results
+import json
+
+# argparse module is used to parse the command line arguments
+import argparse
+
+# the WSD program being load tested
+import WSD_naive_bayes
+
+
+'''
+Parts of a request whose latencies are reported, and the percentiles
+reported for each of them
+'''
+LATENCY_PARTS = ['total', 'tagger_wait', 'tagging', 'scoring']
+PERCENTILE_LIST = [50, 90, 99, 99.9]
+
+###############################################################################
+# Function      : get_bundled_files()
+# Description   : This function finds the training and test files bundled
+#                 with the program, i.e. every <lexelt>.xml file which has a
+#                 <lexelt>_train.xml file next to it.
+# Arguments     : None.
+# Returns       : 1) A list of names of training files
+#                 2) A list of names of test files
+###############################################################################
+
+def get_bundled_files():
+
+    program_dir = os.path.dirname(os.path.abspath(__file__))
+
+    train_file_name_list = []
+    test_file_name_list = []
+
+    for train_file_name in sorted(glob.glob(os.path.join(program_dir, \
+                                                         "*_train.xml"))):
+        test_file_name = train_file_name[:-len("_train.xml")] + ".xml"
+        if os.path.isfile(test_file_name):
+            train_file_name_list.append(train_file_name)
+            test_file_name_list.append(test_file_name)
+
+    return train_file_name_list, test_file_name_list
+
+###############################################################################
+# End of get_bundled_files function
+###############################################################################
+
+###############################################################################
+# Function      : get_percentile(sorted_value_list, percentile)
+# Description   : This function gives a percentile of values by the nearest
+#                 rank method.
+# Arguments     : sorted_value_list - values in increasing order
+#                 percentile - percentile to find (0 to 100)
+# Returns       : 1) The value at the percentile, or None if there are no
+#                    values
+###############################################################################
+
+def get_percentile(sorted_value_list, percentile):
+
+    if len(sorted_value_list) == 0:
+        return None
+
+    rank = int(-(-percentile * len(sorted_value_list) // 100))
+
+    return sorted_value_list[min(max(rank, 1), len(sorted_value_list)) - 1]
+
+###############################################################################
+# End of get_percentile function
+###############################################################################
+
+###############################################################################
+# Function      : classify_request(request, model_lookup, query_obj)
+# Description   : This function classifies one context like the predict
+#                 sub command of WSD_naive_bayes.py does, timing tagging and
+#                 scoring separately. query_obj is shared by all client 
+#                 threads, so it is only called holding tagger_lock, and 
+#                 the time spent waiting for the lock is timed too.
+# Arguments     : request - a (lexelt item, context sentence) pair
+#                 model_lookup - function giving the model for a lexelt item
+#                 query_obj - a MontyLingua object
+# Returns       : 1) The sense found
+#                 2) Seconds spent waiting for the tagger
+#                 3) Seconds spent tagging
+#                 4) Seconds spent scoring
+###############################################################################
+
+def classify_request(request, model_lookup, query_obj):
+
+    ambiguous_word, context_sent = request
+
+    wait_start_time = time.time()
+    WSD_naive_bayes.tagger_lock.acquire()
+    try:
+        start_time = time.time()
+        left_list, right_list = WSD_naive_bayes.get_context_tokens(\
+                                                context_sent, query_obj)
+    finally:
+        WSD_naive_bayes.tagger_lock.release()
+    tagged_time = time.time()
+
+    model = model_lookup(ambiguous_word)
+    lemma_list, pos_tags_list = WSD_naive_bayes.get_window_lemmas_and_tags(\
+                        left_list, right_list, model['window_size'])
+    max_prob_sense = WSD_naive_bayes.get_max_prob_sense(lemma_list, \
+                                                        pos_tags_list, model)
+    scored_time = time.time()
+
+    return max_prob_sense, start_time - wait_start_time, \
+           tagged_time - start_time, scored_time - tagged_time
+
+###############################################################################
+# End of classify_request function
+###############################################################################
+
+###############################################################################
+# Function      : run_load_client(load_state, model_lookup)
+# Description   : This function is a client thread of the load test. It
+#                 takes the next request number, waits for its scheduled
+#                 time (if there is a rate), classifies its context and
+#                 records the latencies, until the load test is over.
+# Arguments     : load_state - dict holding the requests, the schedule, the
+#                              shared request counter and the recorded
+#                              latencies (see run_load_test)
+#                 model_lookup - function giving the model for a lexelt item
+# Returns       : None.
+###############################################################################
+
+def run_load_client(load_state, model_lookup):
+
+    query_obj = WSD_naive_bayes.get_tagger()
+    request_list = load_state['request_list']
+    lock = load_state['lock']
+
+    while True:
+
+        lock.acquire()
+        request_number = load_state['next_request_number']
+        load_state['next_request_number'] = request_number + 1
+        lock.release()
+
+        if load_state['request_limit'] is not None and \
+           request_number >= load_state['request_limit']:
+            break
+
+        if load_state['rate'] > 0:
+            scheduled_time = load_state['start_time'] + \
+                             float(request_number) / load_state['rate']
+            wait_seconds = scheduled_time - time.time()
+            if wait_seconds > 0:
+                time.sleep(wait_seconds)
+        else:
+            scheduled_time = time.time()
+
+        if time.time() >= load_state['end_time']:
+            break
+
+        request = request_list[request_number % len(request_list)]
+
+        try:
+            max_prob_sense, wait_seconds, tagging_seconds, scoring_seconds = \
+                        classify_request(request, model_lookup, query_obj)
+        except Exception, error:
+            record_request_error(load_state, 'error_count', error)
+            continue
+
+        total_seconds = time.time() - scheduled_time
+
+        lock.acquire()
+        load_state['latency_dict']['total'].append(total_seconds)
+        load_state['latency_dict']['tagger_wait'].append(wait_seconds)
+        load_state['latency_dict']['tagging'].append(tagging_seconds)
+        load_state['latency_dict']['scoring'].append(scoring_seconds)
+        lock.release()
+
+###############################################################################
+# End of run_load_client function
+###############################################################################
+
+###############################################################################
+# Function      : record_request_error(load_state, count_key, error)
+# Description   : This function counts a failed request and prints the 
+#                 first error of each kind on standard error, so that the
+#                 cause is shown and not only the count.
+# Arguments     : load_state - dict holding the state of load test (see 
+#                              run_load_test)
+#                 count_key - key of the error count in load_state
+#                 error - the exception raised by the request
+# Returns       : None.
+###############################################################################
+
+def record_request_error(load_state, count_key, error):
+
+    error_kind = error.__class__.__name__
+
+    load_state['lock'].acquire()
+    load_state[count_key] = load_state[count_key] + 1
+    first_error_flag = error_kind not in load_state['error_kind_set']
+    load_state['error_kind_set'].add(error_kind)
+    load_state['lock'].release()
+
+    if first_error_flag:
+        sys.stderr.write("Request failed with " + error_kind + ": " + \
+                         str(error) + "\n")
+
+###############################################################################
+# End of record_request_error function
+###############################################################################
+
+###############################################################################
+# Function      : run_load_test(request_list, model_lookup, concurrency,
+#                               rate, duration, request_limit, 
+#                               warmup_count)
+# Description   : This function runs the warm-up requests one by one, then
+#                 runs the load test with the given number of client 
+#                 threads and gives the latencies measured.
+# Arguments     : request_list - list of (lexelt item, context sentence)
+#                                pairs replayed in a round robin
+#                 model_lookup - function giving the model for a lexelt item
+#                 concurrency - number of client threads
+#                 rate - requests per second over all threads, or 0 to send
+#                        requests as fast as possible
+#                 duration - maximum seconds to run for
+#                 request_limit - maximum number of requests, or None
+#                 warmup_count - number of requests run before measuring
+# Returns       : 1) A dict mapping each latency part to the list of its
+#                    latencies in seconds
+#                 2) Number of measured requests which failed
+#                 3) Number of warm-up requests which failed
+#                 4) Seconds the load test ran for
+###############################################################################
+
+def run_load_test(request_list, model_lookup, concurrency, rate, duration, \
+                  request_limit, warmup_count):
+
+    load_state = {}
+    load_state['request_list'] = request_list
+    load_state['rate'] = rate
+    load_state['request_limit'] = request_limit
+    load_state['next_request_number'] = 0
+    load_state['error_count'] = 0
+    load_state['warmup_error_count'] = 0
+    load_state['error_kind_set'] = set()
+    load_state['lock'] = threading.Lock()
+    load_state['latency_dict'] = dict([(part, []) for part in LATENCY_PARTS])
+
+    # load the tagger and run a few requests before measuring
+    query_obj = WSD_naive_bayes.get_tagger()
+    for i in range(0, warmup_count):
+        try:
+            classify_request(request_list[i % len(request_list)], \
+                             model_lookup, query_obj)
+        except Exception, error:
+            record_request_error(load_state, 'warmup_error_count', error)
+
+    load_state['start_time'] = time.time()
+    load_state['end_time'] = load_state['start_time'] + duration
+
+    thread_list = []
+    for i in range(0, concurrency):
+        thread = threading.Thread(target=run_load_client, \
+                                  args=(load_state, model_lookup))
+        thread.daemon = True
+        thread.start()
+        thread_list.append(thread)
+
+    for thread in thread_list:
+        thread.join()
+
+    elapsed_seconds = time.time() - load_state['start_time']
+
+    return load_state['latency_dict'], load_state['error_count'], \
+           load_state['warmup_error_count'], elapsed_seconds
+
+###############################################################################
+# End of run_load_test function
+###############################################################################
+
+###############################################################################
+# Function      : get_latency_summary(latency_list)
+# Description   : This function summarizes latencies in milliseconds.
+# Arguments     : latency_list - list of latencies in seconds
+# Returns       : 1) A dict with the mean, maximum and percentiles (as
+#                    "p50", "p99" etc.) of the latencies in milliseconds
+###############################################################################
+
+def get_latency_summary(latency_list):
+
+    sorted_latency_list = sorted(latency_list)
+    latency_summary = {}
+
+    if len(sorted_latency_list) == 0:
+        return latency_summary
+
+    latency_summary['mean'] = 1000.0 * sum(sorted_latency_list) / \
+                              len(sorted_latency_list)
+    latency_summary['max'] = 1000.0 * sorted_latency_list[-1]
+
+    for percentile in PERCENTILE_LIST:
+        latency_summary["p" + ("%g" % percentile)] = 1000.0 * \
+                            get_percentile(sorted_latency_list, percentile)
+
+    return latency_summary
+
+###############################################################################
+# End of get_latency_summary function
+###############################################################################
+
+###############################################################################
+# Function      : get_model_lookup(args)
+# Description   : This function gives the models to classify with, either
+#                 trained from the training files or served from a model
+#                 directory.
+# Arguments     : args - parsed command line arguments
+# Returns       : 1) A function giving the model for a lexelt item
+###############################################################################
+
+def get_model_lookup(args):
+
+    if args.model_dir is not None:
+        registry = WSD_naive_bayes.create_model_registry(args.model_dir, \
+                                                         args.memory_cap)
+        return lambda lexelt: WSD_naive_bayes.get_registry_model(registry, \
+                                                                 lexelt)
+
+    model_dict = {}
+    for train_file_name in args.train_file_name_list:
+        model_dict.update(WSD_naive_bayes.train_WSD_models(train_file_name, \
+                                        args.window_size, None))
+
+    return model_dict.get
+
+###############################################################################
+# End of get_model_lookup function
+###############################################################################
+
+###############################################################################
+# Function      : main()
+# Description   : Entry point for the load test.
+# Arguments     : None. Command Line Arguments in Python are retrieved from
+#                 sys.argv variable of sys module.
+# Returns       : None.
+###############################################################################
+
+def main():
+
+    parser = argparse.ArgumentParser(prog="WSD_load_test.py", \
+                description="Concurrent load test of WSD classification")
+    parser.add_argument('--train', dest='train_file_name_list', nargs='+', \
+                        help="training files (default the bundled ones)")
+    parser.add_argument('--model-dir', dest='model_dir', \
+                        help="directory of saved models to use instead")
+    parser.add_argument('--memory-cap', dest='memory_cap', type=int, \
+                        help="maximum bytes of models kept loaded from " \
+                             "model dir")
+    parser.add_argument('--test', dest='test_file_name_list', nargs='+', \
+                        help="test files whose contexts are replayed " \
+                             "(default the bundled ones)")
+    parser.add_argument('--window', dest='window_size', type=int, \
+                        default=2, help="window size (default 2)")
+    parser.add_argument('--concurrency', dest='concurrency', type=int, \
+                        default=4, help="number of client threads " \
+                                        "(default 4)")
+    parser.add_argument('--rate', dest='rate', type=float, default=0, \
+                        help="requests per second (default 0, as fast as " \
+                             "possible)")
+    parser.add_argument('--duration', dest='duration', type=float, \
+                        default=10, help="seconds to run (default 10)")
+    parser.add_argument('--requests', dest='request_limit', type=int, \
+                        help="number of requests to run")
+    parser.add_argument('--warmup', dest='warmup_count', type=int, \
+                        default=20, help="requests run before measuring " \
+                                         "(default 20)")
+    parser.add_argument('--output', dest='output_file_name', \
+                        default='load_test.json', help="JSON result file")
+
+    args = parser.parse_args()
+
+    bundled_train_file_name_list, bundled_test_file_name_list = \
+                                                    get_bundled_files()
+    if args.train_file_name_list is None:
+        args.train_file_name_list = bundled_train_file_name_list
+    if args.test_file_name_list is None:
+        args.test_file_name_list = bundled_test_file_name_list
+
+    model_lookup = get_model_lookup(args)
+
+    '''
+    Collect the contexts of test files which have a model to replay.
+    '''
+    request_list = []
+    for test_file_name in args.test_file_name_list:
+        instance_table = WSD_naive_bayes.read_WSD_instances(test_file_name)
+        for instance in \
+                WSD_naive_bayes.iter_WSD_instance_table(instance_table):
+            if model_lookup(instance.lexelt) is not None:
+                request_list.append((instance.lexelt, instance.context_sent))
+
+    if len(request_list) == 0:
+        parser.error("no test contexts with a model to replay")
+
+    print "Replaying", len(request_list), "contexts"
+
+    latency_dict, error_count, warmup_error_count, elapsed_seconds = \
+                    run_load_test(request_list, model_lookup, \
+                                  args.concurrency, args.rate, \
+                                  args.duration, args.request_limit, \
+                                  args.warmup_count)
+
+    result = {}
+    result['concurrency'] = args.concurrency
+    result['target_rate_rps'] = args.rate
+    result['duration_seconds'] = elapsed_seconds
+    result['request_count'] = len(latency_dict['total'])
+    result['error_count'] = error_count
+    result['warmup_error_count'] = warmup_error_count
+    result['throughput_rps'] = len(latency_dict['total']) / \
+                               max(elapsed_seconds, 1e-9)
+    result['latency_ms'] = {}
+    for part in LATENCY_PARTS:
+        result['latency_ms'][part] = get_latency_summary(latency_dict[part])
+
+    output_file_handle = open(args.output_file_name, 'w')
+    json.dump(result, output_file_handle, indent=2, sort_keys=True)
+    output_file_handle.write("\n")
+    output_file_handle.close()
+
+    print "Requests   :", result['request_count'], \
+          "(" + str(error_count) + " failed, " + str(warmup_error_count) + \
+          " failed in warm-up)"
+    print "Throughput : %.1f requests/s" % result['throughput_rps']
+    for part in LATENCY_PARTS:
+        latency_summary = result['latency_ms'][part]
+        if len(latency_summary) > 0:
+            print "%-11s p50 %8.2f ms  p99 %8.2f ms  max %8.2f ms" % (part, \
+                  latency_summary['p50'], latency_summary['p99'], \
+                  latency_summary['max'])
+    print "Results written into", args.output_file_name
+
+###############################################################################
+# End of main function
+###############################################################################
+
+'''
+Boilerplate syntax to specify that main() method is the entry point for
+this program.
+'''
+
+if __name__ == '__main__':
+
+    main()
+
+##############################################################################
+# End of WSD_load_test.py program
+#############################################################################
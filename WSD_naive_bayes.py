@@ -27,9 +27,286 @@
 # 
 # python WSD_naive_bayes.py -tr hard-a.xml -ts hard-a1.xml -tk hard-a.key 
 #
-#                     Please note that sequence of the inputs SHOULD be same as
-#                     shown above. i.e. -tr <training file name> 
-#                     -ts <test file name> -tk <key file name> 
+#                     The inputs can be given in any order. -tk is optional,
+#                     without it the test file is only tagged.
+#
+#                     The program also has train, predict and evaluate sub
+#                     commands, to train and save a model once and use it 
+#                     many times. predict reads the test instances from 
+#                     standard input (unless --test is given) and writes a
+#                     "lexelt instance sense" line for each instance as soon
+#                     as it is read, so it can be used in a Unix pipeline.
+#                     e.g.
+#
+# python WSD_naive_bayes.py train --train hard-a.xml --model hard-a.model
+# cat hard-a1.xml | python WSD_naive_bayes.py predict --model hard-a.model > op
+# python WSD_naive_bayes.py evaluate --output op --key hard-a.key
+#
+#                     predict can also route instances to the models of a
+#                     directory by their lexelt item with --model-dir (see
+#                     -md below). Use -h with a sub command for all options.
+#
+#                     To tag raw text documents (where ambiguous words are
+#                     not marked with <head> tags) use -rw option followed
+#                     by names of documents and -tr option followed by names
+#                     of training files. A model is trained for each 
+#                     training file and every occurrence of every ambiguous
+#                     word known to these models is tagged in a single pass
+#                     over each document. e.g.
+#
+# python WSD_naive_bayes.py -rw doc1.txt doc2.txt -tr hard-a.xml line-n.xml
+#
+#                     Output entries for raw text have the document name and
+#                     character offset of the word as instance id i.e.
+#                     hard-a doc1.txt:9 HARD1
+#
+#                     Instead of training, models saved earlier (see -sm
+#                     and -sq below) can be served from a directory with -md
+#                     option. A model for lexelt item hard-a is looked for
+#                     in hard-a.wsdq and hard-a.model files. Models are 
+#                     loaded when they are first needed and, with -mc <n>,
+#                     least recently used models are evicted to keep at 
+#                     most n bytes of models in memory. Each model looks at
+#                     the window size it was trained with, so -ws is not
+#                     needed with -md. e.g.
+#
+# python WSD_naive_bayes.py -rw doc1.txt doc2.txt -md models -mc 1000000
+#
+#                     Models saved with -sm and -sq get a <model file>.forms
+#                     file listing the forms of their ambiguous word, so
+#                     only the models of words found in the documents are
+#                     loaded. Number of model loads, hits and evictions are
+#                     printed at the end.
+#
+#                     The size of model can be bounded by pruning the lemma
+#                     counts kept for each sense and window position. Give
+#                     any of following options after the key file:
+#                     -pmc <n> = drop lemmas seen less than n times
+#                     -ptk <k> = keep only k most frequent lemmas
+#                     -pmi <t> = drop lemmas whose mutual information with
+#                                the sense is less than t bits
+#                     e.g.
+#
+# python WSD_naive_bayes.py -tr hard-a.xml -ts hard-a1.xml -tk hard-a.key -pmc 2
+#
+#                     The model size before and after pruning and the 
+#                     accuracy lost by pruning are then printed.
+#
+#                     The trained model can be saved with -sm <model file>.
+#                     With -sq <model file> it is also saved in a compact 
+#                     format, where the log Probabilities of lemmas are 
+#                     quantized to one byte and lemmas are kept in sorted 
+#                     string tables. The log10 likelihoods given by compact
+#                     model are within (2 * window size) * step / 2 of the
+#                     full precision ones, where step is the quantization
+#                     step stored in the model. This tolerance and the 
+#                     deviation seen on the test file are printed.
+#
+#                     Compact model files are mapped read-only into memory
+#                     instead of being read, so all processes serving the same
+#                     model file share one copy of it.
+#
+#                     The MontyLingua tagger takes a few seconds to load its
+#                     lexicons and rule files. It is loaded once per process
+#                     and shared by all the tagging. With -tg <snapshot file>
+#                     (--tagger-snapshot with train and predict) the loaded
+#                     tagger is saved in a binary snapshot file on first run
+#                     and later runs start from this snapshot. e.g.
+#
+# python WSD_naive_bayes.py -tr hard-a.xml -ts hard-a1.xml -tg tagger.snap
+#
+#                     Tagging the training and test files is the slowest part
+#                     of a run. With -fs <directory> (--feature-store with 
+#                     train and predict) the lemmas and POS tags around each 
+#                     ambiguous word are saved in the directory, keyed by the
+#                     hash of file contents, the tagger and the window size 
+#                     (at least 10). Later runs on the same files with the 
+#                     same or a smaller window load them instead of tagging.
+#                     e.g.
+#
+# python WSD_naive_bayes.py -tr hard-a.xml -ts hard-a1.xml -fs features -ws 3
+#
+#                     A training file can have several <lexelt> blocks, like
+#                     the full Senseval lexical sample files. A separate model
+#                     is then trained for each lexelt item, in parallel
+#                     processes (-np <n> or --processes sets their number, 
+#                     by default the number of CPUs), and each test instance
+#                     is tagged with the model of its lexelt item. -sm and
+#                     -sq (--model and --compact-model with train) then name
+#                     a directory, which gets one file per lexelt item and
+#                     can be used with -md. e.g.
+#
+# python WSD_naive_bayes.py -tr english-train.xml -ts english-test.xml -np 4
+#
+#                     For a latency budget, give predict --deadline-ms <ms>.
+#                     Tagging a context can not be interrupted, so its time
+#                     is estimated from the context length and the time per
+#                     character seen so far. When tagging would not fit in
+#                     the budget, the words from tokenization alone are used
+#                     as lemmas, and when even that would not fit, the sense
+#                     with maximum prior probability is given. The path used
+#                     (tagged, tokens or prior) is the fourth field of each 
+#                     output line and the count of each path is printed on
+#                     standard error at the end. e.g.
+#
+# python WSD_naive_bayes.py predict --model hard-a.model --deadline-ms 50 < ha.xml
+#
+#                     Long test runs can be checkpointed with -cp <directory>.
+#                     The trained models are saved there, and after every
+#                     -ci <n> test instances (default 100) the progress is 
+#                     saved. When the run is started again with the same 
+#                     files and settings, it uses the saved models and goes
+#                     on from the last checkpointed instance. The output is
+#                     the same as that of a run which was not interrupted.
+#                     e.g.
+#
+# python WSD_naive_bayes.py -tr hard-a.xml -ts hard-a1.xml -tk hard-a.key -cp ckpt
+#
+#                     predict can also run as a pipeline of parse, tag, score
+#                     and write stages connected by bounded queues (of 
+#                     --queue-size instances, default 64), so that reading,
+#                     tagging and scoring overlap. --tag-workers <n> sets 
+#                     the number of tagging processes, which are forked 
+#                     after the tagger is loaded and each have their own
+#                     copy of it (and of the lemma memo of -lc). 
+#                     --score-workers <n> sets the number of scoring 
+#                     threads. The output is in the order of the input. The
+#                     number of instances, busy time and the maximum and 
+#                     mean depth of the input queue of each stage are 
+#                     printed on standard error at the end. A 
+#                     stage whose input queue stays full is the bottleneck.
+#                     e.g.
+#
+# python WSD_naive_bayes.py predict --model-dir models --tag-workers 2 < ha.xml
+#
+#                     With predict --watch <seconds>, the files of loaded 
+#                     models (--model or --model-dir) are checked at this 
+#                     interval and a changed model is loaded in the 
+#                     background and swapped in. Instances being classified
+#                     at the time finish with the old model. Models are 
+#                     saved under a temporary name and renamed, so a new 
+#                     model can be put in place with -sm, -sq or the train 
+#                     sub command. The number of reloads, their time and the
+#                     version of each model are printed on standard error.
+#
+#                     On large, skewed training files most of the training 
+#                     time goes into tagging instances of the frequent 
+#                     senses. With -ms <count> (or --max-per-sense of the 
+#                     train and predict sub commands) only a random sample 
+#                     of at most <count> instances of each sense is tagged 
+#                     and learnt from. The sample is drawn in one pass over
+#                     the file (reservoir sampling) and the prior 
+#                     Probabilities still come from all the instances. 
+#                     -ss <seed> (--sample-seed) changes the sample.
+#                     e.g.
+#
+# python WSD_naive_bayes.py -tr hat.xml -ts ha.xml -tk ha.key -ms 200
+#
+#                     With -cw <width> (--sketch-width of the train and 
+#                     predict sub commands) the counts of lemmas at each 
+#                     window position are kept in count-min sketches of 
+#                     <width> x <depth> cells for each sense, instead of 
+#                     exact counts, so the size of a model does not grow 
+#                     with the vocabulary. The depth is set with -cd 
+#                     (--sketch-depth, default 4). A count read from a 
+#                     sketch is never too low, and with probability 
+#                     1 - e^-depth it is at most (e / width) x (instances of 
+#                     the sense) too high. These bounds are printed when the
+#                     models are trained. The features of each training 
+#                     instance are counted into the sketches as they are 
+#                     extracted, so the exact counts are never built; run 
+#                     again without -cw to see the accuracy lost. Sketched 
+#                     models can not be pruned or saved as compact models.
+#                     On the bundled files (depth 4):
+#
+#                     Corpus          Exact   Width 256   Width 1024
+#                     hard-a          90.01       89.09        89.93
+#                     interest-n      88.76       86.10        88.76
+#                     line-n          77.75       72.45        77.75
+#                     serve-v         82.89       75.36        82.74
+#                     MicrosoftIBM.n  77.22       72.86        76.94
+#                     e.g.
+#
+# python WSD_naive_bayes.py -tr hat.xml -ts ha.xml -tk ha.key -cw 1024
+#
+#                     Training, test and key files (and raw text documents)
+#                     can be compressed with gzip, bzip2 or xz. They are 
+#                     decompressed while they are read, the format being 
+#                     found from the extension (.gz, .bz2, .xz) or the first
+#                     bytes of file. xz needs the lzma module (backports.lzma
+#                     on python 2). Standard input is read as it is.
+#                     e.g.
+#
+# python WSD_naive_bayes.py -tr hat.xml.gz -ts ha.xml.bz2 -tk ha.key.gz
+#
+#                     Instead of naive Bayes, lexelt items can be classified
+#                     with a k-nearest-neighbour classifier over the 
+#                     windows of training instances, with -kn [<k>] (--knn 
+#                     of the train and predict sub commands, default 5 
+#                     neighbours). -kl <lexelt> ... (--knn-lexelts) limits 
+#                     it to the given lexelt items. The model keeps an 
+#                     inverted index from (position, lemma) to training 
+#                     instances, so only training instances sharing a lemma
+#                     at the same position are looked at. The neighbours 
+#                     vote for their sense with the number of positions 
+#                     matched. k-NN models can not be saved as compact 
+#                     models. "python WSD_benchmark.py engines" compares its
+#                     accuracy and latency with naive Bayes on the bundled 
+#                     files. e.g.
+#
+# python WSD_naive_bayes.py -tr hat.xml -ts ha.xml -tk ha.key -kn 5
+#
+#                     For lexelt items which must be classified fastest, 
+#                     -dl [<lexelt> ...] (--decision-list of the train and 
+#                     predict sub commands) compiles the counts into a 
+#                     decision list (Yarowsky) for the given lexelt items, 
+#                     or all of them. Every (position, lemma) feature is a
+#                     rule for the sense it occurs with most, ranked by the
+#                     log-likelihood ratio of the feature's counts with and
+#                     without that sense. An instance gets the sense of the
+#                     best rule matching it (the most frequent sense if 
+#                     none does), found with one lookup per window position.
+#                     Decision lists can not be combined with sketches, 
+#                     k-NN, pruning or compact models. e.g.
+#
+# python WSD_naive_bayes.py -tr hat.xml -ts ha.xml -tk ha.key -dl
+#
+#                     With -mcd <directory> (--model-cache of the train and
+#                     predict sub commands) trained models are cached in 
+#                     the directory, under the hash of the training file and
+#                     the training settings. Later runs with the same 
+#                     training file and settings load them instead of 
+#                     training again. e.g.
+#
+# python WSD_naive_bayes.py -tr hat.xml -ts ha.xml -tk ha.key -mcd models_cache
+#
+#                     Lemmas of (word, POS tag) pairs are memoised, so that
+#                     MontyLingua only lemmatizes pairs not seen before. 
+#                     -lc <size> (--lemma-cache of the train and predict sub
+#                     commands) sets how many pairs are kept (default 
+#                     100000, 0 for none); the least recently used pair is
+#                     dropped when the memo is full. With -lt <file> 
+#                     (--lemma-table) the memo is pre-warmed from a table of
+#                     "word tag lemma" lines, which is written from the memo
+#                     at the end of run if it does not exist yet. With 
+#                     either option the hits, misses and evictions of the 
+#                     memo are printed on standard error. e.g.
+#
+# python WSD_naive_bayes.py -tr hat.xml -ts ha.xml -tk ha.key -lt lemmas.txt
+#
+#                     evaluate --compare <files> tests whether the accuracy
+#                     differences of tagged output files of the same test 
+#                     file are real, with a paired bootstrap over the test
+#                     instances. It prints the accuracy of --output and each
+#                     compared file with its confidence interval, and for 
+#                     each pair of files the difference in accuracy, its 
+#                     confidence interval and p-value. --resamples (default
+#                     10000), --confidence (default 0.95) and --seed set 
+#                     the resampling. The resamples are drawn with numpy 
+#                     when it is installed, otherwise (much slower) in pure
+#                     python. e.g.
+#
+# python WSD_naive_bayes.py evaluate --output op_w2 --key ha.key --compare op_w5
 #                    
 #                     Also, this program used MontyLingua NLP toolkit developed
 #                     by Hugo Liu at MIT Media Lab. This program must be 
@@ -176,6 +453,66 @@ from MontyLingua import *
 # time module for time related functionality
 import time
 
+# cPickle module is used to save and load trained models
+import cPickle
+
+# json, struct and array modules are used for the compact model format
+import json
+import struct
+import array
+
+# threading module is used to guard the shared model registry
+import threading
+
+# argparse module is used to parse the command line arguments
+import argparse
+
+# hashlib and glob modules are used to find corpora in the feature store
+import hashlib
+import glob
+
+# multiprocessing module is used to train the models of lexelt items in 
+# parallel
+import multiprocessing
+
+# mmap module is used to share compact models between processes
+import mmap
+
+# Queue module is used to connect the stages of the prediction pipeline
+import Queue
+
+# random module is used to sample training instances of frequent senses
+import random
+
+# heapq module is used to find the nearest training instances
+import heapq
+
+# io, gzip and bz2 modules are used to read compressed corpora and keys
+import io
+import gzip
+import bz2
+
+# itertools module is used to count training windows into sketches as they
+# are extracted
+import itertools
+
+# lzma module (or its backport to python 2) is used to read xz compressed 
+# files, when it is installed
+try:
+    import lzma
+except ImportError:
+    try:
+        from backports import lzma
+    except ImportError:
+        lzma = None
+
+# numpy is used to draw and count the bootstrap resamples of evaluate 
+# --compare as array operations, when it is installed
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
 
 '''
 Set the value of debug flag. debug flag is used to decide whether to print
@@ -183,6 +520,466 @@ debug information in the output or not. This flag will be a global variable.
 '''
 debug = False
 
+'''
+First bytes of a model file written in compact format (see 
+save_compact_model)
+'''
+COMPACT_MODEL_MAGIC = "WSDQ\x01"
+
+'''
+Extensions of model files looked for by the model registry, in order of
+preference (see create_model_registry)
+'''
+MODEL_FILE_EXTENSIONS = ['.wsdq', '.model']
+
+'''
+Extension added to the name of a model file for the file listing the 
+surface forms of its ambiguous word (see save_head_word_forms)
+'''
+HEAD_FORMS_EXTENSION = '.forms'
+
+'''
+Sub commands of the command line interface (see get_argument_parser)
+'''
+SUB_COMMANDS = ['train', 'predict', 'evaluate']
+
+'''
+The MontyLingua object shared by all tagging done in this process, and the
+name of file to warm-start it from (see get_tagger). Constructing 
+MontyLingua loads all its lexicons and rule files, so it is done only once.
+'''
+tagger_obj = None
+tagger_snapshot_file_name = None
+tagger_lock = threading.Lock()
+
+'''
+Padding added around the ambiguous word when there are less than window 
+size words on a side, and its reserved id in feature matrices (see 
+get_batch_feature_matrix)
+'''
+PADDING_LEMMA = "dummyLemma"
+PADDING_POS_TAG = "DUMMY"
+PADDING_TOKEN = "dummyWord/" + PADDING_POS_TAG + "/" + PADDING_LEMMA
+PADDING_ID = 0
+
+'''
+Directory of the feature store, the name of tagger the stored features 
+come from, and the smallest window of features saved in the store (see
+get_context_feature_rows)
+'''
+feature_store_dir = None
+TAGGER_BACKEND = "MontyLingua"
+FEATURE_STORE_WINDOW = 10
+
+'''
+Directory where models trained by train_WSD_models are cached, to be used
+again by later runs with the same training file and settings (see 
+get_model_cache_file_name)
+'''
+model_cache_dir = None
+
+'''
+Ways of classifying an instance, from the most accurate to the cheapest
+(see classify_with_deadline)
+'''
+CLASSIFICATION_PATHS = ['tagged', 'tokens', 'prior']
+
+'''
+Stages of the prediction pipeline in their order, and the interval at which
+the depths of their queues are sampled (see run_WSD_pipeline)
+'''
+PIPELINE_STAGES = ['parse', 'tag', 'score', 'write']
+PIPELINE_SAMPLE_SECONDS = 0.05
+
+'''
+Default number of rows (hash functions) of the count-min sketches which 
+replace the exact feature counts with -cw (see get_feature_sketch_tables)
+'''
+SKETCH_DEPTH = 4
+
+'''
+Compressed formats of training, test and key files, found from their 
+extension or first bytes, and the size of buffer they are read with (see
+open_corpus_file)
+'''
+COMPRESSED_FILE_FORMATS = [('gzip', '.gz', "\x1f\x8b"), \
+                           ('bz2', '.bz2', "BZh"), \
+                           ('xz', '.xz', "\xfd7zXZ\x00")]
+CORPUS_BUFFER_SIZE = 1024 * 1024
+
+'''
+Default number of nearest training instances which vote for the sense in 
+the k-NN classifier (see get_knn_sense)
+'''
+KNN_NEIGHBOUR_COUNT = 5
+
+'''
+Count added to the counts of a feature with and without a sense when the
+log-likelihood ratio of a decision list rule is found (see 
+compile_decision_list)
+'''
+DECISION_LIST_SMOOTHING = 0.1
+
+'''
+Memo of the lemmas of (word, POS tag) pairs shared by all lemmatizing done in
+this process, its default size, and the name of lemma table it is pre-warmed
+from (see get_lemmatized_sent). The least recently used pair is dropped when
+the memo is full.
+'''
+LEMMA_CACHE_SIZE = 100000
+lemma_cache = {'lemma_dict': collections.OrderedDict(), \
+               'max_size': LEMMA_CACHE_SIZE, 'hit_count': 0, \
+               'miss_count': 0, 'eviction_count': 0, \
+               'lock': threading.Lock()}
+lemma_table_file_name = None
+
+'''
+Default number of bootstrap resamples and confidence level of the intervals
+of evaluate --compare (see compare_taggings)
+'''
+BOOTSTRAP_RESAMPLE_COUNT = 10000
+BOOTSTRAP_CONFIDENCE = 0.95
+
+###############################################################################
+# Function      : get_tagger()
+# Description   : This function gives the MontyLingua object shared by the
+#                 process, creating it on first use. If a snapshot file is 
+#                 set in tagger_snapshot_file_name, the object is loaded from
+#                 it, which is much faster than loading the lexicons and rule
+#                 files again. If the snapshot file does not exist yet, it is
+#                 written after the object is created.
+# Arguments     : None.
+# Returns       : 1) The shared MontyLingua object
+###############################################################################
+
+def get_tagger():
+
+    global tagger_obj
+
+    tagger_lock.acquire()
+    try:
+        if tagger_obj is not None:
+            return tagger_obj
+
+        if tagger_snapshot_file_name is not None and \
+           os.path.isfile(tagger_snapshot_file_name):
+            try:
+                snapshot_file_handle = open(tagger_snapshot_file_name, 'rb')
+                tagger_obj = cPickle.load(snapshot_file_handle)
+                snapshot_file_handle.close()
+                return tagger_obj
+            except Exception, error:
+                sys.stderr.write("Could not load tagger snapshot " + \
+                                 tagger_snapshot_file_name + ": " + \
+                                 str(error) + "\n")
+
+        tagger_obj = MontyLingua()
+
+        if tagger_snapshot_file_name is not None and \
+           not os.path.isfile(tagger_snapshot_file_name):
+            save_tagger_snapshot(tagger_obj, tagger_snapshot_file_name)
+
+        return tagger_obj
+    finally:
+        tagger_lock.release()
+
+###############################################################################
+# End of get_tagger function
+###############################################################################
+
+###############################################################################
+# Function      : save_tagger_snapshot(query_obj, snapshot_file_name)
+# Description   : This function writes a loaded MontyLingua object into a 
+#                 binary snapshot file. The file is written under a 
+#                 temporary name and renamed, so that a process starting at
+#                 the same time never reads a partly written snapshot.
+# Arguments     : query_obj - a MontyLingua object
+#                 snapshot_file_name - Name of the snapshot file
+# Returns       : None.
+###############################################################################
+
+def save_tagger_snapshot(query_obj, snapshot_file_name):
+
+    temp_file_name = snapshot_file_name + "." + str(os.getpid()) + ".tmp"
+
+    snapshot_file_handle = open(temp_file_name, 'wb')
+    cPickle.dump(query_obj, snapshot_file_handle, cPickle.HIGHEST_PROTOCOL)
+    snapshot_file_handle.close()
+
+    os.rename(temp_file_name, snapshot_file_name)
+
+###############################################################################
+# End of save_tagger_snapshot function
+###############################################################################
+
+###############################################################################
+# Function      : get_lemmatized_sent(query_obj, tagged_sent)
+# Description   : This function lemmatizes a POS-tagged sentence like
+#                 lemmatise_tagged of MontyLingua, but looks the lemma of
+#                 each (word, POS tag) pair up in lemma_cache first. Only the
+#                 tokens missing from the memo are given to MontyLingua, in
+#                 one call, and their lemmas are added to the memo.
+# Arguments     : query_obj - a MontyLingua object
+#                 tagged_sent - sentence of "word/POS" tokens
+# Returns       : 1) The sentence of "word/POS/lemma" tokens
+###############################################################################
+
+def get_lemmatized_sent(query_obj, tagged_sent):
+
+    if lemma_cache['max_size'] <= 0:
+        return query_obj.lemmatise_tagged(tagged_sent)
+
+    token_list = tagged_sent.split()
+    lemma_list = [None] * len(token_list)
+    missing_pos_list = []
+
+    lemma_dict = lemma_cache['lemma_dict']
+
+    lemma_cache['lock'].acquire()
+    try:
+        for i, token in enumerate(token_list):
+            word, slash, tag = token.rpartition('/')
+            lemma = lemma_dict.pop((word, tag), None)
+            if lemma is None:
+                missing_pos_list.append(i)
+            else:
+                # move the pair to the recently used end of the memo
+                lemma_dict[(word, tag)] = lemma
+                lemma_list[i] = lemma
+    finally:
+        lemma_cache['lock'].release()
+
+    if len(missing_pos_list) > 0:
+        missing_sent = " ".join([token_list[i] for i in missing_pos_list])
+        lemmatized_list = query_obj.lemmatise_tagged(missing_sent).split()
+
+        '''
+        MontyLingua gives one "word/POS/lemma" token for each token given to
+        it. If it did not, lemmatize the whole sentence without the memo.
+        '''
+        if len(lemmatized_list) != len(missing_pos_list):
+            add_lemma_cache_counts(0, len(token_list))
+            return query_obj.lemmatise_tagged(tagged_sent)
+
+        pair_lemma_list = []
+        for i, lemmatized_token in zip(missing_pos_list, lemmatized_list):
+            if not lemmatized_token.startswith(token_list[i] + "/"):
+                add_lemma_cache_counts(0, len(token_list))
+                return query_obj.lemmatise_tagged(tagged_sent)
+            word, slash, tag = token_list[i].rpartition('/')
+            lemma_list[i] = lemmatized_token[len(token_list[i]) + 1:]
+            pair_lemma_list.append(((word, tag), lemma_list[i]))
+
+        add_cached_lemmas(pair_lemma_list)
+
+    # count only now that the lemmas from the memo are used
+    add_lemma_cache_counts(len(token_list) - len(missing_pos_list), \
+                           len(missing_pos_list))
+
+    return " ".join([token + "/" + lemma for token, lemma in \
+                     zip(token_list, lemma_list)])
+
+###############################################################################
+# End of get_lemmatized_sent function
+###############################################################################
+
+###############################################################################
+# Function      : add_lemma_cache_counts(hit_count, miss_count)
+# Description   : This function adds to the hit and miss counts of
+#                 lemma_cache. A sentence lemmatized again without the memo
+#                 counts all its tokens as misses.
+# Arguments     : hit_count - number of tokens whose lemma came from memo
+#                 miss_count - number of tokens lemmatized by MontyLingua
+# Returns       : None.
+###############################################################################
+
+def add_lemma_cache_counts(hit_count, miss_count):
+
+    lemma_cache['lock'].acquire()
+    lemma_cache['hit_count'] += hit_count
+    lemma_cache['miss_count'] += miss_count
+    lemma_cache['lock'].release()
+
+###############################################################################
+# End of add_lemma_cache_counts function
+###############################################################################
+
+###############################################################################
+# Function      : add_cached_lemmas(pair_lemma_list)
+# Description   : This function adds lemmas of (word, POS tag) pairs to
+#                 lemma_cache, dropping the least recently used pairs if
+#                 the memo grows over its size.
+# Arguments     : pair_lemma_list - list of ((word, POS tag), lemma) tuples
+# Returns       : None.
+###############################################################################
+
+def add_cached_lemmas(pair_lemma_list):
+
+    lemma_dict = lemma_cache['lemma_dict']
+
+    lemma_cache['lock'].acquire()
+    try:
+        for pair, lemma in pair_lemma_list:
+            lemma_dict.pop(pair, None)
+            lemma_dict[pair] = lemma
+
+        while len(lemma_dict) > lemma_cache['max_size']:
+            lemma_dict.popitem(last=False)
+            lemma_cache['eviction_count'] += 1
+    finally:
+        lemma_cache['lock'].release()
+
+###############################################################################
+# End of add_cached_lemmas function
+###############################################################################
+
+###############################################################################
+# Function      : load_lemma_table(table_file_name)
+# Description   : This function pre-warms lemma_cache from a lemma table.
+#                 Each line of the table has a word, its POS tag and its
+#                 lemma separated by white space. Lines starting with # are
+#                 skipped.
+# Arguments     : table_file_name - Name of the lemma table file
+# Returns       : 1) Number of (word, POS tag) pairs read from the table
+###############################################################################
+
+def load_lemma_table(table_file_name):
+
+    pair_lemma_list = []
+
+    table_file_handle = open_corpus_file(table_file_name)
+
+    for line in table_file_handle:
+        field_list = line.split()
+        if len(field_list) == 0 or field_list[0].startswith("#"):
+            continue
+        if len(field_list) != 3:
+            raise ValueError("Bad line in lemma table " + table_file_name + \
+                             ": " + line.strip())
+        pair_lemma_list.append(((field_list[0], field_list[1]), \
+                                field_list[2]))
+
+    table_file_handle.close()
+
+    # only the last pairs of a table larger than the memo are kept
+    add_cached_lemmas(pair_lemma_list)
+
+    return len(pair_lemma_list)
+
+###############################################################################
+# End of load_lemma_table function
+###############################################################################
+
+###############################################################################
+# Function      : save_lemma_table(table_file_name)
+# Description   : This function writes the pairs in lemma_cache into a lemma
+#                 table which load_lemma_table can read, from the least to
+#                 the most recently used pair. The file is written under a
+#                 temporary name and renamed like the tagger snapshot.
+# Arguments     : table_file_name - Name of the lemma table file
+# Returns       : None.
+###############################################################################
+
+def save_lemma_table(table_file_name):
+
+    temp_file_name = table_file_name + "." + str(os.getpid()) + ".tmp"
+
+    lemma_cache['lock'].acquire()
+    try:
+        pair_lemma_list = lemma_cache['lemma_dict'].items()
+    finally:
+        lemma_cache['lock'].release()
+
+    table_file_handle = open(temp_file_name, 'w')
+    for (word, tag), lemma in pair_lemma_list:
+        # pairs with an empty field can not be read back from the table
+        if word and tag and lemma:
+            table_file_handle.write(word + " " + tag + " " + lemma + "\n")
+    table_file_handle.close()
+
+    os.rename(temp_file_name, table_file_name)
+
+###############################################################################
+# End of save_lemma_table function
+###############################################################################
+
+###############################################################################
+# Function      : print_lemma_cache_stats()
+# Description   : This function prints the hits, misses and evictions of
+#                 lemma_cache on standard error, so that the standard output
+#                 only has the tagged instances.
+# Arguments     : None.
+# Returns       : None.
+###############################################################################
+
+def print_lemma_cache_stats():
+
+    token_count = lemma_cache['hit_count'] + lemma_cache['miss_count']
+
+    sys.stderr.write("Lemma cache hits : " + \
+                     str(lemma_cache['hit_count']) + "\n")
+    sys.stderr.write("Lemma cache misses : " + \
+                     str(lemma_cache['miss_count']) + "\n")
+    if token_count > 0:
+        sys.stderr.write("Lemma cache hit rate : " + "%.4f" % \
+                (float(lemma_cache['hit_count']) / token_count) + "\n")
+    sys.stderr.write("Lemma cache evictions : " + \
+                     str(lemma_cache['eviction_count']) + "\n")
+    sys.stderr.write("Lemma cache size : " + \
+                     str(len(lemma_cache['lemma_dict'])) + "\n")
+
+###############################################################################
+# End of print_lemma_cache_stats function
+###############################################################################
+
+###############################################################################
+# Function      : open_corpus_file(file_name)
+# Description   : This function opens a training, test or key file for 
+#                 reading. Files compressed with gzip, bzip2 or xz (found 
+#                 from the extension or the first bytes of file) are 
+#                 decompressed while they are read, so they need not be
+#                 decompressed on disk first. All files are read through a
+#                 large buffer.
+# Arguments     : file_name - Name of the file
+# Returns       : 1) A file object giving the (decompressed) lines of file
+###############################################################################
+
+def open_corpus_file(file_name):
+
+    file_handle = open(file_name, 'rb')
+    magic = file_handle.read(8)
+    file_handle.close()
+
+    file_format = None
+    for format_name, extension, format_magic in COMPRESSED_FILE_FORMATS:
+        if file_name.endswith(extension) or magic.startswith(format_magic):
+            file_format = format_name
+            break
+
+    if file_format is None:
+        return open(file_name, 'r', CORPUS_BUFFER_SIZE)
+
+    if file_format == 'bz2':
+        return bz2.BZ2File(file_name, 'r', CORPUS_BUFFER_SIZE)
+
+    if file_format == 'gzip':
+        decompressed_file = gzip.GzipFile(file_name, 'rb')
+    elif lzma is not None:
+        decompressed_file = lzma.LZMAFile(file_name, 'rb')
+    else:
+        raise IOError("reading " + file_name + " needs the lzma module " + \
+                      "(backports.lzma on python 2)")
+
+    '''
+    The readline of GzipFile and LZMAFile is written in python. Read them 
+    through a buffered reader, which splits the lines in C.
+    '''
+    return io.BufferedReader(decompressed_file, CORPUS_BUFFER_SIZE)
+
+###############################################################################
+# End of open_corpus_file function
+###############################################################################
+
 ###############################################################################
 # Function      : evaluate_tagging(op_file_name,  gold_std_file_name)
 # Description   : This function calculates the overall accuracy of classifier
@@ -192,7 +989,7 @@ debug = False
 # Arguments     : op_file_name - The name of file tagged with word senses by
 #                                this program
 #                 gold_std_file_name - The name of manually tagged file
-# Returns       : None.
+# Returns       : 1) The overall accuracy (in percentage) of the tagging
 ###############################################################################
 
 def evaluate_tagging(op_file_name,  gold_std_file_name):
@@ -203,7 +1000,7 @@ def evaluate_tagging(op_file_name,  gold_std_file_name):
     '''
 
     tag_op_file_handle = open(op_file_name,'r')
-    gold_std_file_handle = open(gold_std_file_name, 'r')
+    gold_std_file_handle = open_corpus_file(gold_std_file_name)
 
     tagged_lines = tag_op_file_handle.readlines()
     gold_std_lines = gold_std_file_handle.readlines()
@@ -271,9 +1068,11 @@ def evaluate_tagging(op_file_name,  gold_std_file_name):
     '''
     Print overall accuracy.
     '''
-    print float(100) -((float(incorrect_tags_count) / \
+    accuracy = float(100) -((float(incorrect_tags_count) / \
     float(len(gold_std_lines))) *100)
 
+    print accuracy
+
     '''
     Get all the senses which appear in confusion_matrix dict. These senses only
     will be displayed in rows and columns of evaluation output. 
@@ -348,75 +1147,308 @@ def evaluate_tagging(op_file_name,  gold_std_file_name):
     if debug:
         print incorrect_tags_count
         print csv_list
+
+    return accuracy
     
 ###############################################################################
 # End of evaluate function
 ###############################################################################
 
 ###############################################################################
-# Function      : get_WSD_data(file_name)
-# Description   : This function WSD data (like word to disambiguated, its 
-#                 instances, senses of the instances and contexts) from the 
-#                 training and test files 
-# Arguments     : file_name - Name of training / test file
-# Returns       :  1) The word to be tagged, 
-#                  2) A list containing all instance ids from training file
-#                  3) A list containing all tagged senses for each instance
-#                  (This list will be empty for the test file as senses will be
-#                   tagged later.)
-#                  4) A list containing all context sentences for each instance
+# Function      : get_correctness_rows(op_file_name_list, gold_std_file_name)
+# Description   : This function finds which instances of the gold std. file
+#                 each tagged output file tags correctly. Instances are
+#                 matched by their lexelt item and instance id, so the output
+#                 files need not be in the order of gold std. file. An
+#                 instance missing from an output file is counted as wrong.
+# Arguments     : op_file_name_list - list of names of files tagged with
+#                                     word senses by this program
+#                 gold_std_file_name - The name of manually tagged file
+# Returns       : 1) A list having, for each output file, a list of 1 for
+#                    correctly and 0 for wrongly tagged instances, in the
+#                    order of gold std. file
 ###############################################################################
 
-def get_WSD_data(file_name):
+def get_correctness_rows(op_file_name_list, gold_std_file_name):
 
-    # open the file in read mode
-    file_handle = open(file_name, 'r')
+    gold_std_file_handle = open_corpus_file(gold_std_file_name)
 
-    # read the contents of file into a list
-    wsd_data_lines = file_handle.readlines()
+    gold_sense_list = []
+    for gold_line in gold_std_file_handle:
+        word_tag_pair = gold_line.split()
+        if len(word_tag_pair) >= 3:
+            gold_sense_list.append(((word_tag_pair[0], word_tag_pair[1]), \
+                                    word_tag_pair[2]))
 
-    # close the file
-    file_handle.close()
+    gold_std_file_handle.close()
 
-    '''
-    Initialize three variables to hold :
-    1) A list containing all instance ids from training file
-    2) A list containing all tagged senses for each instance
-    3) A list containing all context sentences for each instance
-    '''
-    instance_id_list = []
-    sense_id_list = []
-    context_sent_list = []
- 
-    '''
-    Initialize a variable to hold the value of word to be tagged
-    '''
-    ambiguous_word = ""
-    
-    context_flag = False
-    context_sent = ""
+    correctness_rows = []
 
-    '''
-    Iterate over the wsd_data_lines list to separate out the word to be 
-    disambiguated, instance ids, senses for those instances and the 
-    context sentence for each instance. Fill in the three lists initialized
-    above with the data separated out.
-    '''
+    for op_file_name in op_file_name_list:
 
-    for wsd_data_line in wsd_data_lines:
+        tagged_sense_dict = {}
 
-        if debug:
-            print wsd_data_line
+        op_file_handle = open_corpus_file(op_file_name)
+        for tag_line in op_file_handle:
+            word_tag_pair = tag_line.split()
+            if len(word_tag_pair) >= 3:
+                tagged_sense_dict[(word_tag_pair[0], word_tag_pair[1])] = \
+                                                            word_tag_pair[2]
+        op_file_handle.close()
 
+        correctness_rows.append([int(tagged_sense_dict.get(instance) == \
+                                     gold_sense) for instance, gold_sense \
+                                 in gold_sense_list])
 
-        '''
-        Get the word to be disambiguated from the file. For this, check if
-        the line starts with "<lexelt"  tag. If yes , then get the value of
-        item attribute for this tag.
-        '''
-        
-        if wsd_data_line.startswith('<lexelt'):
-            
+    return correctness_rows
+
+###############################################################################
+# End of get_correctness_rows function
+###############################################################################
+
+###############################################################################
+# Function      : get_bootstrap_accuracies(correctness_rows, resample_count,
+#                                          resample_seed)
+# Description   : This function draws paired bootstrap resamples of the test
+#                 instances: each resample picks as many instances as the
+#                 test set has, at random with replacement, and the same
+#                 picks are used for every output file. The accuracy of
+#                 every output file is found on each resample.
+#
+#                 Only the pattern of which files tag an instance correctly
+#                 matters for the accuracies, and there are few such
+#                 patterns. So the instances are grouped by their pattern,
+#                 and a resample is the number of picks of each pattern.
+#                 With numpy these counts are drawn for all resamples at
+#                 once from a multinomial distribution and turned into
+#                 accuracies with one matrix product, which takes the same
+#                 time for any number of instances. Without numpy the
+#                 instances of each resample are picked one by one.
+# Arguments     : correctness_rows - list of correctness lists of output
+#                                    files (see get_correctness_rows)
+#                 resample_count - number of resamples to draw
+#                 resample_seed - seed of the random resampling
+# Returns       : 1) A list having, for each output file, the list of its
+#                    accuracies (in percentage) on the resamples
+###############################################################################
+
+def get_bootstrap_accuracies(correctness_rows, resample_count, \
+                             resample_seed):
+
+    instance_count = len(correctness_rows[0])
+
+    '''
+    Find the distinct correctness patterns, the number of instances having
+    each pattern, and the pattern of each instance.
+    '''
+    pattern_index_dict = {}
+    pattern_list = []
+    pattern_instance_count_list = []
+    instance_pattern_list = []
+
+    for pattern in zip(*correctness_rows):
+        if pattern not in pattern_index_dict:
+            pattern_index_dict[pattern] = len(pattern_list)
+            pattern_list.append(pattern)
+            pattern_instance_count_list.append(0)
+        pattern_index = pattern_index_dict[pattern]
+        pattern_instance_count_list[pattern_index] += 1
+        instance_pattern_list.append(pattern_index)
+
+    if numpy is not None:
+        random_state = numpy.random.RandomState(resample_seed)
+
+        pattern_prob_array = numpy.array(pattern_instance_count_list, \
+                                         dtype=float) / instance_count
+        pick_count_matrix = random_state.multinomial(instance_count, \
+                                pattern_prob_array, size=resample_count)
+
+        # rows of pattern matrix are output files, columns are patterns
+        pattern_matrix = numpy.array(pattern_list, dtype=float).T
+        accuracy_matrix = numpy.dot(pattern_matrix, pick_count_matrix.T) * \
+                          (100.0 / instance_count)
+
+        return accuracy_matrix.tolist()
+
+    random_obj = random.Random(resample_seed)
+
+    accuracy_rows = [[] for correctness_list in correctness_rows]
+
+    for resample_index in xrange(0, resample_count):
+        pick_count_list = [0] * len(pattern_list)
+        for i in xrange(0, instance_count):
+            pick_count_list[instance_pattern_list[\
+                            int(random_obj.random() * instance_count)]] += 1
+
+        for file_index in range(0, len(correctness_rows)):
+            accuracy_rows[file_index].append(sum([pick_count * \
+                    pattern[file_index] for pick_count, pattern in \
+                    zip(pick_count_list, pattern_list)]) * 100.0 / \
+                    instance_count)
+
+    return accuracy_rows
+
+###############################################################################
+# End of get_bootstrap_accuracies function
+###############################################################################
+
+###############################################################################
+# Function      : get_bootstrap_interval(value_list, confidence)
+# Description   : This function gives the percentile confidence interval of
+#                 a statistic from its values on bootstrap resamples.
+# Arguments     : value_list - list of values of the statistic on resamples
+#                 confidence - confidence level of the interval (like 0.95)
+# Returns       : 1) The lower end of the interval
+#                 2) The upper end of the interval
+###############################################################################
+
+def get_bootstrap_interval(value_list, confidence):
+
+    sorted_value_list = sorted(value_list)
+    tail_count = int((1 - confidence) / 2 * len(sorted_value_list))
+
+    return sorted_value_list[tail_count], \
+           sorted_value_list[len(sorted_value_list) - 1 - tail_count]
+
+###############################################################################
+# End of get_bootstrap_interval function
+###############################################################################
+
+###############################################################################
+# Function      : compare_taggings(op_file_name_list, gold_std_file_name,
+#                                  resample_count, confidence, resample_seed)
+# Description   : This function tells whether the accuracy differences of
+#                 two or more tagged output files of the same test set are
+#                 real, with a paired bootstrap test. It prints the accuracy
+#                 of each file with its confidence interval, and for each
+#                 pair of files the accuracy difference, its confidence
+#                 interval and its two-sided p-value. The p-value is the
+#                 share of resamples whose difference is at least as far
+#                 from the observed difference as the observed difference
+#                 is from 0, i.e. how often a difference this large comes
+#                 up by chance when the files are equally accurate. If the
+#                 gold std. file has no instances, nothing is compared.
+# Arguments     : op_file_name_list - list of names of tagged output files
+#                 gold_std_file_name - The name of manually tagged file
+#                 resample_count - number of bootstrap resamples
+#                 confidence - confidence level of the intervals
+#                 resample_seed - seed of the random resampling
+# Returns       : 1) A list of (file name, file name, accuracy difference,
+#                    p-value) tuples for the pairs of output files (empty
+#                    when there are no instances to compare)
+###############################################################################
+
+def compare_taggings(op_file_name_list, gold_std_file_name, resample_count, \
+                     confidence, resample_seed):
+
+    correctness_rows = get_correctness_rows(op_file_name_list, \
+                                            gold_std_file_name)
+    instance_count = len(correctness_rows[0])
+
+    if instance_count == 0:
+        sys.stderr.write("No instances to compare in " + \
+                         gold_std_file_name + "\n")
+        return []
+
+    accuracy_rows = get_bootstrap_accuracies(correctness_rows, \
+                                             resample_count, resample_seed)
+
+    accuracy_list = [sum(correctness_list) * 100.0 / instance_count for \
+                     correctness_list in correctness_rows]
+
+    print "Instances :", instance_count, "  Resamples :", resample_count, \
+          "  Confidence :", confidence
+
+    for i in range(0, len(op_file_name_list)):
+        lower_accuracy, upper_accuracy = \
+                get_bootstrap_interval(accuracy_rows[i], confidence)
+        print "%-30s accuracy %8.4f  interval [%8.4f, %8.4f]" % \
+              (op_file_name_list[i], accuracy_list[i], lower_accuracy, \
+               upper_accuracy)
+
+    pair_result_list = []
+
+    for i in range(0, len(op_file_name_list)):
+        for j in range(i + 1, len(op_file_name_list)):
+            difference = accuracy_list[j] - accuracy_list[i]
+            difference_list = [accuracy_j - accuracy_i for accuracy_i, \
+                               accuracy_j in zip(accuracy_rows[i], \
+                                                 accuracy_rows[j])]
+
+            lower_difference, upper_difference = \
+                    get_bootstrap_interval(difference_list, confidence)
+
+            # a small tolerance keeps float noise from deciding the count
+            extreme_count = len([resample_difference for \
+                                 resample_difference in difference_list if \
+                                 abs(resample_difference - difference) >= \
+                                 abs(difference) - 1e-9])
+            p_value = float(extreme_count + 1) / (resample_count + 1)
+
+            print "%s - %s : difference %8.4f  interval [%8.4f, %8.4f]  " \
+                  "p-value %.4f" % (op_file_name_list[j], \
+                  op_file_name_list[i], difference, lower_difference, \
+                  upper_difference, p_value)
+
+            pair_result_list.append((op_file_name_list[i], \
+                                     op_file_name_list[j], difference, \
+                                     p_value))
+
+    return pair_result_list
+
+###############################################################################
+# End of compare_taggings function
+###############################################################################
+
+###############################################################################
+# Function      : iter_WSD_instances(wsd_data_lines)
+# Description   : This function reads the WSD data (like word to be 
+#                 disambiguated, its instances, senses of the instances and
+#                 contexts) from the lines of a training or test file. An
+#                 instance is given out as soon as its context is read, so
+#                 lines can come from a stream which has not ended yet.
+# Arguments     : wsd_data_lines - any iterable giving lines of a training /
+#                                  test file
+# Returns       : Yields a tuple for each instance having:
+#                  1) The word to be tagged (lexelt item of the instance)
+#                  2) The instance id
+#                  3) The tagged sense (None for the test file as senses 
+#                     will be tagged later)
+#                  4) The context sentence
+###############################################################################
+
+def iter_WSD_instances(wsd_data_lines):
+
+    '''
+    Initialize a variable to hold the value of word to be tagged
+    '''
+    ambiguous_word = ""
+    
+    instance_id = ""
+    sense_id = None
+    context_flag = False
+    context_sent = ""
+
+    '''
+    Iterate over the wsd_data_lines to separate out the word to be 
+    disambiguated, instance ids, senses for those instances and the 
+    context sentence for each instance.
+    '''
+
+    for wsd_data_line in wsd_data_lines:
+
+        if debug:
+            print wsd_data_line
+
+
+        '''
+        Get the word to be disambiguated from the file. For this, check if
+        the line starts with "<lexelt"  tag. If yes , then get the value of
+        item attribute for this tag.
+        '''
+        
+        if wsd_data_line.startswith('<lexelt'):
+            
             ambiguous_word =  wsd_data_line[wsd_data_line.find("\"") + 1 :\
                                             wsd_data_line.rfind("\"")]
             
@@ -445,10 +1477,7 @@ def get_WSD_data(file_name):
                 
                 instance_id = instance_id[1 : instance_id.find(" ")-1]
 
-            '''
-            Add the retrieved instance id to instance_id_list
-            '''
-            instance_id_list.append(instance_id)
+            sense_id = None
 
         '''
         Get the sense ids for each word instance from the file. For this, 
@@ -463,11 +1492,6 @@ def get_WSD_data(file_name):
 
             sense_id = sense_id_substr[sense_id_substr.find("\"") + 1 :\
                                        sense_id_substr.rfind("\"")]
-     
-            '''  
-            Add the retrieved sense id to sense_id_list
-            '''
-            sense_id_list.append(sense_id)
 
         '''
         Get the context sentences for each word instances. For this,retrieve
@@ -484,33 +1508,275 @@ def get_WSD_data(file_name):
         if wsd_data_line.startswith('</context>'):
             '''
             Strip <context> start and end tags from context sentences and
-            add the context sentences to context_sent_list
+            give out the instance
             '''
-            context_sent_list.append(context_sent.replace("\n","").\
-                                                  replace("<context>","").\
-                                                  replace("</context>",""))
+            yield ambiguous_word, instance_id, sense_id, \
+                  context_sent.replace("\n","").replace("<context>","").\
+                               replace("</context>","")
             context_sent = ""
             context_flag = False
 
+###############################################################################
+# End of iter_WSD_instances function
+###############################################################################
+
+###############################################################################
+# Class         : WSDInstance
+# Description   : The record of one instance of a training or test file, as
+#                 given out by iter_WSD_instance_table. The record has no
+#                 __dict__, and a test instance without <answer> tag has
+#                 the sense None, so the lexelt items, ids, senses and
+#                 contexts of instances can not get out of step.
+# Attributes    : lexelt - the word to be tagged (lexelt item of instance)
+#                 instance_id - the instance id
+#                 sense_id - the tagged sense (None if not tagged)
+#                 context_sent - the context sentence
+###############################################################################
+
+class WSDInstance(object):
+
+    __slots__ = ('lexelt', 'instance_id', 'sense_id', 'context_sent')
+
+    def __init__(self, lexelt, instance_id, sense_id, context_sent):
+        self.lexelt = lexelt
+        self.instance_id = instance_id
+        self.sense_id = sense_id
+        self.context_sent = context_sent
+
+###############################################################################
+# End of WSDInstance class
+###############################################################################
+
+###############################################################################
+# Function      : get_WSD_instance_table(wsd_instances)
+# Description   : This function keeps the instances given out by
+#                 iter_WSD_instances in columns instead of a list of strings
+#                 per field. Lexelt items and senses are interned into a
+#                 list of distinct values, and only their index in that list
+#                 is kept for each instance. The ids and contexts of all
+#                 instances are joined into one text buffer, and only the
+#                 offsets where they end are kept for each instance. This
+#                 takes a few bytes per instance besides the text itself.
+# Arguments     : wsd_instances - any iterable giving (lexelt item,
+#                                 instance id, sense, context sentence)
+#                                 tuples of instances
+# Returns       : 1) A dict object holding the columns of instances, to be
+#                    read with get_WSD_instance or iter_WSD_instance_table
+###############################################################################
+
+def get_WSD_instance_table(wsd_instances):
+
+    # the index 0 of value list stands for a missing sense
+    value_list = [None]
+    value_index_dict = {None: 0}
+
+    lexelt_index_array = array.array('i')
+    sense_index_array = array.array('i')
+    text_end_array = array.array('l')
+    text_part_list = []
+    text_offset = 0
+
+    for ambiguous_word, instance_id, sense_id, context_sent in wsd_instances:
+        for value, index_array in [(ambiguous_word, lexelt_index_array), \
+                                   (sense_id, sense_index_array)]:
+            if value not in value_index_dict:
+                value_index_dict[value] = len(value_list)
+                value_list.append(value)
+            index_array.append(value_index_dict[value])
+
+        for text in [instance_id, context_sent]:
+            text_part_list.append(text)
+            text_offset += len(text)
+            text_end_array.append(text_offset)
+
+    instance_table = {}
+    instance_table['value_list'] = value_list
+    instance_table['lexelt_index_array'] = lexelt_index_array
+    instance_table['sense_index_array'] = sense_index_array
+    instance_table['text_buffer'] = "".join(text_part_list)
+    instance_table['text_end_array'] = text_end_array
+
+    return instance_table
+
+###############################################################################
+# End of get_WSD_instance_table function
+###############################################################################
+
+###############################################################################
+# Function      : get_WSD_instance(instance_table, index)
+# Description   : This function gives the record of an instance kept in an
+#                 instance table.
+# Arguments     : instance_table - a dict object holding the columns of
+#                                  instances (see get_WSD_instance_table)
+#                 index - the position of instance in the table
+# Returns       : 1) A WSDInstance record of the instance
+###############################################################################
+
+def get_WSD_instance(instance_table, index):
+
+    value_list = instance_table['value_list']
+    text_buffer = instance_table['text_buffer']
+    text_end_array = instance_table['text_end_array']
+
+    if index > 0:
+        id_start = text_end_array[2 * index - 1]
+    else:
+        id_start = 0
+    id_end = text_end_array[2 * index]
+    context_end = text_end_array[2 * index + 1]
+
+    return WSDInstance(\
+                value_list[instance_table['lexelt_index_array'][index]], \
+                text_buffer[id_start:id_end], \
+                value_list[instance_table['sense_index_array'][index]], \
+                text_buffer[id_end:context_end])
+
+###############################################################################
+# End of get_WSD_instance function
+###############################################################################
+
+###############################################################################
+# Function      : iter_WSD_instance_table(instance_table)
+# Description   : This function gives out the records of all instances kept
+#                 in an instance table, in their order. The records are made
+#                 when they are given out, so only the ones still in use
+#                 take memory.
+# Arguments     : instance_table - a dict object holding the columns of
+#                                  instances (see get_WSD_instance_table)
+# Returns       : Yields a WSDInstance record for each instance
+###############################################################################
+
+def iter_WSD_instance_table(instance_table):
+
+    for index in xrange(0, get_WSD_instance_count(instance_table)):
+        yield get_WSD_instance(instance_table, index)
+
+###############################################################################
+# End of iter_WSD_instance_table function
+###############################################################################
+
+###############################################################################
+# Function      : get_WSD_instance_count(instance_table)
+# Description   : This function gives the number of instances kept in an
+#                 instance table.
+# Arguments     : instance_table - a dict object holding the columns of
+#                                  instances (see get_WSD_instance_table)
+# Returns       : 1) The number of instances
+###############################################################################
+
+def get_WSD_instance_count(instance_table):
+
+    return len(instance_table['lexelt_index_array'])
+
+###############################################################################
+# End of get_WSD_instance_count function
+###############################################################################
+
+###############################################################################
+# Function      : read_WSD_instances(file_name)
+# Description   : This function reads all instances of a training or test
+#                 file (which may have several <lexelt> blocks) into an
+#                 instance table.
+# Arguments     : file_name - Name of training / test file
+# Returns       : 1) A dict object holding the columns of instances (see
+#                    get_WSD_instance_table)
+###############################################################################
+
+def read_WSD_instances(file_name):
+
+    # open the file in read mode (decompressing it if needed)
+    file_handle = open_corpus_file(file_name)
+
+    instance_table = get_WSD_instance_table(iter_WSD_instances(file_handle))
+
+    file_handle.close()
+
+    return instance_table
+
+###############################################################################
+# End of read_WSD_instances function
+###############################################################################
+
+###############################################################################
+# Function      : get_WSD_sample_data(file_name, max_per_sense, sample_seed)
+# Description   : This function reads the training instances like 
+#                 read_WSD_instances, but keeps at most max_per_sense 
+#                 instances of each sense of each lexelt item. The kept 
+#                 instances are a uniform sample chosen in one pass over
+#                 the file with a reservoir per sense, so only the sample
+#                 is held in memory and tagged later. The full number of
+#                 instances of each sense is still counted for the priors.
+# Arguments     : file_name - Name of training file
+#                 max_per_sense - maximum number of instances kept for 
+#                                 each sense
+#                 sample_seed - seed of the random sampling
+# Returns       :  1) A dict object holding the columns of kept instances,
+#                     in the order of the file (see get_WSD_instance_table)
+#                  2) A dict object mapping each lexelt item to a dict of 
+#                     the full instance counts of its senses
+###############################################################################
+
+def get_WSD_sample_data(file_name, max_per_sense, sample_seed):
+
+    random_obj = random.Random(sample_seed)
+
+    '''
+    Reservoir sampling: the first max_per_sense instances of a sense are 
+    kept, after that the n-th instance replaces a random kept one with 
+    probability max_per_sense / n. Every instance of the sense then ends 
+    up in the sample with the same probability. The position of each 
+    instance in the file is kept to restore the file order.
+    '''
+    reservoir_dict = {}
+    sense_count_dict = collections.OrderedDict()
+
+    file_handle = open_corpus_file(file_name)
+
+    instance_index = 0
+    for ambiguous_word, instance_id, sense_id, context_sent in \
+                                            iter_WSD_instances(file_handle):
+        instance_index += 1
+        if sense_id is None:
+            continue
+
+        lexelt_sense_counts = sense_count_dict.setdefault(ambiguous_word, {})
+        seen_count = lexelt_sense_counts.get(sense_id, 0) + 1
+        lexelt_sense_counts[sense_id] = seen_count
+
+        reservoir = reservoir_dict.setdefault((ambiguous_word, sense_id), [])
+        instance = (instance_index, ambiguous_word, instance_id, sense_id, \
+                    context_sent)
+
+        if seen_count <= max_per_sense:
+            reservoir.append(instance)
+        else:
+            replace_index = random_obj.randint(0, seen_count - 1)
+            if replace_index < max_per_sense:
+                reservoir[replace_index] = instance
+
+    file_handle.close()
+
+    sample_list = []
+    for reservoir in reservoir_dict.values():
+        sample_list.extend(reservoir)
+    sample_list.sort()
+
+    instance_table = get_WSD_instance_table([instance[1:] for instance \
+                                             in sample_list])
+
     if debug:
-        print context_sent_list
-        print instance_id_list
-        print sense_id_list
-        print len(context_sent_list)
-        print len(instance_id_list)
-        print len(sense_id_list)
-        print ambiguous_word
+        print sense_count_dict
+        print len(sample_list)
 
-    # return the WSD data retrieved
-    return ambiguous_word, instance_id_list, sense_id_list, context_sent_list
+    return instance_table, sense_count_dict
 
 ###############################################################################
-# End of get_WSD_data function
+# End of get_WSD_sample_data function
 ###############################################################################
 
 ###############################################################################
 # Function      : get_coll_features(sense_id_list, context_sent_list, 
-#                                   window_size )
+#                                   window_size, corpus_file_name)
 # Description   : This function extracts the collocation features from the
 #                 training data. These features are used in learning the
 #                 naive Bayesian classifier 
@@ -523,6 +1789,9 @@ def get_WSD_data(file_name):
 #                 window-size - size of window to be considered to find 
 #                               context words i.e. value for
 #
+#                 corpus_file_name - name of training file, used to find
+#                                    its features in the feature store
+#                                    (optional)
 #
 # Returns       : 1) One dict object that has :
 #
@@ -539,7 +1808,8 @@ def get_WSD_data(file_name):
 #                   and left sides of the ambiguous target word
 ###############################################################################
 
-def get_coll_features(sense_id_list, context_sent_list, window_size):
+def get_coll_features(sense_id_list, context_sent_list, window_size, \
+                      corpus_file_name=None):
 
     '''
     The steps involved in deriving collocation features from training data are
@@ -582,163 +1852,36 @@ def get_coll_features(sense_id_list, context_sent_list, window_size):
     sense_context_words_mapping_dict = {}
     sense_pos_tags_mapping_dict = {}
 
-    query_obj = MontyLingua()
-    instance_counter = 0 
-
-    for context_sent in context_sent_list :
-
-        # convert the sent into lower case
-        context_sent =  context_sent.lower()
-
-        # replace <head> tag into an identifier @
-        context_sent = context_sent.replace(" <head>", " @").\
-                                    replace("<head> ", "@ ")
-        
-        # remove all xml tags from the sent
-        context_sent =  re.sub(r'<[/]?[\w\s\d=@]+>', r'', context_sent)
-        
-        # get the lemmas and pos tags for all words in sentence
-        tagged_sent = query_obj.tag_tokenized(query_obj.tokenize(context_sent))
-        lemmatized_sent = query_obj.lemmatise_tagged(tagged_sent)
-   
-        '''
-        Get the context words and their tags which fall within the window size 
-        '''
-        # split the lemmatized sentence by spaces
-        tags_list = lemmatized_sent.split() 
-
-        # get the position of @ tag into tags_list
-        identifier_pos = tags_list.index("@/IN/@")
-        
-        # split the tags_list to get left and right window list
-        left_list = tags_list[0:identifier_pos]
-        right_list =  tags_list[identifier_pos+2:]
-
-        '''
-        Add dummy elements to the left and right lists if their length is
-        less than the window size
-        '''
-
-        if len(left_list) < window_size:
-            temp_list  = left_list
-            left_list = []
-            dummy_element_count = window_size - len(temp_list)
-            for i in range(0, dummy_element_count):
-                left_list.append("dummyWord/DUMMY/dummyLemma")
-
-            for tag in temp_list:
-                left_list.append(tag)
-    
-            
-        if len(right_list) < window_size:
-            dummy_element_count = window_size - len(right_list)
-            for i in range(0, dummy_element_count):
-                right_list.append("dummyWord/DUMMY/dummyLemma")
-
-       
-        '''
-        Extract the context words and their POS tags which fall inside
-        the window size on both sides of target word. 
-        
-        If we consider the window size to be N1, then we need to extract
-        last N1 elements from left list and first N1 elements from the 
-        right list.
-
-        These extracted elements will then be split to get the lemmas and 
-        POS tags and they will be inserted into the dict objects 
-        sense_context_words_mapping_dict & sense_pos_tags_mapping_dict. 
-        These two dict objects will actually represent the collocational
-        features for our WSD naive Bayesian Classifier.
-        
-        To extract the last N1 elements from left list, it can be reversed 
-        first with reversed() built-in function. The usage of reversed function
-        was referred from the answer given by "Greg Hewgill" for a related 
-        question on the stackoverflow.com forum. The detailed question can be
-        found here:
-
-        http://stackoverflow.com/questions/529424/
-        traverse-a-list-in-reverse-order-in-python
-        '''
-        lemma_list = []
-        pos_tags_list = []
-
-        loop_counter = 0
-
-        for tag in reversed(left_list):
-            
-            if loop_counter == window_size:
-                break
-
-            tag_elements = tag.split("/")
-            
-            if tag_elements[2] != '':
-                lemma_list.append(tag_elements[2])
-            else:
-                lemma_list.append(tag_elements[0])
-
-            pos_tags_list.append(tag_elements[1])
-        
-            loop_counter = loop_counter + 1 
-        
-        lemma_list = list(reversed(lemma_list))
-        pos_tags_list = list(reversed(pos_tags_list))
-      
-        
-
-        right_tags_list  = right_list[0 : window_size]
-
-        for tag in right_tags_list:
-
-            tag_elements = tag.split("/")
-     
-            if tag_elements[2] != '':
-                lemma_list.append(tag_elements[2])
-            else:
-                lemma_list.append(tag_elements[0])
+    '''
+    Lemmatize and POS-tag all context sentences first, then extract the
+    features of all instances in one batch as a matrix of lemma ids and a
+    matrix of POS tag ids (see get_context_feature_rows). These are loaded
+    from the feature store instead when it has them.
+    '''
+    lemma_rows, pos_tags_rows = get_context_feature_rows(context_sent_list, \
+                                        window_size, corpus_file_name)
 
-            pos_tags_list.append(tag_elements[1])
+    '''
+    Insert the lemma and POS tag list of each instance into 
+    sense_context_words_mapping_dict & sense_pos_tags_mapping_dict.
+    The keys of these two dict objects will be sense ids for the current
+    context sentence.
+    '''
 
+    for instance_counter in range(0, len(lemma_rows)):
 
-        '''
-        Insert the extracted lemma_list and  pos_tags_list into 
-        sense_context_words_mapping_dict & sense_pos_tags_mapping_dict.
-        The keys of these two dict objects will be sense ids for the current
-        context sentence.
-        '''
         curr_instance_sense = sense_id_list[instance_counter] 
+        lemma_list = lemma_rows[instance_counter]
+        pos_tags_list = pos_tags_rows[instance_counter]
 
-        if curr_instance_sense not in sense_context_words_mapping_dict.keys():
-            value_dict = []
-            value_dict.append(lemma_list)
-            sense_context_words_mapping_dict[curr_instance_sense] = value_dict
-        
-        else:
-            value_dict = sense_context_words_mapping_dict[curr_instance_sense]
-            value_dict.append(lemma_list)
-            sense_context_words_mapping_dict[curr_instance_sense] = value_dict
-
-        
-        if curr_instance_sense not in sense_pos_tags_mapping_dict.keys():
-            value_dict = [] 
-            value_dict.append(pos_tags_list)
-            sense_pos_tags_mapping_dict[curr_instance_sense] = value_dict
-     
-        else:
-            value_dict = sense_pos_tags_mapping_dict[curr_instance_sense]
-            value_dict.append(pos_tags_list)
-            sense_pos_tags_mapping_dict[curr_instance_sense] = value_dict
-
+        sense_context_words_mapping_dict.setdefault(curr_instance_sense, \
+                                                    []).append(lemma_list)
+        sense_pos_tags_mapping_dict.setdefault(curr_instance_sense, \
+                                               []).append(pos_tags_list)
 
         if debug:
-            print left_list
-            print right_list
             print lemma_list
             print pos_tags_list
-            print sense_context_words_mapping_dict
-            print sense_pos_tags_mapping_dict
-            
-
-        instance_counter = instance_counter + 1
 
     return sense_context_words_mapping_dict, sense_pos_tags_mapping_dict
 
@@ -764,19 +1907,38 @@ def get_coll_features(sense_id_list, context_sent_list, window_size):
 
 def get_coll_feature_vector(context_sent, window_size, query_obj):
 
-    # convert the sent into lower case
-    context_sent =  context_sent.lower()
+    left_list, right_list = get_context_tokens(context_sent, query_obj)
 
-    # replace <head> tag into an identifier @
-    context_sent = context_sent.replace(" <head>", " @").\
-                                replace("<head> ", "@ ")
-    
-    # remove all xml tags from the sent
-    context_sent =  re.sub(r'<[/]?[\w\s\d=@]+>', r'', context_sent)
+    lemma_list, pos_tags_list = \
+    get_window_lemmas_and_tags(left_list, right_list, window_size)
+
+    return lemma_list, pos_tags_list
+
+###############################################################################
+# End of get_coll_feature_vector function
+###############################################################################
+
+###############################################################################
+# Function      : get_context_tokens(context_sent, query_obj)
+# Description   : This function lemmatizes and POS-tags a context sentence
+#                 and splits its tokens around the ambiguous word marked
+#                 with <head> tag.
+# Arguments     : context_sent - the sentence containing an instance of 
+#                                ambiguous word
+#                 query_obj - a MontyLingua object
+# Returns       : 1) A list of "word/POS/lemma" tokens occurring on the left
+#                    side of ambiguous word
+#                 2) A list of "word/POS/lemma" tokens occurring on the 
+#                    right side of ambiguous word
+###############################################################################
+
+def get_context_tokens(context_sent, query_obj):
+
+    context_sent = get_marked_context(context_sent)
     
     # get the lemmas and pos tags for all words in sentence
     tagged_sent = query_obj.tag_tokenized(query_obj.tokenize(context_sent))
-    lemmatized_sent = query_obj.lemmatise_tagged(tagged_sent)
+    lemmatized_sent = get_lemmatized_sent(query_obj, tagged_sent)
 
     '''
     Get the context words and their tags which fall within the window size 
@@ -791,50 +1953,121 @@ def get_coll_feature_vector(context_sent, window_size, query_obj):
     left_list = tags_list[0:identifier_pos]
     right_list =  tags_list[identifier_pos+2:]
 
-    '''
-    Add dummy elements to the left and right lists if their length is
-    less than the window size
-    '''
+    return left_list, right_list
 
-    if len(left_list) < window_size:
-        temp_list  = left_list
-        left_list = []
-        dummy_element_count = window_size - len(temp_list)
-        for i in range(0, dummy_element_count):
-            left_list.append("dummyWord/DUMMY/dummyLemma")
+###############################################################################
+# End of get_context_tokens function
+###############################################################################
 
-        for tag in temp_list:
-            left_list.append(tag)
+###############################################################################
+# Function      : get_marked_context(context_sent)
+# Description   : This function prepares a context sentence for tagging. It
+#                 lower cases the sentence, marks the ambiguous word with an
+#                 identifier @ in place of its <head> tag and removes all 
+#                 xml tags.
+# Arguments     : context_sent - the sentence containing an instance of 
+#                                ambiguous word
+# Returns       : 1) The prepared sentence
+###############################################################################
 
-        
-    if len(right_list) < window_size:
-        dummy_element_count = window_size - len(right_list)
-        for i in range(0, dummy_element_count):
-            right_list.append("dummyWord/DUMMY/dummyLemma")
+def get_marked_context(context_sent):
 
-   
-    '''
-    Extract the context words and their POS tags which fall inside
-    the window size on both sides of target word. 
+    # convert the sent into lower case
+    context_sent =  context_sent.lower()
+
+    # replace <head> tag into an identifier @
+    context_sent = context_sent.replace(" <head>", " @").\
+                                replace("<head> ", "@ ")
+    
+    # remove all xml tags from the sent
+    context_sent =  re.sub(r'<[/]?[\w\s\d=@]+>', r'', context_sent)
+
+    return context_sent
+
+###############################################################################
+# End of get_marked_context function
+###############################################################################
+
+###############################################################################
+# Function      : get_untagged_context_tokens(context_sent, query_obj)
+# Description   : This function is a cheaper version of get_context_tokens,
+#                 which only tokenizes the context sentence. The tokens are
+#                 given in the same "word/POS/lemma" form with empty POS tag
+#                 and lemma, so the words themselves are used as lemmas.
+# Arguments     : context_sent - the sentence containing an instance of 
+#                                ambiguous word
+#                 query_obj - a MontyLingua object
+# Returns       : 1) A list of "word//" tokens occurring on the left side of
+#                    ambiguous word
+#                 2) A list of "word//" tokens occurring on the right side 
+#                    of ambiguous word
+###############################################################################
+
+def get_untagged_context_tokens(context_sent, query_obj):
+
+    word_list = query_obj.tokenize(get_marked_context(context_sent)).split()
+
+    identifier_pos = word_list.index("@")
+
+    # "/" separates the parts of a token, so it can not be kept in words
+    token_list = [word.replace("/", "") + "//" for word in word_list]
+
+    left_list = token_list[0:identifier_pos]
+    right_list = token_list[identifier_pos+2:]
+
+    return left_list, right_list
+
+###############################################################################
+# End of get_untagged_context_tokens function
+###############################################################################
+
+###############################################################################
+# Function      : get_window_lemmas_and_tags(left_list, right_list, 
+#                                            window_size)
+# Description   : This function extracts the lemmas and POS tags of the 
+#                 context words falling inside the window on both sides of
+#                 an ambiguous word, from the lemmatized tokens on its left
+#                 and right.
+# Arguments     : left_list - list of "word/POS/lemma" tokens occurring on
+#                             the left side of ambiguous word
+#                 right_list - list of "word/POS/lemma" tokens occurring on
+#                              the right side of ambiguous word
+#                 window-size - size of window to be considered to find 
+#                               context words i.e. value for N1
+# Returns       : 1) A list that has lemmas of the words occurring 
+#                    within the window size on both side of ambiguous word.
+#                 2) A list that has POS_tags of the words occurring 
+#                    within the window size on both side of ambiguous word.
+###############################################################################
+
+def get_window_lemmas_and_tags(left_list, right_list, window_size):
+
+    '''
+    Extract the context words and their POS tags which fall inside
+    the window size on both sides of target word. 
     
     If we consider the window size to be N1, then we need to extract
     last N1 elements from left list and first N1 elements from the 
-    right list.
+    right list. A side having less than N1 elements is padded with dummy
+    elements on its end away from the ambiguous word, like the rows of
+    get_batch_feature_matrix.
 
-    These extracted elements will then be split to get the lemmas and 
-    POS tags and these lemmas and tags will represent collocational feature
-    vector for test data.
+    A single instance only needs its lemmas and tags as strings, so they 
+    are sliced from the tokens directly instead of going through the ids
+    of a feature matrix.
     '''
+    padding_count = max(0, window_size - len(left_list))
+    window_tags_list = [PADDING_TOKEN] * padding_count + \
+                       left_list[len(left_list) - window_size + \
+                                 padding_count:] + \
+                       right_list[0 : window_size]
+    window_tags_list.extend([PADDING_TOKEN] * (2 * window_size - \
+                                               len(window_tags_list)))
 
     lemma_list = []
     pos_tags_list = []
 
-    loop_counter = 0
-
-    for tag in reversed(left_list):
-        
-        if loop_counter == window_size:
-            break
+    for tag in window_tags_list:
 
         tag_elements = tag.split("/")
         
@@ -844,32 +2077,502 @@ def get_coll_feature_vector(context_sent, window_size, query_obj):
             lemma_list.append(tag_elements[0])
 
         pos_tags_list.append(tag_elements[1])
-    
-        loop_counter = loop_counter + 1 
-    
-    lemma_list = list(reversed(lemma_list))
-    pos_tags_list = list(reversed(pos_tags_list))
-  
-    
 
-    right_tags_list  = right_list[0 : window_size]
+    return lemma_list, pos_tags_list
 
-    for tag in right_tags_list:
+###############################################################################
+# End of get_window_lemmas_and_tags function
+###############################################################################
 
-        tag_elements = tag.split("/")
- 
-        if tag_elements[2] != '':
-            lemma_list.append(tag_elements[2])
+###############################################################################
+# Function      : create_feature_vocab()
+# Description   : This function creates an empty vocabulary mapping lemmas
+#                 and POS tags to integer ids. Id 0 is reserved for the 
+#                 padding added when there are less than window size words
+#                 on a side of ambiguous word, and maps back to the 
+#                 dummyLemma lemma and DUMMY POS tag.
+# Arguments     : None.
+# Returns       : 1) A dict object holding:
+#                    lemma_ids - dict mapping lemmas to ids
+#                    lemma_list - list of lemmas indexed by id
+#                    pos_ids - dict mapping POS tags to ids
+#                    pos_list - list of POS tags indexed by id
+#                    token_ids - dict mapping "word/POS/lemma" tokens to 
+#                                their (lemma id, POS tag id) pair
+###############################################################################
+
+def create_feature_vocab():
+
+    vocab = {}
+    vocab['lemma_ids'] = {PADDING_LEMMA: PADDING_ID}
+    vocab['lemma_list'] = [PADDING_LEMMA]
+    vocab['pos_ids'] = {PADDING_POS_TAG: PADDING_ID}
+    vocab['pos_list'] = [PADDING_POS_TAG]
+    vocab['token_ids'] = {}
+
+    return vocab
+
+###############################################################################
+# End of create_feature_vocab function
+###############################################################################
+
+###############################################################################
+# Function      : get_token_ids(token, vocab)
+# Description   : This function gives the lemma id and POS tag id of a 
+#                 "word/POS/lemma" token, adding the lemma and tag to the
+#                 vocabulary if they are new. The lemma is the word itself
+#                 when MontyLingua gives no lemma.
+# Arguments     : token - a "word/POS/lemma" token
+#                 vocab - vocabulary (as returned by create_feature_vocab)
+# Returns       : 1) A (lemma id, POS tag id) tuple
+###############################################################################
+
+def get_token_ids(token, vocab):
+
+    token_ids = vocab['token_ids'].get(token)
+
+    if token_ids is not None:
+        return token_ids
+
+    tag_elements = token.split("/")
+
+    if tag_elements[2] != '':
+        lemma = tag_elements[2]
+    else:
+        lemma = tag_elements[0]
+    pos_tag = tag_elements[1]
+
+    lemma_id = vocab['lemma_ids'].get(lemma)
+    if lemma_id is None:
+        lemma_id = len(vocab['lemma_list'])
+        vocab['lemma_list'].append(lemma)
+        vocab['lemma_ids'][lemma] = lemma_id
+
+    pos_id = vocab['pos_ids'].get(pos_tag)
+    if pos_id is None:
+        pos_id = len(vocab['pos_list'])
+        vocab['pos_list'].append(pos_tag)
+        vocab['pos_ids'][pos_tag] = pos_id
+
+    token_ids = (lemma_id, pos_id)
+    vocab['token_ids'][token] = token_ids
+
+    return token_ids
+
+###############################################################################
+# End of get_token_ids function
+###############################################################################
+
+###############################################################################
+# Function      : get_batch_feature_matrix(context_tokens_list, window_size,
+#                                          vocab, with_pos_tags)
+# Description   : This function extracts the collocational features of N
+#                 instances at once. Row i of the returned matrices holds
+#                 the ids of the window_size words on the left of ambiguous
+#                 word of instance i followed by the window_size words on 
+#                 its right, so each matrix is N x (2 * window size). The 
+#                 matrices are flat integer arrays in row major order. 
+#                 Missing words at the start or end of a sentence get the
+#                 padding id 0.
+# Arguments     : context_tokens_list - list of (left tokens, right tokens)
+#                                       pairs, one for each instance (as
+#                                       returned by get_context_tokens)
+#                 window-size - size of window to be considered to find 
+#                               context words i.e. value for N1
+#                 vocab - vocabulary (as returned by create_feature_vocab)
+#                         to which new lemmas and POS tags are added
+#                 with_pos_tags - True to also build the POS tag id matrix
+# Returns       : 1) An array of lemma ids
+#                 2) An array of POS tag ids, or None if with_pos_tags is 
+#                    False
+###############################################################################
+
+def get_batch_feature_matrix(context_tokens_list, window_size, vocab, \
+                             with_pos_tags):
+
+    row_size = 2 * window_size
+
+    # allocate the whole matrices once, filled with the padding id
+    lemma_matrix = array.array('i', [PADDING_ID]) * \
+                   (row_size * len(context_tokens_list))
+
+    if with_pos_tags:
+        pos_matrix = array.array('i', [PADDING_ID]) * len(lemma_matrix)
+    else:
+        pos_matrix = None
+
+    row_start = 0
+
+    for left_list, right_list in context_tokens_list:
+
+        '''
+        The last window_size tokens of left list go to the first half of
+        the row, aligned to its end. The first window_size tokens of right
+        list go to the second half of the row, aligned to its start.
+        '''
+        left_start = max(0, len(left_list) - window_size)
+        column = row_start + window_size - (len(left_list) - left_start)
+
+        for token in left_list[left_start:]:
+            lemma_matrix[column], pos_id = get_token_ids(token, vocab)
+            if with_pos_tags:
+                pos_matrix[column] = pos_id
+            column = column + 1
+
+        column = row_start + window_size
+
+        for token in right_list[0:window_size]:
+            lemma_matrix[column], pos_id = get_token_ids(token, vocab)
+            if with_pos_tags:
+                pos_matrix[column] = pos_id
+            column = column + 1
+
+        row_start = row_start + row_size
+
+    return lemma_matrix, pos_matrix
+
+###############################################################################
+# End of get_batch_feature_matrix function
+###############################################################################
+
+###############################################################################
+# Function      : get_feature_matrix_rows(feature_matrix, window_size, 
+#                                         id_string_list)
+# Description   : This function converts the rows of a feature id matrix 
+#                 back to lists of lemmas or POS tags.
+# Arguments     : feature_matrix - array of ids (as returned by 
+#                                  get_batch_feature_matrix)
+#                 window-size - size of window used to build the matrix
+#                 id_string_list - list of lemmas or POS tags indexed by id
+#                                  (lemma_list or pos_list of vocabulary)
+# Returns       : 1) A list with one list of lemmas or POS tags per row
+###############################################################################
+
+def get_feature_matrix_rows(feature_matrix, window_size, id_string_list):
+
+    row_size = 2 * window_size
+    row_list = []
+
+    for row_start in range(0, len(feature_matrix), row_size):
+        row_list.append([id_string_list[feature_id] for feature_id in \
+                         feature_matrix[row_start:row_start + row_size]])
+
+    return row_list
+
+###############################################################################
+# End of get_feature_matrix_rows function
+###############################################################################
+
+###############################################################################
+# Function      : get_corpus_hash(file_name)
+# Description   : This function computes the SHA-1 hash of contents of a 
+#                 corpus file. It identifies the corpus in the feature store
+#                 whatever the name or location of the file is.
+# Arguments     : file_name - name of corpus file
+# Returns       : 1) Hexadecimal SHA-1 digest of the file contents
+###############################################################################
+
+def get_corpus_hash(file_name):
+
+    sha1_obj = hashlib.sha1()
+
+    corpus_file_handle = open(file_name, 'rb')
+    while True:
+        data_block = corpus_file_handle.read(1 << 20)
+        if not data_block:
+            break
+        sha1_obj.update(data_block)
+    corpus_file_handle.close()
+
+    return sha1_obj.hexdigest()
+
+###############################################################################
+# End of get_corpus_hash function
+###############################################################################
+
+###############################################################################
+# Function      : save_feature_store(store_prefix, max_window, lemma_matrix,
+#                                    pos_matrix, vocab)
+# Description   : This function saves the feature matrices of a corpus in
+#                 the feature store. The lemma and POS tag id matrices are
+#                 written as raw integer columns into <prefix>.lemma and 
+#                 <prefix>.pos files, and the vocabulary and matrix shape 
+#                 into <prefix>.json file. The json file is written last, so
+#                 an entry is only found once it is complete.
+# Arguments     : store_prefix - path of entry without extension (see 
+#                                get_context_feature_rows)
+#                 max_window - window size of the matrices
+#                 lemma_matrix - array of lemma ids
+#                 pos_matrix - array of POS tag ids
+#                 vocab - vocabulary of the matrices
+# Returns       : None.
+###############################################################################
+
+def save_feature_store(store_prefix, max_window, lemma_matrix, pos_matrix, \
+                       vocab):
+
+    header = {}
+    header['max_window'] = max_window
+    header['instance_count'] = len(lemma_matrix) / (2 * max_window)
+    header['item_size'] = lemma_matrix.itemsize
+    header['byte_order'] = sys.byteorder
+    header['lemma_list'] = vocab['lemma_list']
+    header['pos_list'] = vocab['pos_list']
+
+    temp_suffix = "." + str(os.getpid()) + ".tmp"
+
+    for extension, feature_matrix in (('.lemma', lemma_matrix), \
+                                      ('.pos', pos_matrix)):
+        matrix_file_handle = open(store_prefix + extension + temp_suffix, \
+                                  'wb')
+        feature_matrix.tofile(matrix_file_handle)
+        matrix_file_handle.close()
+        os.rename(store_prefix + extension + temp_suffix, \
+                  store_prefix + extension)
+
+    header_file_handle = open(store_prefix + '.json' + temp_suffix, 'w')
+    # latin-1 maps every byte of lemmas to a character and back unchanged
+    json.dump(header, header_file_handle, encoding='latin-1')
+    header_file_handle.close()
+    os.rename(store_prefix + '.json' + temp_suffix, store_prefix + '.json')
+
+###############################################################################
+# End of save_feature_store function
+###############################################################################
+
+###############################################################################
+# Function      : load_feature_store(store_prefix)
+# Description   : This function loads the feature matrices of a corpus saved
+#                 by save_feature_store.
+# Arguments     : store_prefix - path of entry without extension
+# Returns       : 1) The window size of the matrices
+#                 2) An array of lemma ids
+#                 3) An array of POS tag ids
+#                 4) A vocabulary dict with lemma_list and pos_list
+###############################################################################
+
+def load_feature_store(store_prefix):
+
+    header_file_handle = open(store_prefix + '.json', 'r')
+    header = json.load(header_file_handle)
+    header_file_handle.close()
+
+    max_window = header['max_window']
+    matrix_size = header['instance_count'] * 2 * max_window
+
+    feature_matrix_list = []
+
+    for extension in ('.lemma', '.pos'):
+        feature_matrix = array.array('i')
+        if feature_matrix.itemsize != header['item_size']:
+            raise ValueError("feature store " + store_prefix + \
+                             " has incompatible integer size")
+        matrix_file_handle = open(store_prefix + extension, 'rb')
+        feature_matrix.fromfile(matrix_file_handle, matrix_size)
+        matrix_file_handle.close()
+        if header['byte_order'] != sys.byteorder:
+            feature_matrix.byteswap()
+        feature_matrix_list.append(feature_matrix)
+
+    vocab = {}
+    vocab['lemma_list'] = [lemma.encode('latin-1') for lemma in \
+                           header['lemma_list']]
+    vocab['pos_list'] = [pos_tag.encode('latin-1') for pos_tag in \
+                         header['pos_list']]
+
+    return max_window, feature_matrix_list[0], feature_matrix_list[1], vocab
+
+###############################################################################
+# End of load_feature_store function
+###############################################################################
+
+###############################################################################
+# Function      : get_window_feature_matrix(feature_matrix, max_window, 
+#                                           window_size)
+# Description   : This function cuts the feature matrix of a smaller window
+#                 out of a feature matrix built with a larger window. As 
+#                 rows hold the left words aligned to the ambiguous word,
+#                 the smaller window is the middle 2 * window size columns
+#                 of each row.
+# Arguments     : feature_matrix - array of ids with 2 * max_window columns
+#                 max_window - window size of feature_matrix
+#                 window_size - window size of the matrix to be returned
+# Returns       : 1) An array of ids with 2 * window_size columns
+###############################################################################
+
+def get_window_feature_matrix(feature_matrix, max_window, window_size):
+
+    if window_size == max_window:
+        return feature_matrix
+
+    row_size = 2 * max_window
+    window_matrix = array.array('i')
+
+    for row_start in range(max_window - window_size, len(feature_matrix), \
+                           row_size):
+        window_matrix.extend(feature_matrix[row_start:row_start + \
+                                            2 * window_size])
+
+    return window_matrix
+
+###############################################################################
+# End of get_window_feature_matrix function
+###############################################################################
+
+###############################################################################
+# Function      : get_context_feature_matrices(context_sent_list, 
+#                                              window_size, corpus_file_name)
+# Description   : This function gives the ids of lemmas and POS tags of 
+#                 context words within the window for all instances of a 
+#                 corpus. When a feature store directory is set 
+#                 (feature_store_dir), the features are loaded from an entry
+#                 of the store for the same corpus contents, tagger and a 
+#                 window at least as large. Otherwise the instances are 
+#                 tagged and, with a store, saved for a window of at least 
+#                 FEATURE_STORE_WINDOW so that smaller windows can reuse it.
+# Arguments     : context_sent_list - list containing all context sentences 
+#                                     for each instance
+#                 window-size - size of window to be considered to find 
+#                               context words i.e. value for N1
+#                 corpus_file_name - name of file the context sentences were
+#                                    read from, or None to not use the store
+# Returns       : 1) An array of lemma ids with 2 * window_size columns
+#                 2) An array of POS tag ids with 2 * window_size columns
+#                 3) The vocabulary of the ids (see create_feature_vocab)
+###############################################################################
+
+def get_context_feature_matrices(context_sent_list, window_size, \
+                                 corpus_file_name):
+
+    max_window = window_size
+    feature_matrices = None
+
+    if feature_store_dir is not None and corpus_file_name is not None:
+
+        key_prefix = os.path.join(feature_store_dir, \
+                                  get_corpus_hash(corpus_file_name) + "." + \
+                                  TAGGER_BACKEND + ".w")
+
+        # use the entry with the smallest window that is large enough
+        stored_window_list = []
+        for header_file_name in glob.glob(key_prefix + "*.json"):
+            stored_window = header_file_name[len(key_prefix):-len('.json')]
+            if stored_window.isdigit() and int(stored_window) >= window_size:
+                stored_window_list.append(int(stored_window))
+
+        if len(stored_window_list) > 0:
+            max_window, lemma_matrix, pos_matrix, vocab = \
+            load_feature_store(key_prefix + str(min(stored_window_list)))
+            feature_matrices = (lemma_matrix, pos_matrix)
         else:
-            lemma_list.append(tag_elements[0])
+            max_window = max(window_size, FEATURE_STORE_WINDOW)
 
-        pos_tags_list.append(tag_elements[1])
+    if feature_matrices is None:
 
+        query_obj = get_tagger()
+        context_tokens_list = []
 
-    return lemma_list, pos_tags_list
+        for context_sent in context_sent_list:
+            context_tokens_list.append(get_context_tokens(context_sent, \
+                                                          query_obj))
+
+        vocab = create_feature_vocab()
+        lemma_matrix, pos_matrix = get_batch_feature_matrix(\
+                    context_tokens_list, max_window, vocab, True)
+
+        if feature_store_dir is not None and corpus_file_name is not None:
+            if not os.path.isdir(feature_store_dir):
+                os.makedirs(feature_store_dir)
+            save_feature_store(key_prefix + str(max_window), max_window, \
+                               lemma_matrix, pos_matrix, vocab)
+
+    lemma_matrix = get_window_feature_matrix(lemma_matrix, max_window, \
+                                             window_size)
+    pos_matrix = get_window_feature_matrix(pos_matrix, max_window, \
+                                           window_size)
+
+    return lemma_matrix, pos_matrix, vocab
 
 ###############################################################################
-# End of get_coll_feature_vector function
+# End of get_context_feature_matrices function
+###############################################################################
+
+###############################################################################
+# Function      : get_context_feature_rows(context_sent_list, window_size,
+#                                          corpus_file_name)
+# Description   : This function gives the lemmas and POS tags of context 
+#                 words within the window for all instances of a corpus, 
+#                 from the matrices of get_context_feature_matrices.
+# Arguments     : context_sent_list - list containing all context sentences 
+#                                     for each instance
+#                 window-size - size of window to be considered to find 
+#                               context words i.e. value for N1
+#                 corpus_file_name - name of file the context sentences were
+#                                    read from, or None to not use the store
+# Returns       : 1) A list with the list of lemmas of each instance
+#                 2) A list with the list of POS tags of each instance
+###############################################################################
+
+def get_context_feature_rows(context_sent_list, window_size, \
+                             corpus_file_name):
+
+    lemma_matrix, pos_matrix, vocab = get_context_feature_matrices(\
+                        context_sent_list, window_size, corpus_file_name)
+
+    lemma_rows = get_feature_matrix_rows(lemma_matrix, window_size, \
+                                         vocab['lemma_list'])
+    pos_tags_rows = get_feature_matrix_rows(pos_matrix, window_size, \
+                                            vocab['pos_list'])
+
+    return lemma_rows, pos_tags_rows
+
+###############################################################################
+# End of get_context_feature_rows function
+###############################################################################
+
+###############################################################################
+# Function      : iter_context_lemmas(context_sent_list, window_size,
+#                                     corpus_file_name)
+# Description   : This function gives the lemmas of context words within 
+#                 the window of each instance of a corpus, one instance at
+#                 a time, so that the windows of all instances are never 
+#                 held together. With a feature store the ids of the 
+#                 stored matrices are turned into lemmas a row at a time 
+#                 (see get_context_feature_matrices). Otherwise each 
+#                 instance is tagged only when its lemmas are asked for.
+# Arguments     : context_sent_list - list containing all context sentences 
+#                                     for each instance
+#                 window-size - size of window to be considered to find 
+#                               context words i.e. value for N1
+#                 corpus_file_name - name of file the context sentences were
+#                                    read from, or None to not use the store
+# Returns       : 1) A generator of the list of lemmas of each instance
+###############################################################################
+
+def iter_context_lemmas(context_sent_list, window_size, corpus_file_name):
+
+    if feature_store_dir is not None and corpus_file_name is not None:
+
+        lemma_matrix, pos_matrix, vocab = get_context_feature_matrices(\
+                        context_sent_list, window_size, corpus_file_name)
+        lemma_id_list = vocab['lemma_list']
+        row_size = 2 * window_size
+
+        for row_start in range(0, len(lemma_matrix), row_size):
+            yield [lemma_id_list[lemma_id] for lemma_id in \
+                   lemma_matrix[row_start:row_start + row_size]]
+
+    else:
+
+        query_obj = get_tagger()
+
+        for context_sent in context_sent_list:
+            lemma_list, pos_tags_list = get_coll_feature_vector(\
+                                context_sent, window_size, query_obj)
+            yield lemma_list
+
+###############################################################################
+# End of iter_context_lemmas function
 ###############################################################################
 
 ###############################################################################
@@ -964,390 +2667,4528 @@ def get_coll_feature_prob(lemma_list, pos_tags_list, \
 ###############################################################################
 
 ###############################################################################
-# Function      : main()
-# Description   : Entry point for the project.
-# Arguments     : None. Command Line Arguments in Python are retrieved from
-#                 sys.argv variable of sys module.
-# Returns       : None.
+# Function      : get_feature_count_tables(sense_context_words_mapping_dict)
+# Description   : This function counts, for every sense and every window 
+#                 position, the number of times each lemma occurs at that
+#                 position in training data.
+# Arguments     : sense_context_words_mapping_dict - dict storing mapping
+#                 of senses to the context words (as returned by 
+#                 get_coll_features)
+# Returns       : 1) A dict object which maps each sense to a list having one
+#                    dict per window position. These dicts map a lemma to 
+#                    its count at that position.
+#                 2) A dict object which maps each sense to the number of 
+#                    training instances tagged with it
 ###############################################################################
-def main():
-    
-    '''
-    Check if any command line argument is passed to program. If not 
-    throw error showing proper sample usage. 
-    '''
-
-    if (len(sys.argv) > 1):
-        if debug:
-            print "At least one parameter passed to program !"
-
-        '''
-        Get the values for test, training and gold std. files
-        from sys.argv command line arguments and store them into 
-        different variables.
-        '''
 
-        train_file_name = sys.argv[2]
-        test_file_name = sys.argv[4]
-        gold_std_file_name = sys.argv[6]
+def get_feature_count_tables(sense_context_words_mapping_dict):
 
-        if debug:
-            print train_file_name
-            print test_file_name
-        
-        '''
-        create the output file. It will have the name as op_file
-        '''
-        op_file_handle  = open("op_file", 'w')
+    sense_position_counts_dict = {}
+    sense_instance_count_dict = {}
 
-        
-        '''
-        Retrieve the training data from the training file. Training file for 
-        this application is an xml file, which has specific tags for various
-        training data items used in WSD. The details of tags and corresponding 
-        training data items are as follows:
-
-        ----------------------------------------------------------------------
-        |  Tag  |  Attribute  |     Usage / Data items represented by tag    |
-        ----------------------------------------------------------------------
-        |lexet  |  item       |  Ambiguous word to be tagged by WSD          |
-        ----------------------------------------------------------------------
-        |instance|  id        |  Instance id for an instance of word         |
-        ----------------------------------------------------------------------
-        |answer |  senseid    |  Word sense associated with word instance    |
-        ----------------------------------------------------------------------
-        |context| ----------- |  Context usage of word sense                 |
-        ----------------------------------------------------------------------
-
-        To retrieve above mentioned training data from training file, call
-        get_WSD_data() function.
-
-        This function takes name of file from which WSD data is to be retrieved
-        as an input and returns following data items for the training file:
-
-        1) The ambiguous word to be tagged, 
-        2) A list containing all instance ids from training file
-        3) A list containing all tagged senses for each instance
-        4) A list containing all context sentences for each instance  
-        '''
-        ambiguous_word, instance_id_list, sense_id_list, context_sent_list = \
-                                                get_WSD_data(train_file_name)
+    for sense in sense_context_words_mapping_dict.keys():
 
+        sense_context_words_lists = sense_context_words_mapping_dict[sense]
+        position_counts_list = []
 
-        '''
-        Get the list of unique senses possible for an ambiguous word 
-        from WSD data points retrieved above. 
-        
-        For this, in built 'set' function can be used. set
-        function takes a list and converts it to a set eliminating duplicate 
-        elements of the list. This set is required to be converted into list
-        again for creating list out of this set. Usage of set function to 
-        find distinct elements from a list was borrowed from a blog entry 
-        present online at :
-        
-        http://mattdickenson.com/2011/12/31/find-unique-values-in-list-python/
+        for context_word_list in sense_context_words_lists:
 
+            # add one counts dict for each window position on first use
+            while len(position_counts_list) < len(context_word_list):
+                position_counts_list.append({})
 
-        Also get the freq counts for each unique sense. These freq counts will
-        be stored into a dict object sense_feq_dict, which has word senses as
-        its keys and freq counts for each key sense as the values.
-        '''
+            for i in range(0, len(context_word_list)):
+                lemma = context_word_list[i]
+                lemma_counts_dict = position_counts_list[i]
+                lemma_counts_dict[lemma] = lemma_counts_dict.get(lemma, 0) + 1
 
-        # get the distinct senses and store them into a list
-        sense_list = list(set(sense_id_list))
+        sense_position_counts_dict[sense] = position_counts_list
+        sense_instance_count_dict[sense] = len(sense_context_words_lists)
 
-        if debug:
-            print sense_list
-        
-        # initialize a dict obj to store the freq count for each sense
-        sense_freq_dict = {}
+    return sense_position_counts_dict, sense_instance_count_dict
 
-        # iterate over the senses_list to get freq for each sense 
-        for word_sense in sense_list:
-            sense_freq_dict[word_sense] =  sense_id_list.count(word_sense) 
-    
-        if debug:
-            print sense_freq_dict 
-        
-        '''
-        Calculate the prior Probabilities for naive Bayesian classifier by using
-        the freq counts from sense_freq_dict. The prior probability for a word
-        sense is nothing but it's freq count in training data divided by total
-        instances present in the training data.  The prior Probabilities 
-        calculated here will be used later in WSD task and will be stored in a 
-        dict object sense_to_prior_mapping_dict which has mapping of each sense
-        to its prior probability.
-        '''
+###############################################################################
+# End of get_feature_count_tables function
+###############################################################################
 
-        # initialize sense_to_prior_mapping_dict object
-        sense_to_prior_mapping_dict = {}
-        
-        # calculate total number of ambiguous word instance
-        total_count =  len(instance_id_list)
+###############################################################################
+# Function      : get_count_feature_prob(lemma_list, sense_position_counts_dict,
+#                                        sense_instance_count_dict, sense_list)
+# Description   : This function calculates the collocation feature 
+#                 Probabilities (likelihood Probabilities) for each word 
+#                 sense from the feature count tables. It gives the same
+#                 Probabilities as get_coll_feature_prob, but looks up the
+#                 count of a lemma at a position instead of scanning all 
+#                 training contexts of a sense.
+# Arguments     : lemma_list - list of lemmas of context words
+#                 sense_position_counts_dict - dict storing the counts of
+#                 lemmas at each window position for each sense
+#                 sense_instance_count_dict - dict storing number of training
+#                 instances of each sense
+#                 sense_list - list of senses
+# Returns       : 1) A dict object storing mapping of senses to their 
+#                    likelihood Probabilities
+###############################################################################
 
-        # iterate over the sense_list to get the prior Probabilities
-        for sense in sense_list:
-            sense_to_prior_mapping_dict[sense] =\
-            float(sense_freq_dict[sense]) / float(total_count)            
+def get_count_feature_prob(lemma_list, sense_position_counts_dict, \
+                           sense_instance_count_dict, sense_list):
 
+    # initialize a dict object to store likelihood Probabilities
+    sense_to_lkhd_mapping_dict = {}
 
-        '''
-        Start building features for naive Bayesian classifier.
+    for sense in sense_list:
 
-        The features extracted here follow the approaches given in text book:
-        "Speech and Language processing" by Jurafsky-Martin (section 20.2.1)
+        position_counts_list = sense_position_counts_dict[sense]
+        total_count_for_sense = sense_instance_count_dict[sense]
 
-         Features are extracted by this application are:
-        
-        1) Collocational features: The words and POS-tags of the words on right
-        and left side of the word tagged with the sense within a specific 
-        word window size (say 'N1').
+        lkhd_prob = 0
 
-        To retrieve collocational features for naive Bayesian classifier, call
-        a function get_coll_features(). This function takes following inputs:
+        for i in range(0, len(lemma_list)):
 
-        a) list containing all tagged senses for each instance
-        b) list containing all context sentences for each instance
-        c) size of window to be considered to find context words i.e. value for
-        N1
+            feature_count = position_counts_list[i].get(lemma_list[i], 0)
 
-        And it returns two dict object
+            if feature_count != 0:
+                feature_prob = float(feature_count) / \
+                               float(total_count_for_sense)
+            else:
+                # smoothing for unseen feature, same as get_coll_feature_prob
+                feature_prob = pow(10,-9)
+
+            # multiply all feature Probabilities in log space
+            lkhd_prob = lkhd_prob + math.log10(feature_prob)
+
+        # set the likelihood prob for each sense 
+        sense_to_lkhd_mapping_dict[sense] = pow(10,lkhd_prob)
+
+    return sense_to_lkhd_mapping_dict
+
+###############################################################################
+# End of get_count_feature_prob function
+###############################################################################
+
+###############################################################################
+# Function      : prune_feature_counts(sense_position_counts_dict,
+#                                      sense_instance_count_dict, min_count,
+#                                      top_k, mi_threshold)
+# Description   : This function prunes the feature count tables to bound the
+#                 size of model. Pruned lemmas are treated as unseen 
+#                 features while scoring.
+# Arguments     : sense_position_counts_dict - dict storing the counts of
+#                 lemmas at each window position for each sense
+#                 sense_instance_count_dict - dict storing number of training
+#                 instances of each sense
+#                 min_count - lemmas occurring less than these many times at
+#                             a position for a sense are removed
+#                 top_k - only these many most frequent lemmas are kept at
+#                         each position for each sense
+#                 mi_threshold - a lemma is removed from a position (for all 
+#                                senses) if the mutual information (in bits)
+#                                between its occurrence at that position and
+#                                the sense is below this value
+#                 (Any of the last three arguments can be None to not apply
+#                  that criterion.)
+# Returns       : 1) A new dict object with the pruned counts
+###############################################################################
+
+def prune_feature_counts(sense_position_counts_dict, \
+                         sense_instance_count_dict, min_count, top_k, \
+                         mi_threshold):
+
+    sense_list = sense_position_counts_dict.keys()
+    total_count = sum(sense_instance_count_dict.values())
+
+    position_count = 0
+    for sense in sense_list:
+        position_count = max(position_count, \
+                             len(sense_position_counts_dict[sense]))
+
+    '''
+    Find the (position, lemma) pairs which carry too little information
+    about the sense. The mutual information is calculated between the binary
+    event "lemma occurs at the position" and the sense, from the 
+    unpruned counts.
+    '''
+    low_mi_features = set()
+
+    if mi_threshold is not None:
+        for i in range(0, position_count):
+
+            lemma_set = set()
+            for sense in sense_list:
+                lemma_set.update(sense_position_counts_dict[sense][i].keys())
+
+            for lemma in lemma_set:
+
+                lemma_count = 0
+                for sense in sense_list:
+                    lemma_counts_dict = sense_position_counts_dict[sense][i]
+                    lemma_count = lemma_count + lemma_counts_dict.get(lemma, 0)
+
+                mutual_info = 0.0
+                for sense in sense_list:
+                    sense_count = sense_instance_count_dict[sense]
+                    joint_count = sense_position_counts_dict[sense][i].\
+                                  get(lemma, 0)
+
+                    for count, marginal_count in \
+                            ((joint_count, lemma_count), \
+                             (sense_count - joint_count, \
+                              total_count - lemma_count)):
+                        if count == 0:
+                            continue
+                        mutual_info = mutual_info + \
+                            (float(count) / total_count) * \
+                            math.log(float(count) * total_count / \
+                                     (float(marginal_count) * sense_count), 2)
+
+                if mutual_info < mi_threshold:
+                    low_mi_features.add((i, lemma))
+
+    pruned_counts_dict = {}
+
+    for sense in sense_list:
+        pruned_position_list = []
+
+        for i in range(0, len(sense_position_counts_dict[sense])):
+            lemma_counts_list = []
+
+            for lemma, count in sense_position_counts_dict[sense][i].items():
+                if (i, lemma) in low_mi_features:
+                    continue
+                if min_count is not None and count < min_count:
+                    continue
+                lemma_counts_list.append((lemma, count))
+
+            if top_k is not None:
+                # sort on count first and on lemma to break ties same way
+                lemma_counts_list.sort(key=lambda pair: (-pair[1], pair[0]))
+                lemma_counts_list = lemma_counts_list[0:top_k]
+
+            pruned_position_list.append(dict(lemma_counts_list))
+
+        pruned_counts_dict[sense] = pruned_position_list
+
+    return pruned_counts_dict
+
+###############################################################################
+# End of prune_feature_counts function
+###############################################################################
+
+###############################################################################
+# Function      : get_model_size(sense_position_counts_dict)
+# Description   : This function gives the size of a model as the number of
+#                 (sense, position, lemma) entries in its count tables.
+# Arguments     : sense_position_counts_dict - dict storing the counts of
+#                 lemmas at each window position for each sense
+# Returns       : 1) Number of entries in the count tables
+###############################################################################
+
+def get_model_size(sense_position_counts_dict):
+
+    model_size = 0
+
+    for position_counts_list in sense_position_counts_dict.values():
+        for lemma_counts_dict in position_counts_list:
+            model_size = model_size + len(lemma_counts_dict)
+
+    return model_size
+
+###############################################################################
+# End of get_model_size function
+###############################################################################
+
+###############################################################################
+# Function      : get_sketch_cells(lemma, sketch_width, sketch_depth)
+# Description   : This function finds the cells of a lemma in a count-min 
+#                 sketch, one in each row. The rows use independent hash 
+#                 functions taken from the MD5 digest of lemma, so the 
+#                 cells are the same on every machine and in every run.
+# Arguments     : lemma - the lemma to find the cells of
+#                 sketch_width - number of cells in each row
+#                 sketch_depth - number of rows
+# Returns       : 1) A list of indices into the sketch array, one per row
+###############################################################################
+
+def get_sketch_cells(lemma, sketch_width, sketch_depth):
+
+    # an MD5 digest gives four 32 bit hash values
+    hash_bytes = ""
+    block_counter = 0
+    while len(hash_bytes) < 4 * sketch_depth:
+        hash_bytes = hash_bytes + hashlib.md5(chr(block_counter) + \
+                                              lemma).digest()
+        block_counter = block_counter + 1
+
+    hash_values = struct.unpack('<' + str(sketch_depth) + 'I', \
+                                hash_bytes[0:4 * sketch_depth])
+
+    cell_list = []
+    for row in range(0, sketch_depth):
+        cell_list.append(row * sketch_width + hash_values[row] % sketch_width)
+
+    return cell_list
+
+###############################################################################
+# End of get_sketch_cells function
+###############################################################################
+
+###############################################################################
+# Function      : get_feature_sketch_tables(sense_lemmas_pairs, 
+#                                           sketch_width, sketch_depth)
+# Description   : This function counts lemmas at each window position for 
+#                 each sense like get_feature_count_tables, but into 
+#                 count-min sketches of fixed size instead of dicts, so the
+#                 memory taken by the counts does not grow with the 
+#                 vocabulary. A lemma adds one to its cell in every row of
+#                 the sketch, and its count is read as the smallest of 
+#                 these cells (see get_sketch_count). The instances are 
+#                 counted as they come from sense_lemmas_pairs, which need
+#                 not hold them all at once (see iter_context_lemmas).
+#
+#                 Error bounds: a count read from a sketch is never below
+#                 the true count, and with probability at least 1 - delta
+#                 it is at most epsilon * N above it, where 
+#                 epsilon = e / sketch_width, delta = e ^ -sketch_depth and
+#                 N is the number of training instances of the sense (see 
+#                 get_sketch_error_bounds).
+# Arguments     : sense_lemmas_pairs - iterable of (sense, list of lemmas of
+#                                      context words) pairs, one for each
+#                                      training instance
+#                 sketch_width - number of cells in each row of a sketch
+#                 sketch_depth - number of rows of a sketch
+# Returns       : 1) A dict object which maps each sense to a list having 
+#                    one sketch (array of sketch_depth * sketch_width 
+#                    counts) per window position
+#                 2) A dict object which maps each sense to the number of 
+#                    training instances tagged with it
+###############################################################################
+
+def get_feature_sketch_tables(sense_lemmas_pairs, sketch_width, \
+                              sketch_depth):
+
+    sense_position_sketch_dict = {}
+    sense_instance_count_dict = {}
+
+    for sense, context_word_list in sense_lemmas_pairs:
+
+        position_sketch_list = sense_position_sketch_dict.setdefault(sense, \
+                                                                     [])
+        sense_instance_count_dict[sense] = \
+        sense_instance_count_dict.get(sense, 0) + 1
+
+        # add one empty sketch for each window position on first use
+        while len(position_sketch_list) < len(context_word_list):
+            position_sketch_list.append(array.array('I', [0]) * \
+                                        (sketch_width * sketch_depth))
+
+        for i in range(0, len(context_word_list)):
+            sketch = position_sketch_list[i]
+            for cell in get_sketch_cells(context_word_list[i], \
+                                         sketch_width, sketch_depth):
+                sketch[cell] = sketch[cell] + 1
+
+    return sense_position_sketch_dict, sense_instance_count_dict
+
+###############################################################################
+# End of get_feature_sketch_tables function
+###############################################################################
+
+###############################################################################
+# Function      : get_sketch_count(sketch, cell_list)
+# Description   : This function reads the count of a lemma from a count-min
+#                 sketch.
+# Arguments     : sketch - array of counts of the sketch
+#                 cell_list - cells of the lemma (see get_sketch_cells)
+# Returns       : 1) The estimated count of lemma
+###############################################################################
+
+def get_sketch_count(sketch, cell_list):
+
+    return min([sketch[cell] for cell in cell_list])
+
+###############################################################################
+# End of get_sketch_count function
+###############################################################################
+
+###############################################################################
+# Function      : get_sketch_feature_prob(lemma_list, model)
+# Description   : This function calculates the likelihood Probabilities of
+#                 each sense like get_count_feature_prob, for a model whose
+#                 counts are kept in count-min sketches.
+# Arguments     : lemma_list - list of lemmas of context words
+#                 model - dict object holding the model (see 
+#                         get_WSD_model)
+# Returns       : 1) A dict object storing mapping of senses to their 
+#                    likelihood Probabilities
+###############################################################################
+
+def get_sketch_feature_prob(lemma_list, model):
+
+    sense_list = model['sense_list']
+    sense_position_sketch_dict = model['sense_position_sketch_dict']
+    sense_instance_count_dict = model['sense_instance_count_dict']
+
+    # the cells of a lemma are the same in the sketches of all senses
+    cells_list = [get_sketch_cells(lemma, model['sketch_width'], \
+                                   model['sketch_depth']) \
+                  for lemma in lemma_list]
+
+    # initialize a dict object to store likelihood Probabilities
+    sense_to_lkhd_mapping_dict = {}
+
+    for sense in sense_list:
+
+        position_sketch_list = sense_position_sketch_dict[sense]
+        total_count_for_sense = sense_instance_count_dict[sense]
+
+        lkhd_prob = 0
+
+        for i in range(0, len(lemma_list)):
+
+            feature_count = get_sketch_count(position_sketch_list[i], \
+                                             cells_list[i])
+
+            if feature_count != 0:
+                feature_prob = float(feature_count) / \
+                               float(total_count_for_sense)
+            else:
+                # smoothing for unseen feature, same as get_coll_feature_prob
+                feature_prob = pow(10,-9)
+
+            # multiply all feature Probabilities in log space
+            lkhd_prob = lkhd_prob + math.log10(feature_prob)
+
+        # set the likelihood prob for each sense 
+        sense_to_lkhd_mapping_dict[sense] = pow(10,lkhd_prob)
+
+    return sense_to_lkhd_mapping_dict
+
+###############################################################################
+# End of get_sketch_feature_prob function
+###############################################################################
+
+###############################################################################
+# Function      : get_sketch_error_bounds(model)
+# Description   : This function gives the error bounds of the counts kept
+#                 in the count-min sketches of a model (see 
+#                 get_feature_sketch_tables).
+# Arguments     : model - dict object holding a sketched model
+# Returns       : 1) epsilon, the error of a count as a fraction of the 
+#                    number of instances of the sense
+#                 2) delta, the probability of a count being off by more 
+#                    than that
+#                 3) The largest error of a count in the model (epsilon 
+#                    times the number of instances of the most frequent 
+#                    sense)
+###############################################################################
+
+def get_sketch_error_bounds(model):
+
+    epsilon = math.e / model['sketch_width']
+    delta = math.exp(-model['sketch_depth'])
+    max_count_error = epsilon * max(model['sense_instance_count_dict'].\
+                                    values())
+
+    return epsilon, delta, max_count_error
+
+###############################################################################
+# End of get_sketch_error_bounds function
+###############################################################################
+
+###############################################################################
+# Function      : print_sketch_error_bounds(model_dict)
+# Description   : This function prints the error bounds of the count-min 
+#                 sketches of models and the memory taken by the models.
+# Arguments     : model_dict - dict mapping lexelt items to sketched models
+# Returns       : None.
+###############################################################################
+
+def print_sketch_error_bounds(model_dict):
+
+    for lexelt in model_dict.keys():
+        epsilon, delta, max_count_error = \
+                            get_sketch_error_bounds(model_dict[lexelt])
+
+        print lexelt, "sketch error : counts over by at most " + \
+              "%.4f" % epsilon + " x instances of sense (at most " + \
+              "%.1f" % max_count_error + ") with probability " + \
+              "%.4f" % (1 - delta)
+
+    print "Model size with sketches (bytes)     :", \
+          sum([get_model_memory_size(model) for model in model_dict.values()])
+
+###############################################################################
+# End of print_sketch_error_bounds function
+###############################################################################
+
+###############################################################################
+# Function      : get_sketch_shape(args)
+# Description   : This function gives the shape of count-min sketches asked
+#                 for on the command line.
+# Arguments     : args - parsed command line arguments
+# Returns       : 1) A tuple of sketch width and depth, or None to keep 
+#                    exact counts
+###############################################################################
+
+def get_sketch_shape(args):
+
+    if args.sketch_width is None:
+        return None
+
+    return (args.sketch_width, args.sketch_depth)
+
+###############################################################################
+# End of get_sketch_shape function
+###############################################################################
+
+###############################################################################
+# Function      : get_knn_index(sense_context_words_mapping_dict)
+# Description   : This function builds the inverted index of the k-NN 
+#                 classifier. Every training instance gets an id, and each 
+#                 (window position, lemma) pair is mapped to the ids of
+#                 training instances having that lemma at that position.
+# Arguments     : sense_context_words_mapping_dict - dict storing mapping
+#                 of senses to the context words (as returned by 
+#                 get_coll_features)
+# Returns       : 1) A list giving the sense of each training instance id
+#                 2) A dict object mapping (position, lemma) tuples to 
+#                    arrays of training instance ids (posting lists)
+###############################################################################
+
+def get_knn_index(sense_context_words_mapping_dict):
+
+    instance_sense_list = []
+    posting_dict = {}
+
+    for sense in sorted(sense_context_words_mapping_dict.keys()):
+        for context_word_list in sense_context_words_mapping_dict[sense]:
+
+            instance_no = len(instance_sense_list)
+            instance_sense_list.append(sense)
+
+            for i in range(0, len(context_word_list)):
+                posting_dict.setdefault((i, context_word_list[i]), \
+                                        array.array('I')).append(instance_no)
+
+    return instance_sense_list, posting_dict
+
+###############################################################################
+# End of get_knn_index function
+###############################################################################
+
+###############################################################################
+# Function      : get_knn_sense(lemma_list, model)
+# Description   : This function finds the sense of an instance with the 
+#                 k-NN classifier. The similarity of a training instance is
+#                 the number of window positions at which it has the same 
+#                 lemma as the instance. Only the posting lists of the 
+#                 instance's (position, lemma) pairs are read, so training
+#                 instances sharing no lemma are never looked at, and an 
+#                 instance found in m posting lists (their intersection) 
+#                 gets similarity m. The k most similar training instances 
+#                 vote for their sense with their similarity. Ties are 
+#                 broken by the prior Probabilities, which also give the 
+#                 sense when no training instance is similar at all.
+# Arguments     : lemma_list - list of lemmas of context words
+#                 model - dict object holding a model with k-NN index (see
+#                         get_WSD_model)
+# Returns       : 1) The sense voted for by the nearest training instances
+###############################################################################
+
+def get_knn_sense(lemma_list, model):
+
+    posting_dict = model['knn_posting_dict']
+    instance_sense_list = model['knn_instance_sense_list']
+
+    similarity_dict = {}
+
+    for i in range(0, len(lemma_list)):
+        for instance_no in posting_dict.get((i, lemma_list[i]), ()):
+            similarity_dict[instance_no] = \
+                                    similarity_dict.get(instance_no, 0) + 1
+
+    if len(similarity_dict) == 0:
+        return get_prior_max_sense(model)
+
+    # the most similar instances, the earlier ones first among equals
+    neighbour_list = heapq.nlargest(model['knn_k'], \
+                                    similarity_dict.iteritems(), \
+                                    key=lambda pair: (pair[1], -pair[0]))
+
+    sense_vote_dict = {}
+    for instance_no, similarity in neighbour_list:
+        sense = instance_sense_list[instance_no]
+        sense_vote_dict[sense] = sense_vote_dict.get(sense, 0) + similarity
+
+    sense_to_prior_mapping_dict = model['sense_to_prior_mapping_dict']
+
+    return max(sense_vote_dict.keys(), key=lambda sense: \
+               (sense_vote_dict[sense], sense_to_prior_mapping_dict[sense]))
+
+###############################################################################
+# End of get_knn_sense function
+###############################################################################
+
+###############################################################################
+# Function      : compile_decision_list(model)
+# Description   : This function builds a decision list classifier (as in 
+#                 Yarowsky's "Decision lists for lexical ambiguity 
+#                 resolution") from the counts of a trained model. Every
+#                 (window position, lemma) feature gives a rule for the 
+#                 sense it occurs with most, ranked by the log-likelihood 
+#                 ratio 
+#
+#                   log10((count with sense + a) / (count without it + a))
+#
+#                 with a = DECISION_LIST_SMOOTHING. An instance gets the 
+#                 sense of the highest ranked rule matching one of its 
+#                 features. As an instance has one feature per position, 
+#                 the rules are compiled into a dict from feature to 
+#                 (ratio, sense) and classifying is one lookup per 
+#                 position (see get_decision_list_sense).
+# Arguments     : model - dict object holding the trained model
+# Returns       : 1) A copy of model holding the compiled rules
+###############################################################################
+
+def compile_decision_list(model):
+
+    sense_position_counts_dict = model['sense_position_counts_dict']
+
+    # counts of each feature with each sense
+    feature_counts_dict = {}
+
+    for sense in model['sense_list']:
+        position_counts_list = sense_position_counts_dict[sense]
+        for i in range(0, len(position_counts_list)):
+            for lemma, count in position_counts_list[i].iteritems():
+                feature_counts_dict.setdefault((i, lemma), {})[sense] = count
+
+    decision_rule_dict = {}
+
+    for feature, sense_counts_dict in feature_counts_dict.iteritems():
+        total_count = sum(sense_counts_dict.values())
+
+        # sense occurring most with the feature, the first sense among equals
+        best_sense = max(model['sense_list'], key=lambda sense: \
+                         sense_counts_dict.get(sense, 0))
+        best_count = sense_counts_dict[best_sense]
+
+        log_ratio = math.log10((best_count + DECISION_LIST_SMOOTHING) / \
+                               (total_count - best_count + \
+                                DECISION_LIST_SMOOTHING))
+
+        decision_rule_dict[feature] = (log_ratio, best_sense)
+
+    decision_model = dict(model)
+    decision_model['decision_rule_dict'] = decision_rule_dict
+    decision_model['default_sense'] = get_prior_max_sense(model)
+
+    return decision_model
+
+###############################################################################
+# End of compile_decision_list function
+###############################################################################
+
+###############################################################################
+# Function      : get_decision_list_sense(lemma_list, model)
+# Description   : This function finds the sense of an instance with the 
+#                 decision list compiled by compile_decision_list: the 
+#                 sense of the matching rule with the highest 
+#                 log-likelihood ratio, or the most frequent sense if no 
+#                 rule matches.
+# Arguments     : lemma_list - list of lemmas of context words
+#                 model - dict object holding a model with compiled 
+#                         decision list
+# Returns       : 1) The sense given by the decision list
+###############################################################################
+
+def get_decision_list_sense(lemma_list, model):
+
+    decision_rule_dict = model['decision_rule_dict']
+
+    best_rule = None
+
+    for i in range(0, len(lemma_list)):
+        rule = decision_rule_dict.get((i, lemma_list[i]))
+        if rule is not None and (best_rule is None or \
+                                 rule[0] > best_rule[0]):
+            best_rule = rule
+
+    if best_rule is None:
+        return model['default_sense']
+
+    return best_rule[1]
+
+###############################################################################
+# End of get_decision_list_sense function
+###############################################################################
+
+###############################################################################
+# Function      : get_WSD_model(ambiguous_word, sense_id_list, 
+#                               context_sent_list, 
+#                               sense_context_words_mapping_dict, window_size)
+# Description   : This function builds the model of naive Bayesian 
+#                 classifier from the training data and the collocational
+#                 features extracted from it.
+# Arguments     : ambiguous_word - the word to be tagged
+#                 sense_id_list - list containing all tagged senses for each
+#                                 instance
+#                 context_sent_list - list containing all context sentences
+#                                     for each instance
+#                 sense_context_words_mapping_dict - dict storing mapping
+#                 of senses to the context words (as returned by
+#                 get_coll_features), or None with sense_lemmas_pairs
+#                 window-size - size of window used to extract features
+#                 sense_freq_dict - dict of instance counts of each sense
+#                                   for the prior Probabilities, when 
+#                                   sense_id_list is only a sample of the
+#                                   training instances (optional)
+#                 sketch_shape - tuple of width and depth of count-min 
+#                                sketches to count the features into 
+#                                instead of exact counts (optional, see 
+#                                get_feature_sketch_tables)
+#                 knn_k - number of neighbours, to classify with the k-NN
+#                         classifier instead of naive Bayes (optional, see
+#                         get_knn_sense)
+#                 sense_lemmas_pairs - iterable of (sense, list of lemmas)
+#                                      pairs of the training instances to
+#                                      count into the sketches one at a 
+#                                      time, in place of 
+#                                      sense_context_words_mapping_dict
+#                                      (optional, sketches only)
+# Returns       : 1) A dict object holding the trained model. It has 
+#                    following keys:
+#
+#                   ambiguous_word - the word to be tagged by this model
+#                   sense_list - list of unique senses of ambiguous word
+#                   sense_to_prior_mapping_dict - prior prob for each sense
+#                   sense_position_counts_dict - counts of lemmas at each
+#                                                window position for each 
+#                                                sense (or 
+#                                                sense_position_sketch_dict,
+#                                                sketch_width and 
+#                                                sketch_depth with a sketch
+#                                                shape)
+#                   sense_instance_count_dict - number of training 
+#                                               instances of each sense
+#                   window_size - window size used to extract features
+#                   head_word_forms - surface forms of the ambiguous word
+#                                     seen inside <head> tags
+#                   knn_k, knn_instance_sense_list, knn_posting_dict - the
+#                                     k-NN index, with knn_k only
+###############################################################################
+
+def get_WSD_model(ambiguous_word, sense_id_list, context_sent_list, \
+                  sense_context_words_mapping_dict, window_size, \
+                  sense_freq_dict=None, sketch_shape=None, knn_k=None, \
+                  sense_lemmas_pairs=None):
+
+    '''
+    Get the list of unique senses possible for an ambiguous word 
+    from the senses of training instances. 
+    
+    For this, in built 'set' function can be used. set
+    function takes a list and converts it to a set eliminating duplicate 
+    elements of the list. This set is required to be converted into list
+    again for creating list out of this set. Usage of set function to 
+    find distinct elements from a list was borrowed from a blog entry 
+    present online at :
+    
+    http://mattdickenson.com/2011/12/31/find-unique-values-in-list-python/
+
+
+    Also get the freq counts for each unique sense. These freq counts will
+    be stored into a dict object sense_feq_dict, which has word senses as
+    its keys and freq counts for each key sense as the values.
+    '''
+
+    # get the distinct senses and store them into a list
+    sense_list = list(set(sense_id_list))
+
+    if debug:
+        print sense_list
+    
+    if sense_freq_dict is None:
+
+        # initialize a dict obj to store the freq count for each sense
+        sense_freq_dict = {}
+
+        # iterate over the senses_list to get freq for each sense 
+        for word_sense in sense_list:
+            sense_freq_dict[word_sense] =  sense_id_list.count(word_sense) 
+
+    if debug:
+        print sense_freq_dict 
+    
+    '''
+    Calculate the prior Probabilities for naive Bayesian classifier by using
+    the freq counts from sense_freq_dict. The prior probability for a word
+    sense is nothing but it's freq count in training data divided by total
+    instances present in the training data.  The prior Probabilities 
+    calculated here will be used later in WSD task and will be stored in a 
+    dict object sense_to_prior_mapping_dict which has mapping of each sense
+    to its prior probability.
+    '''
+
+    # initialize sense_to_prior_mapping_dict object
+    sense_to_prior_mapping_dict = {}
+    
+    # calculate total number of ambiguous word instance
+    total_count =  sum(sense_freq_dict.values())
+
+    # iterate over the sense_list to get the prior Probabilities
+    for sense in sense_list:
+        sense_to_prior_mapping_dict[sense] =\
+        float(sense_freq_dict[sense]) / float(total_count)            
+
+
+    '''
+    Only the lemma features are used for the likelihood Probabilities (see
+    get_coll_feature_prob). Keep the counts of lemmas at each window 
+    position for each sense instead of all the training contexts, so that
+    scoring is a lookup and the model can be pruned. With a sketch shape,
+    keep the counts in count-min sketches of fixed size instead.
+    '''
+    if sketch_shape is None:
+        sense_position_counts_dict, sense_instance_count_dict = \
+        get_feature_count_tables(sense_context_words_mapping_dict)
+    else:
+        if sense_lemmas_pairs is None:
+            sense_lemmas_pairs = ((sense, context_word_list) for sense in \
+                                  sense_context_words_mapping_dict.keys() \
+                                  for context_word_list in \
+                                  sense_context_words_mapping_dict[sense])
+        sense_position_sketch_dict, sense_instance_count_dict = \
+        get_feature_sketch_tables(sense_lemmas_pairs, sketch_shape[0], \
+                                  sketch_shape[1])
+
+    '''
+    Collect the surface forms of the ambiguous word (like hard, harder and
+    hardest) which appear inside the <head> tags of training data. These 
+    forms are used to spot the ambiguous word in raw text.
+    '''
+    head_word_forms = []
+
+    for context_sent in context_sent_list:
+        for head_word in re.findall(r'<head>(.*?)</head>', context_sent):
+            head_word = head_word.strip().lower()
+            if head_word != '' and head_word not in head_word_forms:
+                head_word_forms.append(head_word)
+
+    model = {}
+    model['ambiguous_word'] = ambiguous_word
+    model['sense_list'] = sense_list
+    model['sense_to_prior_mapping_dict'] = sense_to_prior_mapping_dict
+    model['sense_instance_count_dict'] = sense_instance_count_dict
+    if sketch_shape is None:
+        model['sense_position_counts_dict'] = sense_position_counts_dict
+    else:
+        model['sense_position_sketch_dict'] = sense_position_sketch_dict
+        model['sketch_width'], model['sketch_depth'] = sketch_shape
+
+    '''
+    For the k-NN classifier keep an inverted index of the training 
+    instances' windows. The counts are still kept for the prior 
+    Probabilities and to switch the lexelt back to naive Bayes.
+    '''
+    if knn_k is not None:
+        model['knn_k'] = knn_k
+        model['knn_instance_sense_list'], model['knn_posting_dict'] = \
+                        get_knn_index(sense_context_words_mapping_dict)
+    model['window_size'] = window_size
+    model['head_word_forms'] = head_word_forms
+
+    return model
+
+###############################################################################
+# End of get_WSD_model function
+###############################################################################
+
+###############################################################################
+# Function      : train_lexelt_model(lexelt_data)
+# Description   : This function trains the model of one lexelt item. It is
+#                 run in the worker processes of train_WSD_models.
+# Arguments     : lexelt_data - a tuple of lexelt item, list of senses and 
+#                               list of context sentences of its training 
+#                               instances, window size and name of the
+#                               training file for the feature store (or 
+#                               None), full instance counts of senses 
+#                               when the instances are a sample (or None)
+#                               the shape of count-min sketches to 
+#                               count features into (or None) and the 
+#                               number of neighbours of k-NN classifier (or
+#                               None for naive Bayes)
+# Returns       : 1) A dict object holding the trained model
+###############################################################################
+
+def train_lexelt_model(lexelt_data):
+
+    ambiguous_word, sense_id_list, context_sent_list, window_size, \
+    corpus_file_name, sense_freq_dict, sketch_shape, knn_k = lexelt_data
+
+    '''
+    Count the window of each instance straight into the sketches as it is
+    extracted, so the windows of all instances are never held. The k-NN 
+    classifier indexes the windows, so it still needs all of them.
+    '''
+    if sketch_shape is not None and knn_k is None:
+        sense_lemmas_pairs = itertools.izip(sense_id_list, \
+                                 iter_context_lemmas(context_sent_list, \
+                                            window_size, corpus_file_name))
+        return get_WSD_model(ambiguous_word, sense_id_list, \
+                             context_sent_list, None, window_size, \
+                             sense_freq_dict, sketch_shape, knn_k, \
+                             sense_lemmas_pairs)
+
+    sense_context_words_mapping_dict, sense_pos_tags_mapping_dict = \
+    get_coll_features(sense_id_list, context_sent_list, window_size, \
+                      corpus_file_name)
+
+    return get_WSD_model(ambiguous_word, sense_id_list, context_sent_list, \
+                         sense_context_words_mapping_dict, window_size, \
+                         sense_freq_dict, sketch_shape, knn_k)
+
+###############################################################################
+# End of train_lexelt_model function
+###############################################################################
+
+###############################################################################
+# Function      : train_WSD_models(train_file_name, window_size, 
+#                                  process_count, max_per_sense, 
+#                                  sample_seed, sketch_shape, knn_k,
+#                                  knn_lexelt_list, decision_lexelt_list)
+# Description   : This function trains a separate model for every lexelt 
+#                 item of a training file. The training instances are 
+#                 grouped by their lexelt item and the models are trained
+#                 concurrently in up to process_count worker processes.
+# Arguments     : train_file_name - Name of training file
+#                 window-size - size of window used to extract features
+#                 process_count - maximum number of worker processes (None
+#                                 for the number of CPUs)
+#                 max_per_sense - maximum number of training instances of
+#                                 each sense to learn features from (None 
+#                                 for all, see get_WSD_sample_data)
+#                 sample_seed - seed of the sampling with max_per_sense
+#                 sketch_shape - tuple of width and depth of count-min 
+#                                sketches to count the features into (None
+#                                for exact counts)
+#                 knn_k - number of neighbours to classify with the k-NN
+#                         classifier (None for naive Bayes)
+#                 knn_lexelt_list - list of lexelt items classified with 
+#                                   the k-NN classifier (None for all)
+#                 decision_lexelt_list - list of lexelt items classified 
+#                                        with a decision list (empty list
+#                                        for all, None for none)
+# Returns       : 1) An ordered dict mapping each lexelt item to its model,
+#                    in the order of the training file
+###############################################################################
+
+def train_WSD_models(train_file_name, window_size, process_count, \
+                     max_per_sense=None, sample_seed=0, sketch_shape=None, \
+                     knn_k=None, knn_lexelt_list=None, \
+                     decision_lexelt_list=None):
+
+    '''
+    Use the models cached by an earlier run with the same training file and
+    settings, when a model cache directory is set.
+    '''
+    if model_cache_dir is not None:
+        cache_file_name = get_model_cache_file_name(train_file_name, \
+                                [window_size, max_per_sense, sample_seed, \
+                                 sketch_shape, knn_k, knn_lexelt_list, \
+                                 decision_lexelt_list])
+        model_dict = load_cached_models(cache_file_name)
+        if model_dict is not None:
+            return model_dict
+
+    if max_per_sense is None:
+        instance_table = read_WSD_instances(train_file_name)
+        sense_count_dict = {}
+    else:
+        instance_table, sense_count_dict = get_WSD_sample_data(\
+                                train_file_name, max_per_sense, sample_seed)
+
+    '''
+    Group the senses and contexts of training instances by lexelt item. 
+    Instances without <answer> tag can not be learnt from and are skipped.
+    '''
+    lexelt_instances_dict = collections.OrderedDict()
+
+    for instance in iter_WSD_instance_table(instance_table):
+        if instance.sense_id is None:
+            continue
+        lexelt_sense_list, lexelt_context_list = \
+        lexelt_instances_dict.setdefault(instance.lexelt, ([], []))
+        lexelt_sense_list.append(instance.sense_id)
+        lexelt_context_list.append(instance.context_sent)
+
+    '''
+    A file with only one lexelt item is trained as a whole, which lets 
+    its features be kept in the feature store. The features of a sample
+    are not kept, as the store holds those of the whole file.
+    '''
+    if len(lexelt_instances_dict) == 1 and max_per_sense is None:
+        corpus_file_name = train_file_name
+    else:
+        corpus_file_name = None
+
+    lexelt_data_list = []
+    for lexelt in lexelt_instances_dict.keys():
+        lexelt_sense_list, lexelt_context_list = lexelt_instances_dict[lexelt]
+
+        if knn_lexelt_list is None or lexelt in knn_lexelt_list:
+            lexelt_knn_k = knn_k
+        else:
+            lexelt_knn_k = None
+
+        lexelt_data_list.append((lexelt, lexelt_sense_list, \
+                                 lexelt_context_list, window_size, \
+                                 corpus_file_name, \
+                                 sense_count_dict.get(lexelt), \
+                                 sketch_shape, lexelt_knn_k))
+
+    if process_count is None:
+        process_count = multiprocessing.cpu_count()
+    process_count = min(process_count, len(lexelt_data_list))
+
+    if process_count > 1:
+        '''
+        Load the tagger before starting the workers, so that the forked
+        workers share it instead of each loading their own.
+        '''
+        get_tagger()
+        pool = multiprocessing.Pool(process_count)
+        model_list = pool.map(train_lexelt_model, lexelt_data_list, 1)
+        pool.close()
+        pool.join()
+    else:
+        model_list = [train_lexelt_model(lexelt_data) for lexelt_data in \
+                      lexelt_data_list]
+
+    model_dict = collections.OrderedDict()
+    for model in model_list:
+        lexelt = model['ambiguous_word']
+        if decision_lexelt_list is not None and \
+           (len(decision_lexelt_list) == 0 or lexelt in decision_lexelt_list):
+            model = compile_decision_list(model)
+        model_dict[lexelt] = model
+
+    if model_cache_dir is not None:
+        save_cached_models(cache_file_name, model_dict)
+
+    return model_dict
+
+###############################################################################
+# End of train_WSD_models function
+###############################################################################
+
+###############################################################################
+# Function      : get_model_cache_file_name(train_file_name, settings_list)
+# Description   : This function gives the name of file in the model cache 
+#                 directory which holds the models trained from a training
+#                 file with given settings. The name is made from the hash
+#                 of the contents of training file, the tagger and the 
+#                 settings, so a changed training file is trained again.
+# Arguments     : train_file_name - Name of training file
+#                 settings_list - list of settings of training which change
+#                                 the models
+# Returns       : 1) Name of the cache file
+###############################################################################
+
+def get_model_cache_file_name(train_file_name, settings_list):
+
+    sha1_obj = hashlib.sha1()
+    sha1_obj.update(get_corpus_hash(train_file_name))
+    sha1_obj.update(TAGGER_BACKEND)
+    sha1_obj.update(json.dumps(settings_list))
+
+    return os.path.join(model_cache_dir, sha1_obj.hexdigest() + ".models")
+
+###############################################################################
+# End of get_model_cache_file_name function
+###############################################################################
+
+###############################################################################
+# Function      : load_cached_models(cache_file_name)
+# Description   : This function reads the models of a model cache file.
+# Arguments     : cache_file_name - Name of the cache file
+# Returns       : 1) An ordered dict mapping lexelt items to models, or None
+#                    if the file is not in the cache
+###############################################################################
+
+def load_cached_models(cache_file_name):
+
+    if not os.path.isfile(cache_file_name):
+        return None
+
+    cache_file_handle = open(cache_file_name, 'rb')
+    model_dict = cPickle.load(cache_file_handle)
+    cache_file_handle.close()
+
+    return model_dict
+
+###############################################################################
+# End of load_cached_models function
+###############################################################################
+
+###############################################################################
+# Function      : save_cached_models(cache_file_name, model_dict)
+# Description   : This function writes trained models into the model cache.
+#                 The file is written under a temporary name and renamed, 
+#                 so processes sharing the cache never read a partly 
+#                 written file.
+# Arguments     : cache_file_name - Name of the cache file
+#                 model_dict - ordered dict mapping lexelt items to models
+# Returns       : None.
+###############################################################################
+
+def save_cached_models(cache_file_name, model_dict):
+
+    if not os.path.isdir(model_cache_dir):
+        try:
+            os.makedirs(model_cache_dir)
+        except OSError:
+            # made by another process at the same time
+            if not os.path.isdir(model_cache_dir):
+                raise
+
+    temp_file_name = cache_file_name + "." + str(os.getpid()) + ".tmp"
+
+    cache_file_handle = open(temp_file_name, 'wb')
+    cPickle.dump(model_dict, cache_file_handle, cPickle.HIGHEST_PROTOCOL)
+    cache_file_handle.close()
+
+    os.rename(temp_file_name, cache_file_name)
+
+###############################################################################
+# End of save_cached_models function
+###############################################################################
+
+###############################################################################
+# Function      : get_max_prob_sense(lemma_list, pos_tags_list, model)
+# Description   : This function finds the most probable sense of an 
+#                 ambiguous word instance using the trained naive Bayesian
+#                 classifier.
+# Arguments     : lemma_list - list of lemmas of context words
+#                 pos_tags_list - list of pos tags of context words
+#                 model - dict object holding the trained model (as returned
+#                         by get_WSD_model) or a compact model
+# Returns       : 1) The sense with maximum final probability
+###############################################################################
+
+def get_max_prob_sense(lemma_list, pos_tags_list, model):
+
+    # lexelt items trained for the k-NN classifier are classified with it
+    if 'knn_posting_dict' in model:
+        return get_knn_sense(lemma_list, model)
+
+    # and those compiled into a decision list with their rules
+    if 'decision_rule_dict' in model:
+        return get_decision_list_sense(lemma_list, model)
+
+    sense_list = model['sense_list']
+    sense_to_prior_mapping_dict = model['sense_to_prior_mapping_dict']
+
+    '''
+    Get the likelihood Probabilities for each word sense for a given 
+    instance of ambiguous word. 
+    
+    To get likelihood prob for collocational features, call 
+    get_count_feature_prob() function. 
+    This function takes following inputs:
+    
+    1) List lemmas of context words
+    2) Dict object mapping each sense to the counts of lemmas at each
+       window position (for all context sentences in training data)
+    3) Dict object mapping each sense to its number of training instances
+    4) List of valid senses
+
+    And it returns a dict object which maps each sense to its
+    likelihood Probabilities
+    '''
+
+    if 'compact_buffer' in model:
+        sense_to_lkhd_mapping_dict =\
+                    get_compact_feature_prob(lemma_list, model)
+    elif 'sense_position_sketch_dict' in model:
+        sense_to_lkhd_mapping_dict =\
+                    get_sketch_feature_prob(lemma_list, model)
+    else:
+        sense_to_lkhd_mapping_dict =\
+                    get_count_feature_prob(lemma_list, \
+                          model['sense_position_counts_dict'],\
+                          model['sense_instance_count_dict'], sense_list)
+
+    '''
+    Multiply the prior and likelihood prob for each sense to get final
+    Probabilities. Select sense with the maximum final prob as the sense
+    for ambiguous word.
+    '''
+
+    # initialize a dict object to store final Probabilities
+    final_prob_dict = collections.OrderedDict()
+    final_prob_list = []
+    
+    for sense in sense_list:
+        final_prob =  math.log10(sense_to_prior_mapping_dict[sense]) +\
+                      math.log10(sense_to_lkhd_mapping_dict[sense])
+        
+        final_prob_dict[sense] = pow(10,final_prob)
+        final_prob_list.append(pow(10,final_prob))
+
+
+    max_prob_sense = final_prob_dict.keys()\
+                     [final_prob_list.index(max(final_prob_list))]
+
+    return max_prob_sense
+
+###############################################################################
+# End of get_max_prob_sense function
+###############################################################################
+
+###############################################################################
+# Function      : get_prior_max_sense(model)
+# Description   : This function gives the sense with maximum prior 
+#                 probability, i.e. the most frequent sense in training data.
+#                 It is the answer when there is no time to look at the 
+#                 context of an instance.
+# Arguments     : model - dict object holding the trained model
+# Returns       : 1) The sense with maximum prior probability
+###############################################################################
+
+def get_prior_max_sense(model):
+
+    sense_to_prior_mapping_dict = model['sense_to_prior_mapping_dict']
+    prior_prob_list = [sense_to_prior_mapping_dict[sense] for sense in \
+                       model['sense_list']]
+
+    return model['sense_list'][prior_prob_list.index(max(prior_prob_list))]
+
+###############################################################################
+# End of get_prior_max_sense function
+###############################################################################
+
+###############################################################################
+# Function      : create_degradation_stats()
+# Description   : This function creates the state kept by 
+#                 classify_with_deadline. It has the number of instances 
+#                 classified by each path and the running estimates of 
+#                 seconds taken per context character by the tagged and 
+#                 tokenized paths.
+# Arguments     : None.
+# Returns       : 1) A dict object holding the state
+###############################################################################
+
+def create_degradation_stats():
+
+    degradation_stats = {}
+    degradation_stats['path_counts'] = \
+                        collections.OrderedDict([(path, 0) for path in \
+                                                 CLASSIFICATION_PATHS])
+    degradation_stats['char_seconds'] = {}
+    degradation_stats['deadline_miss_count'] = 0
+
+    return degradation_stats
+
+###############################################################################
+# End of create_degradation_stats function
+###############################################################################
+
+###############################################################################
+# Function      : classify_with_deadline(context_sent, model, query_obj,
+#                                        deadline_seconds, degradation_stats)
+# Description   : This function finds the sense of an ambiguous word 
+#                 instance within a latency budget. Tagging can not be 
+#                 interrupted, so the time each path would take is estimated
+#                 from the length of context and the time per character 
+#                 seen so far, and the first path expected to finish within
+#                 the budget is used:
+#                 tagged - lemmas from MontyLingua tagger (normal path)
+#                 tokens - words from tokenization only, used as lemmas
+#                 prior - sense with maximum prior probability
+# Arguments     : context_sent - the sentence containing an instance of 
+#                                ambiguous word
+#                 model - dict object holding the trained model
+#                 query_obj - a MontyLingua object
+#                 deadline_seconds - latency budget for the instance
+#                 degradation_stats - state created by 
+#                                     create_degradation_stats, updated with
+#                                     the path used and its time
+# Returns       : 1) The sense found
+#                 2) Name of the path used
+###############################################################################
+
+def classify_with_deadline(context_sent, model, query_obj, \
+                           deadline_seconds, degradation_stats):
+
+    start_time = time.time()
+    char_seconds_dict = degradation_stats['char_seconds']
+    context_length = max(len(context_sent), 1)
+
+    path = 'prior'
+
+    for candidate_path, token_function in \
+            (('tagged', get_context_tokens), \
+             ('tokens', get_untagged_context_tokens)):
+
+        # paths not timed yet are assumed to fit in the budget
+        estimated_seconds = char_seconds_dict.get(candidate_path, 0.0) * \
+                            context_length
+
+        if estimated_seconds <= deadline_seconds:
+            path = candidate_path
+            break
+
+    if path == 'prior':
+        max_prob_sense = get_prior_max_sense(model)
+    else:
+        left_list, right_list = token_function(context_sent, query_obj)
+        path_seconds = time.time() - start_time
+
+        '''
+        Keep an exponentially weighted average of time per character, so 
+        that the estimate follows changes in load.
+        '''
+        if path in char_seconds_dict:
+            char_seconds_dict[path] = 0.8 * char_seconds_dict[path] + \
+                                      0.2 * path_seconds / context_length
+        else:
+            char_seconds_dict[path] = path_seconds / context_length
+
+        lemma_list, pos_tags_list = get_window_lemmas_and_tags(left_list, \
+                                            right_list, model['window_size'])
+        max_prob_sense = get_max_prob_sense(lemma_list, pos_tags_list, model)
+
+    degradation_stats['path_counts'][path] = \
+                            degradation_stats['path_counts'][path] + 1
+
+    if time.time() - start_time > deadline_seconds:
+        degradation_stats['deadline_miss_count'] = \
+                            degradation_stats['deadline_miss_count'] + 1
+
+    return max_prob_sense, path
+
+###############################################################################
+# End of classify_with_deadline function
+###############################################################################
+
+###############################################################################
+# Function      : prune_WSD_model(model, min_count, top_k, mi_threshold)
+# Description   : This function prunes the count tables of a trained model
+#                 to bound its size (see prune_feature_counts).
+# Arguments     : model - dict object holding the trained model
+#                 min_count - minimum count of a lemma at a position 
+#                 top_k - number of lemmas kept at a position for a sense
+#                 mi_threshold - minimum mutual information of a lemma at a 
+#                                position
+# Returns       : 1) A new dict object holding the pruned model
+###############################################################################
+
+def prune_WSD_model(model, min_count, top_k, mi_threshold):
+
+    pruned_model = dict(model)
+
+    pruned_model['sense_position_counts_dict'] = prune_feature_counts(\
+                                        model['sense_position_counts_dict'], \
+                                        model['sense_instance_count_dict'], \
+                                        min_count, top_k, mi_threshold)
+
+    return pruned_model
+
+###############################################################################
+# End of prune_WSD_model function
+###############################################################################
+
+###############################################################################
+# Function      : save_WSD_model(model, model_file_name)
+# Description   : This function writes a trained model into a file, so that 
+#                 it can be used later without training again.
+# Arguments     : model - dict object holding the trained model
+#                 model_file_name - Name of the model file
+# Returns       : None.
+###############################################################################
+
+def save_WSD_model(model, model_file_name):
+
+    '''
+    Write under a temporary name and rename, so that a process watching 
+    the file (see watch_registry_models) never loads a partly written 
+    model.
+    '''
+    temp_file_name = model_file_name + "." + str(os.getpid()) + ".tmp"
+
+    save_head_word_forms(model, model_file_name)
+
+    model_file_handle = open(temp_file_name, 'wb')
+    cPickle.dump(model, model_file_handle, cPickle.HIGHEST_PROTOCOL)
+    model_file_handle.close()
+
+    os.rename(temp_file_name, model_file_name)
+
+###############################################################################
+# End of save_WSD_model function
+###############################################################################
+
+###############################################################################
+# Function      : load_WSD_model(model_file_name)
+# Description   : This function reads a model written by save_WSD_model or
+#                 save_compact_model. The format of file is found from its
+#                 first bytes.
+# Arguments     : model_file_name - Name of the model file
+# Returns       : 1) A dict object holding the model
+###############################################################################
+
+def load_WSD_model(model_file_name):
+
+    model_file_handle = open(model_file_name, 'rb')
+    magic = model_file_handle.read(len(COMPACT_MODEL_MAGIC))
+
+    if magic == COMPACT_MODEL_MAGIC:
+        model_file_handle.close()
+        return load_compact_model(model_file_name)
+
+    model_file_handle.seek(0)
+    model = cPickle.load(model_file_handle)
+    model_file_handle.close()
+
+    return model
+
+###############################################################################
+# End of load_WSD_model function
+###############################################################################
+
+###############################################################################
+# Function      : save_head_word_forms(model, model_file_name)
+# Description   : This function writes the surface forms of the ambiguous 
+#                 word of a model, one per line, into a small file next to
+#                 the model file. Raw text tagging reads it to know which 
+#                 words to look for, without loading the model itself.
+# Arguments     : model - dict object holding the trained model
+#                 model_file_name - Name of the model file
+# Returns       : None.
+###############################################################################
+
+def save_head_word_forms(model, model_file_name):
+
+    forms_file_name = model_file_name + HEAD_FORMS_EXTENSION
+    temp_file_name = forms_file_name + "." + str(os.getpid()) + ".tmp"
+
+    forms_file_handle = open(temp_file_name, 'w')
+    for form in model['head_word_forms']:
+        forms_file_handle.write(form + "\n")
+    forms_file_handle.close()
+
+    os.rename(temp_file_name, forms_file_name)
+
+###############################################################################
+# End of save_head_word_forms function
+###############################################################################
+
+###############################################################################
+# Function      : load_head_word_forms(model_file_name)
+# Description   : This function reads the surface forms written by 
+#                 save_head_word_forms for a model file.
+# Arguments     : model_file_name - Name of the model file
+# Returns       : 1) A list of surface forms, or None if the model file has
+#                    no forms file (e.g. it was saved by an older version)
+###############################################################################
+
+def load_head_word_forms(model_file_name):
+
+    forms_file_name = model_file_name + HEAD_FORMS_EXTENSION
+
+    if not os.path.isfile(forms_file_name):
+        return None
+
+    forms_file_handle = open(forms_file_name, 'r')
+    head_word_forms = [line.rstrip("\n") for line in forms_file_handle]
+    forms_file_handle.close()
+
+    return head_word_forms
+
+###############################################################################
+# End of load_head_word_forms function
+###############################################################################
+
+###############################################################################
+# Function      : save_compact_model(model, model_file_name)
+# Description   : This function writes a trained model in compact format. 
+#                 The log Probabilities of lemmas at each window position 
+#                 are quantized to one signed byte per sense, and lemmas of 
+#                 each position are kept in a sorted string table which is
+#                 searched with binary search. This keeps a model small 
+#                 enough to host thousands of lexelts in memory.
+#
+#                 Layout of the file is:
+#
+#                 - COMPACT_MODEL_MAGIC
+#                 - length of header (4 byte unsigned int) and header in 
+#                   JSON format (word, senses, priors, quantization step and
+#                   offsets of position sections)
+#                 - one section per window position having: number of lemmas
+#                   n (4 bytes), n + 1 offsets (4 bytes each) into the string
+#                   table, the string table of sorted lemmas and n codes (1 
+#                   byte each) for each sense
+#
+#                 A code q stands for log10 prob q * log_prob_step. The code
+#                 -128 stands for an unseen lemma (smoothed to 10^-9).
+#
+#                 Tolerance: the log10 prob of each feature is off by at most
+#                 log_prob_step / 2, so the log10 likelihood of a sense is off
+#                 by at most (number of positions) * log_prob_step / 2 from
+#                 the full precision likelihood of get_coll_feature_prob 
+#                 (see get_compact_model_tolerance).
+# Arguments     : model - dict object holding the trained model
+#                 model_file_name - Name of the model file
+# Returns       : None.
+###############################################################################
+
+def save_compact_model(model, model_file_name):
+
+    '''
+    Write under a temporary name and rename. Processes which have mapped 
+    the old file (see load_compact_model) keep using it unchanged, while 
+    writing into it would change or cut the memory they are reading.
+    '''
+    temp_file_name = model_file_name + "." + str(os.getpid()) + ".tmp"
+
+    save_head_word_forms(model, model_file_name)
+
+    model_file_handle = open(temp_file_name, 'wb')
+    model_file_handle.write(get_compact_model_data(model))
+    model_file_handle.close()
+
+    os.rename(temp_file_name, model_file_name)
+
+###############################################################################
+# End of save_compact_model function
+###############################################################################
+
+###############################################################################
+# Function      : get_compact_model_data(model)
+# Description   : This function gives the contents of compact model file of
+#                 a trained model (see save_compact_model for the format).
+# Arguments     : model - dict object holding the trained model
+# Returns       : 1) A string holding the compact model
+###############################################################################
+
+def get_compact_model_data(model):
+
+    sense_list = model['sense_list']
+    sense_position_counts_dict = model['sense_position_counts_dict']
+    sense_instance_count_dict = model['sense_instance_count_dict']
+
+    '''
+    The smallest log prob of a seen lemma is log10(1 / instances of sense).
+    Spread the codes -127 to 0 over the range from it to 0.
+    '''
+    min_log_prob = 0.0
+    for sense in sense_list:
+        min_log_prob = min(min_log_prob, \
+                           -math.log10(sense_instance_count_dict[sense]))
+
+    if min_log_prob == 0.0:
+        log_prob_step = 1.0 / 127
+    else:
+        log_prob_step = -min_log_prob / 127
+
+    position_count = 2 * model['window_size']
+
+    section_list = []
+
+    for i in range(0, position_count):
+
+        lemma_set = set()
+        for sense in sense_list:
+            lemma_set.update(sense_position_counts_dict[sense][i].keys())
+
+        lemma_list = sorted(lemma_set)
+
+        # string table of the sorted lemmas
+        string_offset_array = array.array('I', [0])
+        for lemma in lemma_list:
+            string_offset_array.append(string_offset_array[-1] + len(lemma))
+
+        # quantized log prob codes for each sense
+        code_array = array.array('b')
+        for sense in sense_list:
+            lemma_counts_dict = sense_position_counts_dict[sense][i]
+            total_count_for_sense = float(sense_instance_count_dict[sense])
+
+            for lemma in lemma_list:
+                feature_count = lemma_counts_dict.get(lemma, 0)
+                if feature_count == 0:
+                    code_array.append(-128)
+                else:
+                    log_prob = math.log10(feature_count / \
+                                          total_count_for_sense)
+                    code_array.append(max(-127, \
+                                      int(round(log_prob / log_prob_step))))
+
+        section = struct.pack('<I', len(lemma_list)) + \
+                  string_offset_array.tostring() + "".join(lemma_list) + \
+                  code_array.tostring()
+
+        # pad the section to keep next section aligned to 4 bytes
+        section = section + "\0" * (-len(section) % 4)
+        section_list.append(section)
+
+    header = {}
+    header['ambiguous_word'] = model['ambiguous_word']
+    header['sense_list'] = sense_list
+    header['sense_to_prior_mapping_dict'] = \
+                                model['sense_to_prior_mapping_dict']
+    header['window_size'] = model['window_size']
+    header['head_word_forms'] = model['head_word_forms']
+    header['log_prob_step'] = log_prob_step
+
+    '''
+    Offsets of position sections are known only after the length of header
+    is known. Write the offsets with a fixed width so that the length of
+    header does not change when they are filled in.
+    '''
+    header['position_offset_list'] = [0] * position_count
+    # latin-1 like the feature store, so any byte of senses is kept
+    header_text = json.dumps(header, sort_keys=True, encoding='latin-1')
+    sections_start = len(COMPACT_MODEL_MAGIC) + 4 + len(header_text) + 10 * \
+                     position_count
+    sections_start = sections_start + (-sections_start % 4)
+
+    position_offset_list = []
+    section_offset = sections_start
+    for section in section_list:
+        position_offset_list.append(section_offset)
+        section_offset = section_offset + len(section)
+
+    header['position_offset_list'] = position_offset_list
+    header_text = json.dumps(header, sort_keys=True, encoding='latin-1')
+    header_text = header_text + " " * (sections_start - \
+                  len(COMPACT_MODEL_MAGIC) - 4 - len(header_text))
+
+    return COMPACT_MODEL_MAGIC + struct.pack('<I', len(header_text)) + \
+           header_text + "".join(section_list)
+
+###############################################################################
+# End of get_compact_model_data function
+###############################################################################
+
+###############################################################################
+# Function      : load_compact_model(model_file_name)
+# Description   : This function reads a model written by save_compact_model.
+#                 The sections of file are kept as one string and are looked
+#                 up in place while scoring.
+# Arguments     : model_file_name - Name of the model file
+# Returns       : 1) A dict object holding the compact model
+###############################################################################
+
+def load_compact_model(model_file_name):
+
+    model_file_handle = open(model_file_name, 'rb')
+
+    '''
+    Map the file read-only instead of reading it. All processes using the
+    same model file then share its pages in the page cache, so running 
+    more worker processes does not take more memory for the model. Files
+    which can not be mapped are read into memory.
+    '''
+    try:
+        compact_buffer = mmap.mmap(model_file_handle.fileno(), 0, \
+                                   access=mmap.ACCESS_READ)
+    except (mmap.error, ValueError):
+        compact_buffer = model_file_handle.read()
+
+    model_file_handle.close()
+
+    return get_compact_model(compact_buffer)
+
+###############################################################################
+# End of load_compact_model function
+###############################################################################
+
+###############################################################################
+# Function      : save_WSD_model_dict(model_dict, model_file_name, 
+#                                     save_function, extension)
+# Description   : This function saves the models of all lexelt items of a
+#                 training file. A single model is saved into the given 
+#                 file. Several models are saved into the given directory,
+#                 one <lexelt><extension> file per lexelt item, which is 
+#                 the layout looked for by the model registry.
+# Arguments     : model_dict - dict mapping lexelt items to their models
+#                 model_file_name - Name of model file or directory
+#                 save_function - save_WSD_model or save_compact_model
+#                 extension - extension of model files in the directory
+# Returns       : None.
+###############################################################################
+
+def save_WSD_model_dict(model_dict, model_file_name, save_function, \
+                        extension):
+
+    if len(model_dict) == 1:
+        save_function(model_dict.values()[0], model_file_name)
+        return
+
+    if not os.path.isdir(model_file_name):
+        os.makedirs(model_file_name)
+
+    for lexelt in model_dict.keys():
+        save_function(model_dict[lexelt], \
+                      os.path.join(model_file_name, lexelt + extension))
+
+###############################################################################
+# End of save_WSD_model_dict function
+###############################################################################
+
+###############################################################################
+# Function      : get_compact_model(compact_buffer)
+# Description   : This function reads the header of a compact model from a
+#                 buffer (a string or any object supporting the buffer 
+#                 interface, like a mmap object) holding the compact model
+#                 file.
+# Arguments     : compact_buffer - contents of the compact model file
+# Returns       : 1) A dict object holding the compact model
+###############################################################################
+
+def get_compact_model(compact_buffer):
+
+    magic_length = len(COMPACT_MODEL_MAGIC)
+
+    if compact_buffer[0:magic_length] != COMPACT_MODEL_MAGIC:
+        raise ValueError("Not a compact WSD model")
+
+    header_length = struct.unpack_from('<I', compact_buffer, magic_length)[0]
+    header = json.loads(compact_buffer[magic_length + 4 : \
+                                       magic_length + 4 + header_length])
+
+    # JSON gives unicode strings, bring them back to plain strings
+    model = {}
+    model['ambiguous_word'] = header['ambiguous_word'].encode('latin-1')
+    model['sense_list'] = [sense.encode('latin-1') \
+                           for sense in header['sense_list']]
+    model['sense_to_prior_mapping_dict'] = {}
+    for sense, prior in header['sense_to_prior_mapping_dict'].items():
+        model['sense_to_prior_mapping_dict'][sense.encode('latin-1')] = prior
+    model['window_size'] = header['window_size']
+    model['head_word_forms'] = [form.encode('latin-1') \
+                                for form in header['head_word_forms']]
+    model['log_prob_step'] = header['log_prob_step']
+    model['position_offset_list'] = header['position_offset_list']
+    model['compact_buffer'] = compact_buffer
+
+    return model
+
+###############################################################################
+# End of get_compact_model function
+###############################################################################
+
+###############################################################################
+# Function      : get_compact_model_tolerance(compact_model)
+# Description   : This function gives the largest possible difference 
+#                 between the log10 likelihood of a sense given by
+#                 get_compact_feature_prob and the one given by 
+#                 get_coll_feature_prob.
+# Arguments     : compact_model - dict object holding the compact model
+# Returns       : 1) The tolerance in log10 units
+###############################################################################
+
+def get_compact_model_tolerance(compact_model):
+
+    return len(compact_model['position_offset_list']) * \
+           compact_model['log_prob_step'] / 2
+
+###############################################################################
+# End of get_compact_model_tolerance function
+###############################################################################
+
+###############################################################################
+# Function      : get_compact_feature_prob(lemma_list, compact_model)
+# Description   : This function calculates the collocation feature 
+#                 Probabilities (likelihood Probabilities) for each word 
+#                 sense from a compact model. The result is within the 
+#                 tolerance given by get_compact_model_tolerance of the 
+#                 result of get_coll_feature_prob.
+# Arguments     : lemma_list - list of lemmas of context words
+#                 compact_model - dict object holding the compact model
+# Returns       : 1) A dict object storing mapping of senses to their 
+#                    likelihood Probabilities
+###############################################################################
+
+def get_compact_feature_prob(lemma_list, compact_model):
+
+    compact_buffer = compact_model['compact_buffer']
+    sense_list = compact_model['sense_list']
+    log_prob_step = compact_model['log_prob_step']
+    unseen_log_prob = math.log10(pow(10,-9))
+
+    lkhd_prob_list = [0.0] * len(sense_list)
+
+    for i in range(0, len(lemma_list)):
+
+        lemma = lemma_list[i]
+        section_offset = compact_model['position_offset_list'][i]
+
+        lemma_count = struct.unpack_from('<I', compact_buffer, \
+                                         section_offset)[0]
+        string_offset_start = section_offset + 4
+        string_table_start = string_offset_start + 4 * (lemma_count + 1)
+
+        # binary search of lemma in the sorted string table
+        low = 0
+        high = lemma_count
+
+        while low < high:
+            mid = (low + high) // 2
+            string_start, string_end = struct.unpack_from('<II', \
+                          compact_buffer, string_offset_start + 4 * mid)
+            if compact_buffer[string_table_start + string_start : \
+                              string_table_start + string_end] < lemma:
+                low = mid + 1
+            else:
+                high = mid
+
+        lemma_pos = -1
+
+        if low < lemma_count:
+            string_start, string_end = struct.unpack_from('<II', \
+                          compact_buffer, string_offset_start + 4 * low)
+            if compact_buffer[string_table_start + string_start : \
+                              string_table_start + string_end] == lemma:
+                lemma_pos = low
+
+        if lemma_pos == -1:
+            # lemma is unseen for all senses at this position
+            for j in range(0, len(sense_list)):
+                lkhd_prob_list[j] = lkhd_prob_list[j] + unseen_log_prob
+            continue
+
+        string_table_length = struct.unpack_from('<I', compact_buffer, \
+                              string_offset_start + 4 * lemma_count)[0]
+        code_start = string_table_start + string_table_length
+
+        for j in range(0, len(sense_list)):
+            code = struct.unpack_from('<b', compact_buffer, code_start + \
+                                      j * lemma_count + lemma_pos)[0]
+            if code == -128:
+                lkhd_prob_list[j] = lkhd_prob_list[j] + unseen_log_prob
+            else:
+                lkhd_prob_list[j] = lkhd_prob_list[j] + code * log_prob_step
+
+    sense_to_lkhd_mapping_dict = {}
+    for j in range(0, len(sense_list)):
+        sense_to_lkhd_mapping_dict[sense_list[j]] = pow(10,lkhd_prob_list[j])
+
+    return sense_to_lkhd_mapping_dict
+
+###############################################################################
+# End of get_compact_feature_prob function
+###############################################################################
+
+###############################################################################
+# Function      : get_model_memory_size(model)
+# Description   : This function estimates the memory taken by a model. For
+#                 a compact model it is the size of its buffer, for others
+#                 the sizes of all objects reachable from the model dict are
+#                 added up.
+# Arguments     : model - dict object holding the model
+# Returns       : 1) The estimated memory size in bytes
+###############################################################################
+
+def get_model_memory_size(model):
+
+    if 'compact_buffer' in model:
+        return len(model['compact_buffer'])
+
+    memory_size = 0
+    seen_ids = set()
+    object_list = [model]
+
+    while object_list:
+        obj = object_list.pop()
+
+        if id(obj) in seen_ids:
+            continue
+        seen_ids.add(id(obj))
+
+        memory_size = memory_size + sys.getsizeof(obj)
+
+        if isinstance(obj, dict):
+            object_list.extend(obj.keys())
+            object_list.extend(obj.values())
+        elif isinstance(obj, (list, tuple, set)):
+            object_list.extend(obj)
+
+    return memory_size
+
+###############################################################################
+# End of get_model_memory_size function
+###############################################################################
+
+###############################################################################
+# Function      : create_model_registry(model_dir, memory_cap)
+# Description   : This function creates a registry which serves models keyed
+#                 by lexelt item. Models are loaded from model_dir on first 
+#                 use and the least recently used models are evicted when 
+#                 the memory taken by loaded models goes above memory_cap.
+#                 A model for lexelt item "hard-a" is looked for in files 
+#                 "hard-a.wsdq" (compact format) and "hard-a.model" (plain
+#                 format) of model_dir.
+# Arguments     : model_dir - directory having the model files (or None if
+#                             models are only added with add_registry_model)
+#                 memory_cap - maximum memory in bytes for loaded models (or 
+#                              None for no limit)
+# Returns       : 1) A dict object holding the registry
+###############################################################################
+
+def create_model_registry(model_dir, memory_cap):
+
+    registry = {}
+    registry['model_dir'] = model_dir
+    registry['memory_cap'] = memory_cap
+
+    # loaded models in least to most recently used order
+    registry['model_dict'] = collections.OrderedDict()
+    registry['memory_size_dict'] = {}
+    registry['memory_used'] = 0
+
+    registry['load_count'] = 0
+    registry['hit_count'] = 0
+    registry['evict_count'] = 0
+
+    # model files given for lexelt items outside of model_dir
+    registry['model_file_dict'] = {}
+
+    '''
+    Version of the model of each lexelt item (counting from 1 for the 
+    first load) and the (modification time, size) of the file it was 
+    loaded from, which tells the watcher when the file changes (see
+    watch_registry_models).
+    '''
+    registry['model_version_dict'] = {}
+    registry['file_signature_dict'] = {}
+    registry['reload_count'] = 0
+    registry['reload_error_count'] = 0
+    registry['last_reload_seconds'] = None
+    registry['max_reload_seconds'] = None
+
+    registry['lock'] = threading.Lock()
+
+    return registry
+
+###############################################################################
+# End of create_model_registry function
+###############################################################################
+
+###############################################################################
+# Function      : get_registry_model_file(registry, lexelt)
+# Description   : This function finds the model file for a lexelt item in 
+#                 the model directory of registry.
+# Arguments     : registry - dict object holding the registry
+#                 lexelt - the lexelt item
+# Returns       : 1) Name of model file or None if there is no such file
+###############################################################################
+
+def get_registry_model_file(registry, lexelt):
+
+    if lexelt in registry['model_file_dict']:
+        return registry['model_file_dict'][lexelt]
+
+    if registry['model_dir'] is None:
+        return None
+
+    for extension in MODEL_FILE_EXTENSIONS:
+        model_file_name = os.path.join(registry['model_dir'], \
+                                       lexelt + extension)
+        if os.path.isfile(model_file_name):
+            return model_file_name
+
+    return None
+
+###############################################################################
+# End of get_registry_model_file function
+###############################################################################
+
+###############################################################################
+# Function      : add_registry_model(registry, lexelt, model)
+# Description   : This function puts a model into the registry as the most
+#                 recently used model of lexelt item. Models which can not 
+#                 be loaded again from the model directory are never evicted.
+# Arguments     : registry - dict object holding the registry
+#                 lexelt - the lexelt item
+#                 model - dict object holding the model
+# Returns       : None.
+###############################################################################
+
+def add_registry_model(registry, lexelt, model):
+
+    registry['lock'].acquire()
+    try:
+        put_registry_model(registry, lexelt, model)
+    finally:
+        registry['lock'].release()
+
+###############################################################################
+# End of add_registry_model function
+###############################################################################
+
+###############################################################################
+# Function      : put_registry_model(registry, lexelt, model)
+# Description   : This function puts a model into the registry and evicts 
+#                 least recently used models to keep the memory used under
+#                 the memory cap. The registry lock must be held by caller.
+# Arguments     : registry - dict object holding the registry
+#                 lexelt - the lexelt item
+#                 model - dict object holding the model
+# Returns       : None.
+###############################################################################
+
+def put_registry_model(registry, lexelt, model):
+
+    model_dict = registry['model_dict']
+    memory_size_dict = registry['memory_size_dict']
+
+    if lexelt in model_dict:
+        del model_dict[lexelt]
+        registry['memory_used'] = registry['memory_used'] - \
+                                  memory_size_dict.pop(lexelt)
+
+    memory_size = get_model_memory_size(model)
+    model_dict[lexelt] = model
+    memory_size_dict[lexelt] = memory_size
+    registry['memory_used'] = registry['memory_used'] + memory_size
+
+    if registry['memory_cap'] is None:
+        return
+
+    '''
+    Evict the least recently used models till the memory used is under 
+    the cap. The model just put is kept even if it alone is above the cap.
+    '''
+    for evict_lexelt in list(model_dict.keys()):
+
+        if registry['memory_used'] <= registry['memory_cap']:
+            break
+
+        if evict_lexelt == lexelt or \
+           get_registry_model_file(registry, evict_lexelt) is None:
+            continue
+
+        del model_dict[evict_lexelt]
+        registry['memory_used'] = registry['memory_used'] - \
+                                  memory_size_dict.pop(evict_lexelt)
+        registry['evict_count'] = registry['evict_count'] + 1
+
+        if debug:
+            print "Evicted model for", evict_lexelt
+
+###############################################################################
+# End of put_registry_model function
+###############################################################################
+
+###############################################################################
+# Function      : get_registry_model(registry, lexelt)
+# Description   : This function gives the model of a lexelt item from the
+#                 registry. The model is loaded from the model directory if
+#                 it is not loaded already. The model file is read without
+#                 holding the registry lock, so that loading a model does 
+#                 not hold up lookups of loaded models. If another thread
+#                 puts a model of the lexelt item in the meantime, that 
+#                 model is used and the one read here is dropped.
+# Arguments     : registry - dict object holding the registry
+#                 lexelt - the lexelt item
+# Returns       : 1) A dict object holding the model or None if there is no
+#                    model for the lexelt item
+###############################################################################
+
+def get_registry_model(registry, lexelt):
+
+    model_dict = registry['model_dict']
+
+    registry['lock'].acquire()
+    try:
+        if lexelt in model_dict:
+            # move the model to the most recently used end
+            model = model_dict.pop(lexelt)
+            model_dict[lexelt] = model
+            registry['hit_count'] = registry['hit_count'] + 1
+            return model
+
+        model_file_name = get_registry_model_file(registry, lexelt)
+    finally:
+        registry['lock'].release()
+
+    if model_file_name is None:
+        return None
+
+    file_signature = get_file_signature(model_file_name)
+    model = load_WSD_model(model_file_name)
+
+    registry['lock'].acquire()
+    try:
+        if lexelt in model_dict:
+            model = model_dict.pop(lexelt)
+            model_dict[lexelt] = model
+            return model
+
+        registry['load_count'] = registry['load_count'] + 1
+        put_registry_model(registry, lexelt, model)
+
+        if registry['file_signature_dict'].get(lexelt) != file_signature:
+            registry['file_signature_dict'][lexelt] = file_signature
+            registry['model_version_dict'][lexelt] = \
+                            registry['model_version_dict'].get(lexelt, 0) + 1
+
+        return model
+    finally:
+        registry['lock'].release()
+
+###############################################################################
+# End of get_registry_model function
+###############################################################################
+
+###############################################################################
+# Function      : get_registry_lexelts(registry)
+# Description   : This function lists the lexelt items for which the 
+#                 registry has a model, loaded or in the model directory.
+# Arguments     : registry - dict object holding the registry
+# Returns       : 1) A sorted list of lexelt items
+###############################################################################
+
+def get_registry_lexelts(registry):
+
+    lexelt_set = set(registry['model_dict'].keys())
+
+    if registry['model_dir'] is not None:
+        for file_name in os.listdir(registry['model_dir']):
+            for extension in MODEL_FILE_EXTENSIONS:
+                if file_name.endswith(extension):
+                    lexelt_set.add(file_name[0 : -len(extension)])
+
+    return sorted(lexelt_set)
+
+###############################################################################
+# End of get_registry_lexelts function
+###############################################################################
+
+###############################################################################
+# Function      : get_registry_head_forms(registry, lexelt)
+# Description   : This function gives the surface forms of the ambiguous 
+#                 word of a lexelt item. They are taken from the model if it
+#                 is loaded, otherwise from the forms file next to its model
+#                 file, so that the model is not loaded only for them. A 
+#                 model file without forms file is loaded.
+# Arguments     : registry - dict object holding the registry
+#                 lexelt - the lexelt item
+# Returns       : 1) A list of surface forms, or None if there is no model
+#                    for the lexelt item
+###############################################################################
+
+def get_registry_head_forms(registry, lexelt):
+
+    registry['lock'].acquire()
+    try:
+        model = registry['model_dict'].get(lexelt)
+        model_file_name = get_registry_model_file(registry, lexelt)
+    finally:
+        registry['lock'].release()
+
+    if model is not None:
+        return model['head_word_forms']
+
+    if model_file_name is not None:
+        head_word_forms = load_head_word_forms(model_file_name)
+        if head_word_forms is not None:
+            return head_word_forms
+
+    model = get_registry_model(registry, lexelt)
+    if model is None:
+        return None
+
+    return model['head_word_forms']
+
+###############################################################################
+# End of get_registry_head_forms function
+###############################################################################
+
+###############################################################################
+# Function      : get_registry_stats(registry)
+# Description   : This function gives the counters of registry.
+# Arguments     : registry - dict object holding the registry
+# Returns       : 1) A dict object with number of loads, hits and evictions,
+#                    number of loaded models and memory used by them, 
+#                    number of hot reloads and their timings, and the 
+#                    version of model of each lexelt item
+###############################################################################
+
+def get_registry_stats(registry):
+
+    registry['lock'].acquire()
+    try:
+        registry_stats = {}
+        registry_stats['load_count'] = registry['load_count']
+        registry_stats['hit_count'] = registry['hit_count']
+        registry_stats['evict_count'] = registry['evict_count']
+        registry_stats['resident_count'] = len(registry['model_dict'])
+        registry_stats['memory_used'] = registry['memory_used']
+        registry_stats['memory_cap'] = registry['memory_cap']
+        registry_stats['reload_count'] = registry['reload_count']
+        registry_stats['reload_error_count'] = registry['reload_error_count']
+        registry_stats['last_reload_seconds'] = \
+                                        registry['last_reload_seconds']
+        registry_stats['max_reload_seconds'] = registry['max_reload_seconds']
+        registry_stats['model_version_dict'] = \
+                                        dict(registry['model_version_dict'])
+        return registry_stats
+    finally:
+        registry['lock'].release()
+
+###############################################################################
+# End of get_registry_stats function
+###############################################################################
+
+###############################################################################
+# Function      : add_registry_model_file(registry, lexelt, model_file_name)
+# Description   : This function gives the registry the model file of a 
+#                 lexelt item which is not in its model directory, so that
+#                 it is loaded and watched like the files of model directory.
+# Arguments     : registry - dict object holding the registry
+#                 lexelt - the lexelt item
+#                 model_file_name - Name of the model file
+# Returns       : None.
+###############################################################################
+
+def add_registry_model_file(registry, lexelt, model_file_name):
+
+    registry['lock'].acquire()
+    registry['model_file_dict'][lexelt] = model_file_name
+    registry['lock'].release()
+
+###############################################################################
+# End of add_registry_model_file function
+###############################################################################
+
+###############################################################################
+# Function      : get_file_signature(file_name)
+# Description   : This function gives the modification time and size of a 
+#                 file, which change when a new model is written into it.
+# Arguments     : file_name - Name of the file
+# Returns       : 1) A (modification time, size) tuple, or None if the file
+#                    does not exist
+###############################################################################
+
+def get_file_signature(file_name):
+
+    try:
+        stat_result = os.stat(file_name)
+    except OSError:
+        return None
+
+    return (stat_result.st_mtime, stat_result.st_size)
+
+###############################################################################
+# End of get_file_signature function
+###############################################################################
+
+###############################################################################
+# Function      : reload_registry_models(registry)
+# Description   : This function loads a new version of every loaded model 
+#                 whose file has changed, and swaps it into the registry.
+#                 The new model is loaded without holding the registry lock,
+#                 so classification goes on with the old model meanwhile, 
+#                 and classifications which already got the old model 
+#                 finish with it. A file which can not be loaded (e.g. one
+#                 still being written) is tried again on the next call.
+# Arguments     : registry - dict object holding the registry
+# Returns       : 1) Number of models reloaded
+###############################################################################
+
+def reload_registry_models(registry):
+
+    registry['lock'].acquire()
+    lexelt_list = list(registry['model_dict'].keys())
+    registry['lock'].release()
+
+    reload_count = 0
+
+    for lexelt in lexelt_list:
+
+        model_file_name = get_registry_model_file(registry, lexelt)
+        if model_file_name is None:
+            continue
+
+        file_signature = get_file_signature(model_file_name)
+        if file_signature is None or \
+           file_signature == registry['file_signature_dict'].get(lexelt):
+            continue
+
+        start_time = time.time()
+        try:
+            model = load_WSD_model(model_file_name)
+        except Exception, error:
+            sys.stderr.write("Could not reload " + model_file_name + ": " + \
+                             str(error) + "\n")
+            registry['lock'].acquire()
+            registry['reload_error_count'] = \
+                                    registry['reload_error_count'] + 1
+            registry['lock'].release()
+            continue
+        reload_seconds = time.time() - start_time
+
+        registry['lock'].acquire()
+        try:
+            # a model evicted meanwhile is loaded again when next needed
+            if lexelt not in registry['model_dict']:
+                continue
+            put_registry_model(registry, lexelt, model)
+            registry['file_signature_dict'][lexelt] = file_signature
+            registry['model_version_dict'][lexelt] = \
+                            registry['model_version_dict'].get(lexelt, 0) + 1
+            registry['reload_count'] = registry['reload_count'] + 1
+            registry['last_reload_seconds'] = reload_seconds
+            registry['max_reload_seconds'] = max(reload_seconds, \
+                                        registry['max_reload_seconds'])
+        finally:
+            registry['lock'].release()
+
+        reload_count = reload_count + 1
+
+        if debug:
+            print "Reloaded model for", lexelt, "in", reload_seconds, "s"
+
+    return reload_count
+
+###############################################################################
+# End of reload_registry_models function
+###############################################################################
+
+###############################################################################
+# Function      : watch_registry_models(registry, interval_seconds)
+# Description   : This function starts a background thread which checks the
+#                 files of loaded models every interval_seconds and hot 
+#                 reloads the changed ones (see reload_registry_models),
+#                 until stop_watching_registry is called.
+# Arguments     : registry - dict object holding the registry
+#                 interval_seconds - seconds between checks
+# Returns       : None.
+###############################################################################
+
+def watch_registry_models(registry, interval_seconds):
+
+    stop_event = threading.Event()
+
+    watcher_thread = threading.Thread(target=run_registry_watcher, \
+                            args=(registry, interval_seconds, stop_event))
+    watcher_thread.daemon = True
+    watcher_thread.start()
+
+    registry['watcher'] = (watcher_thread, stop_event)
+
+###############################################################################
+# End of watch_registry_models function
+###############################################################################
+
+###############################################################################
+# Function      : stop_watching_registry(registry)
+# Description   : This function stops the watcher thread of registry and 
+#                 waits for it to finish a reload it may be doing.
+# Arguments     : registry - dict object holding the registry
+# Returns       : None.
+###############################################################################
+
+def stop_watching_registry(registry):
+
+    watcher_thread, stop_event = registry.pop('watcher')
+
+    stop_event.set()
+    watcher_thread.join()
+
+###############################################################################
+# End of stop_watching_registry function
+###############################################################################
+
+###############################################################################
+# Function      : run_registry_watcher(registry, interval_seconds, 
+#                                      stop_event)
+# Description   : This function is the body of the watcher thread started
+#                 by watch_registry_models.
+# Arguments     : registry - dict object holding the registry
+#                 interval_seconds - seconds between checks
+#                 stop_event - threading.Event which stops the watcher
+# Returns       : None.
+###############################################################################
+
+def run_registry_watcher(registry, interval_seconds, stop_event):
+
+    while not stop_event.wait(interval_seconds):
+        reload_registry_models(registry)
+
+###############################################################################
+# End of run_registry_watcher function
+###############################################################################
+
+###############################################################################
+# Function      : build_target_automaton(target_forms_dict)
+# Description   : This function builds an Aho-Corasick automaton over the 
+#                 surface forms of all ambiguous words known to the loaded
+#                 models, so that all of them can be found in a raw text in
+#                 a single pass.
+# Arguments     : target_forms_dict - dict object mapping each surface form
+#                                     (in lower case) to the list of lexelt
+#                                     items it belongs to
+# Returns       : 1) A dict object holding the automaton. It has goto_list
+#                    (transitions of each state), fail_list (failure link of
+#                    each state), output_list (forms ending at each state)
+#                    and target_forms_dict.
+###############################################################################
+
+def build_target_automaton(target_forms_dict):
+
+    '''
+    State 0 is the root of the trie. For every state, goto_list has a dict
+    mapping a character to the next state, fail_list has the state to fall
+    back to on a mismatch and output_list has the forms which end at it.
+    '''
+    goto_list = [{}]
+    fail_list = [0]
+    output_list = [[]]
+
+    # insert every surface form into the trie
+    for form in target_forms_dict.keys():
+        state = 0
+        for char in form:
+            if char not in goto_list[state]:
+                goto_list.append({})
+                fail_list.append(0)
+                output_list.append([])
+                goto_list[state][char] = len(goto_list) - 1
+            state = goto_list[state][char]
+        output_list[state].append(form)
+
+    '''
+    Set the failure links with a breadth first traversal of the trie. The
+    failure link of a state points to the state for the longest proper
+    suffix of its string which is also present in the trie. Outputs of 
+    that state are also the outputs of current state.
+    '''
+    state_queue = collections.deque(goto_list[0].values())
+
+    while state_queue:
+        state = state_queue.popleft()
+        for char, next_state in goto_list[state].items():
+            state_queue.append(next_state)
+
+            fail_state = fail_list[state]
+            while fail_state != 0 and char not in goto_list[fail_state]:
+                fail_state = fail_list[fail_state]
+
+            if state != 0 and char in goto_list[fail_state]:
+                fail_list[next_state] = goto_list[fail_state][char]
+
+            output_list[next_state] = output_list[next_state] + \
+                                      output_list[fail_list[next_state]]
+
+    automaton = {}
+    automaton['goto_list'] = goto_list
+    automaton['fail_list'] = fail_list
+    automaton['output_list'] = output_list
+    automaton['target_forms_dict'] = target_forms_dict
+
+    return automaton
+
+###############################################################################
+# End of build_target_automaton function
+###############################################################################
+
+###############################################################################
+# Function      : find_target_words(automaton, text)
+# Description   : This function scans a raw text once with the Aho-Corasick
+#                 automaton and finds every occurrence of the known 
+#                 ambiguous words in it.
+# Arguments     : automaton - automaton built by build_target_automaton
+#                 text - raw text in lower case
+# Returns       : 1) A list of (start offset, end offset, form) tuples for
+#                    the occurrences found. Only whole words are reported
+#                    and overlapping occurrences are resolved in favour of
+#                    the leftmost longest one.
+###############################################################################
+
+def find_target_words(automaton, text):
+
+    goto_list = automaton['goto_list']
+    fail_list = automaton['fail_list']
+    output_list = automaton['output_list']
+
+    match_list = []
+    state = 0
+
+    for char_pos in range(0, len(text)):
+        char = text[char_pos]
+
+        while state != 0 and char not in goto_list[state]:
+            state = fail_list[state]
+
+        state = goto_list[state].get(char, 0)
+
+        for form in output_list[state]:
+            start = char_pos - len(form) + 1
+            end = char_pos + 1
+
+            '''
+            Report the form only if it is a whole word i.e. it is not 
+            preceded or followed by a letter or digit
+            '''
+            if start > 0 and (text[start - 1].isalnum() or \
+                              text[start - 1] == '_'):
+                continue
+
+            if end < len(text) and (text[end].isalnum() or \
+                                    text[end] == '_'):
+                continue
+
+            match_list.append((start, end, form))
+
+    # keep the leftmost longest occurrences which do not overlap
+    match_list.sort(key=lambda match: (match[0], -match[1]))
+
+    target_match_list = []
+    last_end = 0
+
+    for match in match_list:
+        if match[0] >= last_end:
+            target_match_list.append(match)
+            last_end = match[1]
+
+    return target_match_list
+
+###############################################################################
+# End of find_target_words function
+###############################################################################
+
+###############################################################################
+# Function      : get_raw_text_context_tokens(text, target_match_list, 
+#                                             query_obj)
+# Description   : This function finds the lemmatized tokens around all 
+#                 ambiguous word occurrences of a raw text. The text is
+#                 tagged and lemmatized only once for all occurrences. The
+#                 windows are cut from the tokens later, with the window 
+#                 size of each model scoring the occurrence.
+# Arguments     : text - raw text in lower case
+#                 target_match_list - occurrences found by find_target_words
+#                 query_obj - a MontyLingua object
+# Returns       : 1) A list of (left tokens, right tokens) pairs (as 
+#                    returned by get_context_tokens), one for each 
+#                    occurrence in target_match_list
+###############################################################################
+
+def get_raw_text_context_tokens(text, target_match_list, query_obj):
+
+    '''
+    Mark every occurrence with the identifier @ (like <head> tags are 
+    marked for Senseval data) and tag the whole text in one go.
+    '''
+    text_part_list = []
+    prev_end = 0
+
+    for start, end, form in target_match_list:
+        text_part_list.append(text[prev_end:start])
+        text_part_list.append(" @ ")
+        text_part_list.append(text[start:end])
+        prev_end = end
+
+    text_part_list.append(text[prev_end:])
+    marked_text = "".join(text_part_list)
+
+    tagged_text = query_obj.tag_tokenized(query_obj.tokenize(marked_text))
+    tags_list = get_lemmatized_sent(query_obj, tagged_text).split()
+
+    '''
+    Remove the identifiers from the tags list and remember where each of 
+    them was, so that the windows of an occurrence are not disturbed by
+    identifiers of neighbouring occurrences.
+    '''
+    context_tags_list = []
+    head_pos_list = []
+
+    for tag in tags_list:
+        if tag == "@/IN/@":
+            head_pos_list.append(len(context_tags_list))
+        else:
+            context_tags_list.append(tag)
+
+    context_tokens_list = []
+
+    if len(head_pos_list) != len(target_match_list):
+        '''
+        Tokenizer did not keep the identifiers apart from the text around 
+        them. Tag the context of each occurrence on its own.
+        '''
+        for start, end, form in target_match_list:
+            context_sent = text[:start] + " <head>" + text[start:end] + \
+                           "</head> " + text[end:]
+            context_tokens_list.append(get_context_tokens(context_sent, \
+                                                          query_obj))
+        return context_tokens_list
+
+    for head_pos in head_pos_list:
+        context_tokens_list.append((context_tags_list[0:head_pos], \
+                                    context_tags_list[head_pos + 1:]))
+
+    return context_tokens_list
+
+###############################################################################
+# End of get_raw_text_context_tokens function
+###############################################################################
+
+###############################################################################
+# Function      : tag_raw_documents(raw_file_name_list, registry, 
+#                                   op_file_handle)
+# Description   : This function tags every occurrence of every ambiguous 
+#                 word known to the models of a registry in raw text 
+#                 documents. Each model scores an occurrence with the 
+#                 window size it was trained with.
+# Arguments     : raw_file_name_list - list of names of raw text documents
+#                 registry - model registry serving the models
+#                 op_file_handle - handle of output file
+# Returns       : None.
+###############################################################################
+
+def tag_raw_documents(raw_file_name_list, registry, op_file_handle):
+
+    '''
+    Map each surface form of the ambiguous words to the lexelt items of 
+    models which know it. Models are loaded only when their word is found
+    in a document.
+    '''
+    target_forms_dict = {}
+
+    for lexelt in get_registry_lexelts(registry):
+        head_word_forms = get_registry_head_forms(registry, lexelt)
+        if head_word_forms is None:
+            continue
+
+        for form in head_word_forms:
+            if form not in target_forms_dict:
+                target_forms_dict[form] = []
+            if lexelt not in target_forms_dict[form]:
+                target_forms_dict[form].append(lexelt)
+
+    if debug:
+        print target_forms_dict
+
+    automaton = build_target_automaton(target_forms_dict)
+
+    query_obj = get_tagger()
+
+    for raw_file_name in raw_file_name_list:
+
+        raw_file_handle = open_corpus_file(raw_file_name)
+        text = raw_file_handle.read()
+        raw_file_handle.close()
+
+        '''
+        Bring the text in lower case, as it is done for context sentences,
+        and remove the @ characters already present in it as @ is used to
+        mark the ambiguous words. Both keep the offsets of text intact.
+        '''
+        text = text.lower().replace("@", " ")
+
+        target_match_list = find_target_words(automaton, text)
+
+        if len(target_match_list) == 0:
+            continue
+
+        context_tokens_list = get_raw_text_context_tokens(text, \
+                                            target_match_list, query_obj)
+
+        doc_name = os.path.basename(raw_file_name)
+
+        for i in range(0, len(target_match_list)):
+            start, end, form = target_match_list[i]
+            left_list, right_list = context_tokens_list[i]
+
+            '''
+            Models of the lexelt items of a form may be trained with 
+            different window sizes. Cut the window of each size only once.
+            '''
+            feature_vector_dict = {}
+
+            for lexelt in target_forms_dict[form]:
+                model = get_registry_model(registry, lexelt)
+
+                window_size = model['window_size']
+                if window_size not in feature_vector_dict:
+                    feature_vector_dict[window_size] = \
+                        get_window_lemmas_and_tags(left_list, right_list, \
+                                                   window_size)
+                lemma_list, pos_tags_list = feature_vector_dict[window_size]
+
+                max_prob_sense = get_max_prob_sense(lemma_list, \
+                                                    pos_tags_list, model)
+
+                op_file_handle.write(lexelt + " " + doc_name + ":" + \
+                                     str(start) + " " + max_prob_sense + "\n")
+
+###############################################################################
+# End of tag_raw_documents function
+###############################################################################
+
+###############################################################################
+# Function      : get_checkpoint_key(args)
+# Description   : This function describes the run a checkpoint belongs to,
+#                 by the contents of training and test files and the 
+#                 settings which change the model or the output. A 
+#                 checkpoint is only resumed by a run with the same key.
+# Arguments     : args - parsed command line arguments (see 
+#                        get_legacy_argument_parser)
+# Returns       : 1) A dict object describing the run
+###############################################################################
+
+def get_checkpoint_key(args):
+
+    checkpoint_key = {}
+    checkpoint_key['train_hash'] = \
+                        get_corpus_hash(args.train_file_name_list[0])
+    checkpoint_key['test_hash'] = get_corpus_hash(args.test_file_name)
+    checkpoint_key['window_size'] = args.window_size
+    checkpoint_key['min_count'] = args.min_count
+    checkpoint_key['top_k'] = args.top_k
+    checkpoint_key['mi_threshold'] = args.mi_threshold
+    checkpoint_key['compact'] = args.compact_model_file_name is not None
+    checkpoint_key['max_per_sense'] = args.max_per_sense
+    checkpoint_key['sample_seed'] = args.sample_seed
+    checkpoint_key['sketch_width'] = args.sketch_width
+    checkpoint_key['sketch_depth'] = args.sketch_depth
+    checkpoint_key['knn_k'] = args.knn_k
+    checkpoint_key['knn_lexelt_list'] = args.knn_lexelt_list
+    checkpoint_key['decision_lexelt_list'] = args.decision_lexelt_list
+
+    return checkpoint_key
+
+###############################################################################
+# End of get_checkpoint_key function
+###############################################################################
+
+###############################################################################
+# Function      : save_checkpoint(checkpoint_dir, checkpoint_key, 
+#                                 checkpoint_models, progress)
+# Description   : This function saves a checkpoint of a test run into a 
+#                 directory. The trained models are saved into 
+#                 "models.pickle" once, when they are given, and the 
+#                 progress through test instances into "progress.json".
+#                 Both are written under temporary names and renamed, so a
+#                 run dying while saving leaves the previous checkpoint.
+# Arguments     : checkpoint_dir - Name of checkpoint directory
+#                 checkpoint_key - dict describing the run (see 
+#                                  get_checkpoint_key)
+#                 checkpoint_models - dict of the trained models, or None
+#                                     to only save the progress
+#                 progress - dict holding the number of instances done,
+#                            the sizes of output files at that point and 
+#                            the running compact model statistics
+# Returns       : None.
+###############################################################################
+
+def save_checkpoint(checkpoint_dir, checkpoint_key, checkpoint_models, \
+                    progress):
+
+    if not os.path.isdir(checkpoint_dir):
+        os.makedirs(checkpoint_dir)
+
+    temp_suffix = "." + str(os.getpid()) + ".tmp"
+    progress_file_name = os.path.join(checkpoint_dir, "progress.json")
+
+    if checkpoint_models is not None:
+        models_file_name = os.path.join(checkpoint_dir, "models.pickle")
+
+        # the old progress does not belong to the new models
+        if os.path.isfile(progress_file_name):
+            os.remove(progress_file_name)
+
+        models_file_handle = open(models_file_name + temp_suffix, 'wb')
+        cPickle.dump(checkpoint_models, models_file_handle, \
+                     cPickle.HIGHEST_PROTOCOL)
+        models_file_handle.close()
+        os.rename(models_file_name + temp_suffix, models_file_name)
+
+    progress_data = {'checkpoint_key': checkpoint_key, 'progress': progress}
+
+    progress_file_handle = open(progress_file_name + temp_suffix, 'w')
+    json.dump(progress_data, progress_file_handle, sort_keys=True)
+    progress_file_handle.flush()
+    os.fsync(progress_file_handle.fileno())
+    progress_file_handle.close()
+    os.rename(progress_file_name + temp_suffix, progress_file_name)
+
+###############################################################################
+# End of save_checkpoint function
+###############################################################################
+
+###############################################################################
+# Function      : load_checkpoint(checkpoint_dir, checkpoint_key)
+# Description   : This function loads the checkpoint of a test run saved 
+#                 by save_checkpoint, if there is one for the same run.
+# Arguments     : checkpoint_dir - Name of checkpoint directory
+#                 checkpoint_key - dict describing the run (see 
+#                                  get_checkpoint_key)
+# Returns       : 1) The dict of trained models, or None if there is no 
+#                    checkpoint for the run
+#                 2) The progress dict (see save_checkpoint), or None
+###############################################################################
+
+def load_checkpoint(checkpoint_dir, checkpoint_key):
+
+    progress_file_name = os.path.join(checkpoint_dir, "progress.json")
+    models_file_name = os.path.join(checkpoint_dir, "models.pickle")
+
+    if not os.path.isfile(progress_file_name) or \
+       not os.path.isfile(models_file_name):
+        return None, None
+
+    progress_file_handle = open(progress_file_name, 'r')
+    progress_data = json.load(progress_file_handle)
+    progress_file_handle.close()
+
+    # compare through JSON, as the loaded key has unicode strings
+    if progress_data['checkpoint_key'] != \
+       json.loads(json.dumps(checkpoint_key)):
+        return None, None
+
+    models_file_handle = open(models_file_name, 'rb')
+    checkpoint_models = cPickle.load(models_file_handle)
+    models_file_handle.close()
+
+    return checkpoint_models, progress_data['progress']
+
+###############################################################################
+# End of load_checkpoint function
+###############################################################################
+
+###############################################################################
+# Function      : open_resumed_output(op_file_name, op_file_size)
+# Description   : This function opens an output file to continue writing
+#                 it from a checkpoint. Lines written after the checkpoint
+#                 are cut off, so the file goes on exactly as in a run that
+#                 was not interrupted.
+# Arguments     : op_file_name - Name of output file
+#                 op_file_size - size of the file at the checkpoint, or 
+#                                None to start a new file
+# Returns       : 1) Handle of the output file opened for writing
+###############################################################################
+
+def open_resumed_output(op_file_name, op_file_size):
+
+    if op_file_size is None or not os.path.isfile(op_file_name):
+        return open(op_file_name, 'w')
+
+    op_file_handle = open(op_file_name, 'r+')
+    op_file_handle.truncate(op_file_size)
+    op_file_handle.seek(0, os.SEEK_END)
+
+    return op_file_handle
+
+###############################################################################
+# End of open_resumed_output function
+###############################################################################
+
+###############################################################################
+# Function      : is_output_resumable(op_file_name, op_file_size)
+# Description   : This function tells whether an output file still has all
+#                 the lines it had at a checkpoint.
+# Arguments     : op_file_name - Name of output file
+#                 op_file_size - size of the file at the checkpoint, or 
+#                                None if nothing was written before it
+# Returns       : 1) True if writing can go on after the checkpoint
+###############################################################################
+
+def is_output_resumable(op_file_name, op_file_size):
+
+    if op_file_size is None:
+        return True
+
+    return os.path.isfile(op_file_name) and \
+           os.path.getsize(op_file_name) >= op_file_size
+
+###############################################################################
+# End of is_output_resumable function
+###############################################################################
+
+###############################################################################
+# Function      : sync_output(op_file_handle)
+# Description   : This function makes sure that all lines written to an 
+#                 output file are on disk.
+# Arguments     : op_file_handle - handle of output file
+# Returns       : 1) Size of the output file
+###############################################################################
+
+def sync_output(op_file_handle):
+
+    op_file_handle.flush()
+    os.fsync(op_file_handle.fileno())
+
+    return op_file_handle.tell()
+
+###############################################################################
+# End of sync_output function
+###############################################################################
+
+###############################################################################
+# Function      : run_WSD(args)
+# Description   : This function trains the classifier from a training file,
+#                 tags the test file with it into "op_file" and, if a gold
+#                 std. file is given, evaluates the tagging.
+# Arguments     : args - parsed command line arguments (see 
+#                        get_legacy_argument_parser)
+# Returns       : None.
+###############################################################################
+
+def run_WSD(args):
+
+    '''
+    Get the values for test, training and gold std. files and the
+    optional settings from the parsed command line arguments. Optional
+    settings are pruning settings -pmc <minimum count>, -ptk <number of
+    top lemmas> and -pmi <minimum mutual information>, names of files 
+    to save the trained model into, -sm <model file> and 
+    -sq <compact model file>, checkpoint settings -cp <directory> and
+    -ci <number of instances>, and the shape of count-min sketches 
+    -cw <width> and -cd <depth>, which the features are counted into 
+    while they are extracted.
+    '''
+
+    train_file_name = args.train_file_name_list[0]
+    test_file_name = args.test_file_name
+    gold_std_file_name = args.gold_std_file_name
+    window_size = args.window_size
+
+    min_count = args.min_count
+    top_k = args.top_k
+    mi_threshold = args.mi_threshold
+
+    prune_flag = min_count is not None or top_k is not None or \
+                 mi_threshold is not None
+
+    sketch_shape = get_sketch_shape(args)
+
+    if debug:
+        print train_file_name
+        print test_file_name
+    
+    '''
+    With a checkpoint directory (-cp <directory>), look for the checkpoint
+    of an earlier run of the same files and settings. Its trained models 
+    are used and tagging resumes after the last checkpointed instance.
+    '''
+    checkpoint_dir = args.checkpoint_dir
+    checkpoint_models = None
+    progress = None
+
+    if checkpoint_dir is not None:
+        checkpoint_key = get_checkpoint_key(args)
+        checkpoint_models, progress = load_checkpoint(checkpoint_dir, \
+                                                      checkpoint_key)
+
+    '''
+    The instances before the checkpoint are only skipped if their lines 
+    are still in the output files. If a file was removed or cut since,
+    tag again from the first instance with the checkpointed models.
+    '''
+    if progress is not None and \
+       not (is_output_resumable("op_file", progress['op_file_size']) and \
+            is_output_resumable("op_file_unpruned", \
+                                progress['unpruned_op_file_size'])):
+        sys.stderr.write("Output of checkpoint is missing or cut, tagging " \
+                         "from the first instance\n")
+        progress = None
+
+    if progress is None:
+        progress = {'instance_count': 0, 'op_file_size': None, \
+                    'unpruned_op_file_size': None, 'max_deviation': 0.0, \
+                    'compact_agree_count': 0}
+    elif debug:
+        print "Resuming after", progress['instance_count'], "instances"
+
+    '''
+    create the output file. It will have the name as op_file
+    '''
+    op_file_handle  = open_resumed_output("op_file", \
+                                          progress['op_file_size'])
+
+    if checkpoint_models is not None:
+        model_dict, unpruned_model_dict = checkpoint_models
+
+    else:
+        '''
+        Train the naive Bayesian classifier from the training file by 
+        calling train_WSD_models() function. It retrieves the WSD data from
+        training file, calculates the prior Probabilities of senses and 
+        extracts the collocational features for the classifier. A separate
+        model is trained for each lexelt item of the training file, in 
+        parallel processes (-np <number of processes>).
+        '''
+        model_dict = train_WSD_models(train_file_name, window_size, \
+                                      args.process_count, \
+                                      args.max_per_sense, args.sample_seed, \
+                                      sketch_shape, args.knn_k, \
+                                      args.knn_lexelt_list, \
+                                      args.decision_lexelt_list)
+        unpruned_model_dict = None
+
+        '''
+        If pruning is asked for, tag the test file with the pruned models 
+        and also with the full models (into "op_file_unpruned") to report
+        the accuracy lost by pruning.
+        '''
+        if prune_flag:
+            unpruned_model_dict = model_dict
+            model_dict = collections.OrderedDict()
+            for lexelt in unpruned_model_dict.keys():
+                model_dict[lexelt] = prune_WSD_model(\
+                                unpruned_model_dict[lexelt], min_count, \
+                                top_k, mi_threshold)
+
+        if checkpoint_dir is not None:
+            save_checkpoint(checkpoint_dir, checkpoint_key, \
+                            (model_dict, unpruned_model_dict), progress)
+
+    if unpruned_model_dict is not None:
+        unpruned_op_file_handle = open_resumed_output("op_file_unpruned", \
+                                            progress['unpruned_op_file_size'])
+
+    if args.model_file_name is not None:
+        save_WSD_model_dict(model_dict, args.model_file_name, \
+                            save_WSD_model, '.model')
+
+    '''
+    If a compact model is asked for, save it and read it back to check 
+    its scores against the full precision scores on the test file.
+    '''
+    compact_model_dict = None
+
+    if args.compact_model_file_name is not None:
+        save_WSD_model_dict(model_dict, args.compact_model_file_name, \
+                            save_compact_model, '.wsdq')
+        compact_model_dict = {}
+        for lexelt in model_dict.keys():
+            if len(model_dict) == 1:
+                compact_model_file_name = args.compact_model_file_name
+            else:
+                compact_model_file_name = os.path.join(\
+                            args.compact_model_file_name, lexelt + '.wsdq')
+            compact_model_dict[lexelt] = \
+                            load_compact_model(compact_model_file_name)
+        max_deviation = progress['max_deviation']
+        compact_agree_count = progress['compact_agree_count']
+
+    '''
+    Get the instances of test file by calling read_WSD_instances() 
+    function. Each instance is tagged with the model of its lexelt item.
+    '''
+    test_instance_table = read_WSD_instances(test_file_name)
+
+    if debug:
+        print get_WSD_instance_count(test_instance_table)
+
+    '''
+    Start finding word sense for each ambiguous word instance from the test 
+    file. For this, first we need to get the feature vectors for each 
+    context sentence in the test file. Using the feature vector, likelihood
+    Probabilities for naive Bayes classifier are then calculated for each
+    sense present in training file. These feature likelihood probability is 
+    then multiplied by prior probability of each sense to get 
+    final probability. 
+    And the word-sense with highest final probability is selected for that
+    given word sequence.
+    '''
+    instance_counter = 0 
+
+    '''
+    Get the shared MontyLingua object which is used in getting 
+    collocational feature vector in later processing.
+    '''
+    query_obj = get_tagger()
+
+    '''
+    With a feature store, get the features of all test instances at once
+    so that they are loaded from the store (or saved into it).
+    '''
+    test_feature_rows = None
+
+    if feature_store_dir is not None:
+        test_feature_rows = get_context_feature_rows(\
+                            [test_instance.context_sent for test_instance \
+                             in iter_WSD_instance_table(test_instance_table)],\
+                            window_size, test_file_name)
+
+    '''
+    First iterate over the test_instance_table to get individual test 
+    instances.
+    '''
+    
+    for test_instance in iter_WSD_instance_table(test_instance_table):
+
+        '''
+        Skip the instances tagged before the checkpoint, and save a new
+        checkpoint every -ci <n> instances. The output is synced to disk 
+        before the progress, so the progress never counts lines which are
+        not on disk.
+        '''
+        if instance_counter < progress['instance_count']:
+            instance_counter = instance_counter + 1
+            continue
+
+        if checkpoint_dir is not None and instance_counter > 0 and \
+           instance_counter % args.checkpoint_interval == 0:
+            progress['instance_count'] = instance_counter
+            progress['op_file_size'] = sync_output(op_file_handle)
+            if unpruned_model_dict is not None:
+                progress['unpruned_op_file_size'] = \
+                                    sync_output(unpruned_op_file_handle)
+            if compact_model_dict is not None:
+                progress['max_deviation'] = max_deviation
+                progress['compact_agree_count'] = compact_agree_count
+            save_checkpoint(checkpoint_dir, checkpoint_key, None, progress)
+
+        test_ambiguous_word = test_instance.lexelt
+
+        '''
+        A training file with a single lexelt item gives one model, which
+        tags all test instances whatever their lexelt item is.
+        '''
+        if len(model_dict) == 1:
+            model_lexelt = model_dict.keys()[0]
+        else:
+            model_lexelt = test_ambiguous_word
+
+        if model_lexelt not in model_dict:
+            sys.stderr.write("No model for " + test_ambiguous_word + \
+                             ", skipping instance " + \
+                             test_instance.instance_id + "\n")
+            instance_counter = instance_counter + 1
+            continue
+
+        model = model_dict[model_lexelt]
+        
+        '''
+        Extract the feature vector for each context sentence.
+        Here two types of feature vectors are extracted for each sentence.
+        
+        1) Collocational feature vector : This vector will have two types 
+        of features:
+
+            a) First feature will be the lemmas of the words occurring 
+            within the window size (which will have same value as N1 for 
+            training value) on both side of ambiguous word.
+
+            b) Second feature will be POS-tags for the words occurring 
+            within the window size (which will have same value as N1 for 
+            training value) on both side of ambiguous word.
+
+        '''
+
+        '''
+        Call get_coll_feature_vector() function to get collocational 
+        feature vector. This function takes context sentence window_size 
+        and a MontyLingua object as the inputs and 
+        returns the two collocational feature vectors for that 
+        sentence.
+
+        e.g. If a context sentence in the test data is 
+
+        when we arrived in st. paul , the local office of the american 
+        automobile association had a hard time directing us to bethel 
+        college .  
+
+        , where hard is the target word, and if window size is 9 then
+
+        first collocation feature vector will be the list containing lemmas
+        of 9 words present on right and left side of word 'hard'.
+        
+        
+        ['local', 'office', 'of', 'the', 'american', 'automobile', 
+        'association', 'have', 'a', 'time', 'direct', 'us', 'to', 'bethel',
+        'college', '.', 'dummyLemma', 'dummyLemma']
+        
+        second collocation feature vector will be the list containing 
+        pos-tags of 9 words present on right and left side of word 'hard'.
+
+                
+        ['JJ', 'NN', 'IN', 'DT', 'JJ', 'NN', 'NN', 'VBD', 'DT', 'NN', 'VBG'
+        , 'PRP', 'TO', 'NN', 'NN', '.', 'DUMMY', 'DUMMY']
+
+        '''
+
+        if test_feature_rows is not None:
+            lemma_list = test_feature_rows[0][instance_counter]
+            pos_tags_list = test_feature_rows[1][instance_counter]
+        else:
+            lemma_list, pos_tags_list = \
+            get_coll_feature_vector(test_instance.context_sent, \
+                                    window_size, query_obj)
+        
+        '''
+        Get the sense with maximum final probability (prior prob 
+        multiplied by likelihood prob) by calling get_max_prob_sense()
+        '''
+        max_prob_sense = get_max_prob_sense(lemma_list, pos_tags_list, \
+                                            model)
+    
+        # write the max prob sense as the final sense into op file
+        op_file_handle.write(test_ambiguous_word + " " +  \
+                             test_instance.instance_id + \
+                              " " + max_prob_sense + "\n")
         
-        First dict object has :
+        if unpruned_model_dict is not None:
+            unpruned_op_file_handle.write(test_ambiguous_word + " " + \
+                                test_instance.instance_id + \
+                                " " + get_max_prob_sense(lemma_list, \
+                                pos_tags_list, \
+                                unpruned_model_dict[model_lexelt]) \
+                                + "\n")
+
+        if compact_model_dict is not None:
+            compact_model = compact_model_dict[model_lexelt]
+
+            sense_to_lkhd_mapping_dict = get_count_feature_prob(\
+                                lemma_list, \
+                                model['sense_position_counts_dict'], \
+                                model['sense_instance_count_dict'], \
+                                model['sense_list'])
+            compact_sense_to_lkhd_mapping_dict = \
+                    get_compact_feature_prob(lemma_list, compact_model)
+
+            for sense in model['sense_list']:
+                max_deviation = max(max_deviation, abs(\
+                    math.log10(sense_to_lkhd_mapping_dict[sense]) - \
+                    math.log10(compact_sense_to_lkhd_mapping_dict[sense])))
+
+            if get_max_prob_sense(lemma_list, pos_tags_list, \
+                                  compact_model) == max_prob_sense:
+                compact_agree_count = compact_agree_count + 1
+
+        instance_counter = instance_counter + 1
+
+    '''
+    Mark all instances done in the checkpoint, so that a run started again
+    only evaluates the output.
+    '''
+    if checkpoint_dir is not None and \
+       instance_counter > progress['instance_count']:
+        progress['instance_count'] = instance_counter
+        progress['op_file_size'] = sync_output(op_file_handle)
+        if unpruned_model_dict is not None:
+            progress['unpruned_op_file_size'] = \
+                                sync_output(unpruned_op_file_handle)
+        if compact_model_dict is not None:
+            progress['max_deviation'] = max_deviation
+            progress['compact_agree_count'] = compact_agree_count
+        save_checkpoint(checkpoint_dir, checkpoint_key, None, progress)
+        
+    op_file_handle.close()
+
+
+    if unpruned_model_dict is not None:
+        unpruned_op_file_handle.close()
+
+    if compact_model_dict is not None:
+        print "Compact model size (bytes)       :", \
+              sum([len(compact_model['compact_buffer']) for compact_model \
+                   in compact_model_dict.values()])
+        print "Compact model tolerance (log10)  :", \
+              max([get_compact_model_tolerance(compact_model) for \
+                   compact_model in compact_model_dict.values()])
+        print "Max likelihood deviation (log10) :", max_deviation
+        print "Senses same as full model (%)    :", \
+              float(compact_agree_count) * 100 / max(instance_counter, 1)
+
+    '''
+    If no gold std. file is given, there is nothing more to do.
+    '''
+    if gold_std_file_name is None:
+        return
+
+    '''
+    Now that we have our final o/p file "op_file", compare it against
+    the gold std file to assess overall accuracy of classifier.
+    For this call evaluate_tagging function. 
+    It takes following parameters:
+    1) Name of the output file
+    2) Name of gold std key file
+
+    This function calculates overall accuracy of the classifier and also
+    outputs the confusion matrix, which shows the percentage of times
+    a word sense is wrongly tagged with other word sense.
+    '''
+
+    accuracy = evaluate_tagging("op_file",  gold_std_file_name)
+
+    if prune_flag:
+        unpruned_accuracy = evaluate_tagging("op_file_unpruned", \
+                                             gold_std_file_name)
+
+        print "Model size before pruning :", \
+              sum([get_model_size(unpruned_model\
+                                  ['sense_position_counts_dict']) \
+                   for unpruned_model in unpruned_model_dict.values()])
+        print "Model size after pruning  :", \
+              sum([get_model_size(model['sense_position_counts_dict']) \
+                   for model in model_dict.values()])
+        print "Accuracy before pruning   :", unpruned_accuracy
+        print "Accuracy after pruning    :", accuracy
+        print "Accuracy delta            :", accuracy - unpruned_accuracy
+
+    elif sketch_shape is not None:
+        '''
+        The exact counts are never built with sketches, so the accuracy 
+        lost is found by running again without -cw.
+        '''
+        print_sketch_error_bounds(model_dict)
+        print "Accuracy with sketches               :", accuracy
+
+###############################################################################
+# End of run_WSD function
+###############################################################################
+
+###############################################################################
+# Function      : run_raw_tagging(args)
+# Description   : This function tags all known ambiguous words in raw text
+#                 documents into "op_file". The models are either trained 
+#                 from the training files or loaded from the model directory
+#                 as they are needed, keeping at most memory cap bytes of 
+#                 models in memory.
+# Arguments     : args - parsed command line arguments (see 
+#                        get_legacy_argument_parser)
+# Returns       : None.
+###############################################################################
+
+def run_raw_tagging(args):
+
+    if args.train_file_name_list is not None:
+        registry = create_model_registry(None, None)
+        for train_file_name in args.train_file_name_list:
+            model_dict = train_WSD_models(train_file_name, \
+                                          args.window_size, \
+                                          args.process_count, \
+                                          args.max_per_sense, \
+                                          args.sample_seed, \
+                                          get_sketch_shape(args), \
+                                          args.knn_k, args.knn_lexelt_list, \
+                                          args.decision_lexelt_list)
+            for lexelt in model_dict.keys():
+                add_registry_model(registry, lexelt, model_dict[lexelt])
+    else:
+        registry = create_model_registry(args.model_dir, args.memory_cap)
+
+    op_file_handle  = open("op_file", 'w')
+    tag_raw_documents(args.raw_file_name_list, registry, op_file_handle)
+    op_file_handle.close()
+
+    registry_stats = get_registry_stats(registry)
+    print "Model loads     :", registry_stats['load_count']
+    print "Model hits      :", registry_stats['hit_count']
+    print "Model evictions :", registry_stats['evict_count']
+    print "Model memory    :", registry_stats['memory_used']
+
+###############################################################################
+# End of run_raw_tagging function
+###############################################################################
+
+###############################################################################
+# Function      : predict_WSD_stream(wsd_data_lines, model_lookup, 
+#                                    op_file_handle, deadline_seconds)
+# Description   : This function tags the instances read from lines of a test
+#                 file as soon as each of them is complete, and writes 
+#                 "lexelt instance sense" lines for them. The output is
+#                 flushed after every line, so that it can be used in a
+#                 pipeline processing an unbounded feed. With a deadline,
+#                 each instance is classified within it (see 
+#                 classify_with_deadline) and the path used is written as
+#                 a fourth field.
+# Arguments     : wsd_data_lines - any iterable giving lines of test data
+#                 model_lookup - function giving the model for a lexelt item
+#                                (or None if there is no model for it)
+#                 op_file_handle - handle of output file
+#                 deadline_seconds - latency budget for each instance, or 
+#                                    None for no budget (optional)
+# Returns       : 1) The degradation stats (see create_degradation_stats),
+#                    or None without a deadline
+###############################################################################
+
+def predict_WSD_stream(wsd_data_lines, model_lookup, op_file_handle, \
+                       deadline_seconds=None):
+
+    query_obj = get_tagger()
+
+    if deadline_seconds is not None:
+        degradation_stats = create_degradation_stats()
+    else:
+        degradation_stats = None
+
+    for ambiguous_word, instance_id, sense_id, context_sent in \
+                                        iter_WSD_instances(wsd_data_lines):
+
+        model = model_lookup(ambiguous_word)
+
+        if model is None:
+            sys.stderr.write("No model for " + ambiguous_word + \
+                             ", skipping instance " + instance_id + "\n")
+            continue
+
+        if degradation_stats is not None:
+            max_prob_sense, path = classify_with_deadline(context_sent, \
+                                    model, query_obj, deadline_seconds, \
+                                    degradation_stats)
+            op_file_handle.write(ambiguous_word + " " + instance_id + " " + \
+                                 max_prob_sense + " " + path + "\n")
+            op_file_handle.flush()
+            continue
+
+        lemma_list, pos_tags_list = get_coll_feature_vector(context_sent, \
+                                            model['window_size'], query_obj)
+
+        max_prob_sense = get_max_prob_sense(lemma_list, pos_tags_list, model)
+
+        op_file_handle.write(ambiguous_word + " " + instance_id + " " + \
+                             max_prob_sense + "\n")
+        op_file_handle.flush()
+
+    return degradation_stats
+
+###############################################################################
+# End of predict_WSD_stream function
+###############################################################################
+
+###############################################################################
+# Function      : run_WSD_pipeline(wsd_data_lines, model_lookup, 
+#                                  op_file_handle, tag_worker_count,
+#                                  score_worker_count, queue_size)
+# Description   : This function tags the instances read from lines of a test
+#                 file like predict_WSD_stream, but runs parsing, tagging,
+#                 scoring and writing as separate stages connected by 
+#                 bounded queues, so that reading input, tagging and scoring
+#                 overlap. Tagging and scoring have their own number of 
+#                 workers. Tagging is CPU bound, so with more than one 
+#                 tagging worker the contexts are tagged in a pool of that
+#                 many processes, each with its own copy of the tagger.
+#                 Scoring workers are threads. Instances are numbered when
+#                 parsed and the writer puts them back in this order, so 
+#                 the output is the same as that of predict_WSD_stream. The
+#                 depth of each queue is sampled while the pipeline runs, a
+#                 queue which is often full shows that the stage reading it
+#                 is the bottleneck. An error reading the test data or 
+#                 writing the output stops the pipeline and is raised again
+#                 here, after all stages have finished.
+# Arguments     : wsd_data_lines - any iterable giving lines of test data
+#                 model_lookup - function giving the model for a lexelt item
+#                                (or None if there is no model for it)
+#                 op_file_handle - handle of output file
+#                 tag_worker_count - number of tagging processes
+#                 score_worker_count - number of scoring threads
+#                 queue_size - maximum number of instances waiting in each
+#                              queue
+# Returns       : 1) A dict object mapping each stage to its stats: number
+#                    of instances, seconds spent working and maximum and 
+#                    mean depth of its input queue
+###############################################################################
 
-        i) The word-senses as the keys of dict  and 
-        ii) The values for these keys are the lists of lists showing lemmas of 
-        'N1' context words on both right and left sides of the 
-        ambiguous target word
+def run_WSD_pipeline(wsd_data_lines, model_lookup, op_file_handle, \
+                     tag_worker_count, score_worker_count, queue_size):
 
-        Second dict object has:
+    pipeline_state = {}
+    pipeline_state['queues'] = {}
+    for stage in PIPELINE_STAGES[1:]:
+        pipeline_state['queues'][stage] = Queue.Queue(queue_size)
 
-        i) The word-senses as the keys of dict  and 
-        ii) The values for these keys are the lists of lists showing POS tags 
-        of 'N1' context words on both right and left sides of the ambiguous 
-        target word
-  
+    pipeline_state['stats'] = collections.OrderedDict()
+    for stage in PIPELINE_STAGES:
+        pipeline_state['stats'][stage] = {'instance_count': 0, \
+                                          'busy_seconds': 0.0, \
+                                          'max_queue_depth': 0, \
+                                          'queue_depth_total': 0, \
+                                          'queue_depth_samples': 0}
 
-        e.g. If the training data for an ambiguous word 'interest ' has 
-        two senses like 'interest_6' and 'interest_4' and the context sentences
-        for these two senses are as follows:
-        
-        1) For 'interest_6':   <s> the firm has been racing to complete the 
-                                transaction by its Oct. 15 deadline to avoid a 
-                                bankruptcy filing , after having failed to make
-                                <head>interest</head> payments in June on 
-                                nearly $ 1 billion of debt . </s> 
+    # number of workers still running in each stage
+    pipeline_state['running_counts'] = {'tag': tag_worker_count, \
+                                        'score': score_worker_count}
+    pipeline_state['lock'] = threading.Lock()
+    pipeline_state['done_event'] = threading.Event()
 
-        
-        2) For 'interest_4':   <s> they say they represent the `` public 
-                               <head>interest</head> '' but they do n't do so 
-                               badly for their own *interests , either . </s> 
-                                
-                               <s> when international business machines hit a 
-                               52-week low on tuesday , it stirred some 
-                               <head>interest</head> among 
-                               bottom-fishers . </s> 
-
-                              
-
-        And suppose we decide to have word-window size N1 as 2, then the 
-        contents of two dict objects returned by get_coll_features() might 
-        look something like this:
-
-        First dict object:
-
-        ----------------------------------------------------------------
-        |  key          |       value                                  |
-        ----------------------------------------------------------------
-        | interest_6    |   [[to, make, payment, in]]                  |
-        ----------------------------------------------------------------
-        | interest_4    |   [[the,public,but,they],[stir,some,among,   |
-        |               |   bottom-fishers]]                           |
-        ----------------------------------------------------------------   
-
-        Second dict object:
-
-        ----------------------------------------------------------------
-        |  key          |       value                                  |
-        ----------------------------------------------------------------
-        | interest_6    |   [[DT, VB, NNP, IN]]                        |
-        ----------------------------------------------------------------
-        | interest_4    |   [[DT,JJ,CC,PRP],[VB,DT,IN,                 |
-        |               |   NNP]]                                      |
-        ---------------------------------------------------------------- 
-        '''
+    # sys.exc_info() of the first error which stopped a stage
+    pipeline_state['error_info'] = None
 
-        # initialize variable for window size
-        window_size = 2
+    # the tagger is created before the workers start using it
+    get_tagger()
 
-        # call get_coll_features() function
-        sense_context_words_mapping_dict, sense_pos_tags_mapping_dict = \
-        get_coll_features(sense_id_list, context_sent_list, window_size)
- 
-        '''
-        Get the WSD data items from test file by calling get_WSD_data() 
-        function
-        '''
-        test_ambiguous_word, test_instance_id_list, test_sense_id_list, \
-        test_context_sent_list = get_WSD_data(test_file_name)
+    '''
+    Threads tagging at the same time would only take turns under the 
+    interpreter lock, and would all use the one MontyLingua object. So 
+    more than one tagging worker gets a pool of processes, forked after 
+    the tagger is loaded so that they start with a copy of it (like 
+    train_WSD_models), and each tagging thread only hands its contexts to
+    the pool. The pool is made before any pipeline thread starts.
+    '''
+    if tag_worker_count > 1:
+        pipeline_state['tag_pool'] = multiprocessing.Pool(tag_worker_count)
+    else:
+        pipeline_state['tag_pool'] = None
+
+    thread_list = [threading.Thread(target=run_pipeline_parse_stage, \
+                            args=(pipeline_state, wsd_data_lines, \
+                                  tag_worker_count))]
+    for i in range(0, tag_worker_count):
+        thread_list.append(threading.Thread(target=run_pipeline_tag_stage, \
+                            args=(pipeline_state, score_worker_count)))
+    for i in range(0, score_worker_count):
+        thread_list.append(threading.Thread(\
+                            target=run_pipeline_score_stage, \
+                            args=(pipeline_state, model_lookup)))
+    thread_list.append(threading.Thread(target=run_pipeline_write_stage, \
+                            args=(pipeline_state, op_file_handle)))
+
+    monitor_thread = threading.Thread(target=run_pipeline_monitor, \
+                                      args=(pipeline_state,))
+
+    for thread in thread_list + [monitor_thread]:
+        thread.daemon = True
+        thread.start()
+
+    for thread in thread_list:
+        thread.join()
+
+    if pipeline_state['tag_pool'] is not None:
+        pipeline_state['tag_pool'].close()
+        pipeline_state['tag_pool'].join()
+
+    pipeline_state['done_event'].set()
+    monitor_thread.join()
+
+    if pipeline_state['error_info'] is not None:
+        error_type, error, error_traceback = pipeline_state['error_info']
+        raise error_type, error, error_traceback
+
+    pipeline_stats = collections.OrderedDict()
+    for stage in PIPELINE_STAGES:
+        stage_stats = pipeline_state['stats'][stage]
+        pipeline_stats[stage] = {}
+        pipeline_stats[stage]['instance_count'] = \
+                                        stage_stats['instance_count']
+        pipeline_stats[stage]['busy_seconds'] = stage_stats['busy_seconds']
+        pipeline_stats[stage]['max_queue_depth'] = \
+                                        stage_stats['max_queue_depth']
+        pipeline_stats[stage]['mean_queue_depth'] = \
+                                float(stage_stats['queue_depth_total']) / \
+                                max(stage_stats['queue_depth_samples'], 1)
+
+    return pipeline_stats
 
-        if debug:
-            print test_ambiguous_word 
-            print test_instance_id_list 
-            print test_sense_id_list
-            print test_context_sent_list
+###############################################################################
+# End of run_WSD_pipeline function
+###############################################################################
 
-        '''
-        Start finding word sense for each ambiguous word instance from the test 
-        file. For this, first we need to get the feature vectors for each 
-        context sentence in the test file. Using the feature vector, likelihood
-        Probabilities for naive Bayes classifier are then calculated for each
-        sense present in training file. These feature likelihood probability is 
-        then multiplied by prior probability of each sense to get 
-        final probability. 
-        And the word-sense with highest final probability is selected for that
-        given word sequence.
-        '''
-        instance_counter = 0 
+###############################################################################
+# Function      : add_pipeline_stage_time(pipeline_state, stage, start_time)
+# Description   : This function counts an instance handled by a pipeline 
+#                 stage and the time spent on it.
+# Arguments     : pipeline_state - state of the pipeline (see 
+#                                  run_WSD_pipeline)
+#                 stage - name of the stage
+#                 start_time - time the stage started working on instance
+# Returns       : None.
+###############################################################################
 
-        '''
-        Create a MontyLingua object which is used in getting collocational
-        feature vector in later processing.
-        '''
-        query_obj = MontyLingua()
+def add_pipeline_stage_time(pipeline_state, stage, start_time):
 
-        '''
-        First iterate over the test_context_sent_list to get individual test 
-        context sentences.
-        '''
-        
-        for test_context_sent in test_context_sent_list:
-            
-            '''
-            Extract the feature vector for each context sentence.
-            Here two types of feature vectors are extracted for each sentence.
-            
-            1) Collocational feature vector : This vector will have two types 
-            of features:
+    stage_stats = pipeline_state['stats'][stage]
 
-                a) First feature will be the lemmas of the words occurring 
-                within the window size (which will have same value as N1 for 
-                training value) on both side of ambiguous word.
+    pipeline_state['lock'].acquire()
+    stage_stats['instance_count'] = stage_stats['instance_count'] + 1
+    stage_stats['busy_seconds'] = stage_stats['busy_seconds'] + \
+                                  time.time() - start_time
+    pipeline_state['lock'].release()
 
-                b) Second feature will be POS-tags for the words occurring 
-                within the window size (which will have same value as N1 for 
-                training value) on both side of ambiguous word.
+###############################################################################
+# End of add_pipeline_stage_time function
+###############################################################################
 
-            '''
+###############################################################################
+# Function      : finish_pipeline_worker(pipeline_state, stage, next_stage,
+#                                        next_worker_count)
+# Description   : This function is called when a worker of a stage has no
+#                 more instances. The last worker of the stage to finish
+#                 tells every worker of the next stage to finish, by putting
+#                 one None into its queue for each of them.
+# Arguments     : pipeline_state - state of the pipeline
+#                 stage - name of the stage of the worker
+#                 next_stage - name of the next stage
+#                 next_worker_count - number of workers of the next stage
+# Returns       : None.
+###############################################################################
 
-            '''
-            Call get_coll_feature_vector() function to get collocational 
-            feature vector. This function takes context sentence window_size 
-            and a MontyLingua object as the inputs and 
-            returns the two collocational feature vectors for that 
-            sentence.
+def finish_pipeline_worker(pipeline_state, stage, next_stage, \
+                           next_worker_count):
 
-            e.g. If a context sentence in the test data is 
+    pipeline_state['lock'].acquire()
+    pipeline_state['running_counts'][stage] = \
+                                pipeline_state['running_counts'][stage] - 1
+    last_worker_flag = pipeline_state['running_counts'][stage] == 0
+    pipeline_state['lock'].release()
 
-            when we arrived in st. paul , the local office of the american 
-            automobile association had a hard time directing us to bethel 
-            college .  
+    if last_worker_flag:
+        for i in range(0, next_worker_count):
+            pipeline_state['queues'][next_stage].put(None)
 
-            , where hard is the target word, and if window size is 9 then
+###############################################################################
+# End of finish_pipeline_worker function
+###############################################################################
 
-            first collocation feature vector will be the list containing lemmas
-            of 9 words present on right and left side of word 'hard'.
-            
-            
-            ['local', 'office', 'of', 'the', 'american', 'automobile', 
-            'association', 'have', 'a', 'time', 'direct', 'us', 'to', 'bethel',
-            'college', '.', 'dummyLemma', 'dummyLemma']
-            
-            second collocation feature vector will be the list containing 
-            pos-tags of 9 words present on right and left side of word 'hard'.
+###############################################################################
+# Function      : set_pipeline_error(pipeline_state)
+# Description   : This function keeps the error being handled as the error 
+#                 which stopped the pipeline, unless an earlier error is 
+#                 already kept. It is called from an except clause.
+# Arguments     : pipeline_state - state of the pipeline
+# Returns       : None.
+###############################################################################
 
-                    
-            ['JJ', 'NN', 'IN', 'DT', 'JJ', 'NN', 'NN', 'VBD', 'DT', 'NN', 'VBG'
-            , 'PRP', 'TO', 'NN', 'NN', '.', 'DUMMY', 'DUMMY']
+def set_pipeline_error(pipeline_state):
 
-            '''
+    pipeline_state['lock'].acquire()
+    if pipeline_state['error_info'] is None:
+        pipeline_state['error_info'] = sys.exc_info()
+    pipeline_state['lock'].release()
+
+###############################################################################
+# End of set_pipeline_error function
+###############################################################################
+
+###############################################################################
+# Function      : run_pipeline_parse_stage(pipeline_state, wsd_data_lines,
+#                                          tag_worker_count)
+# Description   : This function is the parse stage of the pipeline. It 
+#                 reads the instances from lines of test data and numbers 
+#                 them in their order. If the test data can not be read, 
+#                 the instances read so far still go through the pipeline
+#                 and the error is kept for run_WSD_pipeline to raise.
+# Arguments     : pipeline_state - state of the pipeline
+#                 wsd_data_lines - any iterable giving lines of test data
+#                 tag_worker_count - number of tagging workers
+# Returns       : None.
+###############################################################################
+
+def run_pipeline_parse_stage(pipeline_state, wsd_data_lines, \
+                             tag_worker_count):
+
+    tag_queue = pipeline_state['queues']['tag']
+    instance_counter = 0
+    start_time = time.time()
+
+    try:
+        for ambiguous_word, instance_id, sense_id, context_sent in \
+                                        iter_WSD_instances(wsd_data_lines):
+
+            add_pipeline_stage_time(pipeline_state, 'parse', start_time)
+            tag_queue.put([instance_counter, ambiguous_word, instance_id, \
+                           context_sent])
+            instance_counter = instance_counter + 1
+            start_time = time.time()
+    except Exception:
+        set_pipeline_error(pipeline_state)
+    finally:
+        for i in range(0, tag_worker_count):
+            tag_queue.put(None)
+
+###############################################################################
+# End of run_pipeline_parse_stage function
+###############################################################################
+
+###############################################################################
+# Function      : run_pipeline_tag_stage(pipeline_state, score_worker_count)
+# Description   : This function is a worker of the tag stage of the 
+#                 pipeline. It lemmatizes and POS-tags the context of each
+#                 instance, in the tagging pool of the pipeline if it has 
+#                 one. An instance which can not be tagged goes on with an
+#                 error message instead of the tokens.
+# Arguments     : pipeline_state - state of the pipeline
+#                 score_worker_count - number of scoring threads
+# Returns       : None.
+###############################################################################
+
+def run_pipeline_tag_stage(pipeline_state, score_worker_count):
+
+    tag_queue = pipeline_state['queues']['tag']
+    score_queue = pipeline_state['queues']['score']
+    tag_pool = pipeline_state['tag_pool']
+
+    try:
+        while True:
+
+            instance_item = tag_queue.get()
+            if instance_item is None:
+                break
+
+            start_time = time.time()
+            context_sent = instance_item.pop()
+
+            try:
+                if tag_pool is not None:
+                    instance_item.append(tag_pool.apply(\
+                                tag_pipeline_context, (context_sent,)))
+                else:
+                    instance_item.append(tag_pipeline_context(context_sent))
+            except Exception, error:
+                instance_item.append("tagging failed: " + str(error))
+
+            add_pipeline_stage_time(pipeline_state, 'tag', start_time)
+            score_queue.put(instance_item)
+    finally:
+        finish_pipeline_worker(pipeline_state, 'tag', 'score', \
+                               score_worker_count)
+
+###############################################################################
+# End of run_pipeline_tag_stage function
+###############################################################################
+
+###############################################################################
+# Function      : tag_pipeline_context(context_sent)
+# Description   : This function lemmatizes and POS-tags the context of an
+#                 instance for the tag stage of the pipeline, with the 
+#                 tagger of the process it runs in.
+# Arguments     : context_sent - the sentence containing an instance of 
+#                                ambiguous word
+# Returns       : 1) The (left tokens, right tokens) pair (see 
+#                    get_context_tokens), or an error message if the 
+#                    context can not be tagged
+###############################################################################
+
+def tag_pipeline_context(context_sent):
+
+    try:
+        return get_context_tokens(context_sent, get_tagger())
+    except Exception, error:
+        return "tagging failed: " + str(error)
+
+###############################################################################
+# End of tag_pipeline_context function
+###############################################################################
+
+###############################################################################
+# Function      : run_pipeline_score_stage(pipeline_state, model_lookup)
+# Description   : This function is a worker of the score stage of the 
+#                 pipeline. It finds the most probable sense of each 
+#                 instance with the model of its lexelt item, and gives the
+#                 output line of the instance to the writer. An instance 
+#                 whose model can not be found or which can not be scored
+#                 goes on with an error message instead of the line.
+# Arguments     : pipeline_state - state of the pipeline
+#                 model_lookup - function giving the model for a lexelt item
+#                                (or None if there is no model for it)
+# Returns       : None.
+###############################################################################
+
+def run_pipeline_score_stage(pipeline_state, model_lookup):
+
+    score_queue = pipeline_state['queues']['score']
+    write_queue = pipeline_state['queues']['write']
+
+    try:
+        while True:
+
+            instance_item = score_queue.get()
+            if instance_item is None:
+                break
+
+            start_time = time.time()
+            instance_counter, ambiguous_word, instance_id, context_tokens = \
+                                                                instance_item
 
-            lemma_list, pos_tags_list = \
-            get_coll_feature_vector(test_context_sent, window_size, query_obj)
-            
             '''
-            Get the likelihood Probabilities for each word sense for a given 
-            instance of ambiguous word. 
-            
-            To get likelihood prob for collocational features, call 
-            get_coll_feature_prob() function. 
-            This function takes following inputs:
-            
-            1) List lemmas of context words retrieved above
-            2) List of POS-tags of context words retrieved above
-            3) Dict object mapping each sense to the list of context words
-               (for all context sentences in training data), retrieved above
-            4) Dict object mapping each sense to the list of POS-tags of 
-               context words  (for all context sentences in training data),  
-               retrieved above
-            5) List of valid senses
-
-            And it returns a dict object which maps each sense to its
-            likelihood Probabilities
+            The writer gets either the output line or a message saying why
+            the instance was skipped.
             '''
+            op_line = None
 
-            sense_to_lkhd_mapping_dict =\
-                            get_coll_feature_prob(lemma_list, pos_tags_list, \
-                                  sense_context_words_mapping_dict,\
-                                  sense_pos_tags_mapping_dict, sense_list)
-        
+            if isinstance(context_tokens, str):
+                error_message = context_tokens
+            else:
+                try:
+                    model = model_lookup(ambiguous_word)
+
+                    if model is None:
+                        error_message = "No model for " + ambiguous_word
+                    else:
+                        left_list, right_list = context_tokens
+                        lemma_list, pos_tags_list = \
+                            get_window_lemmas_and_tags(left_list, \
+                                        right_list, model['window_size'])
+                        op_line = ambiguous_word + " " + instance_id + \
+                                  " " + get_max_prob_sense(lemma_list, \
+                                  pos_tags_list, model) + "\n"
+                        error_message = None
+                except Exception, error:
+                    error_message = "scoring failed: " + str(error)
+
+            add_pipeline_stage_time(pipeline_state, 'score', start_time)
+            write_queue.put((instance_counter, instance_id, op_line, \
+                             error_message))
+    finally:
+        finish_pipeline_worker(pipeline_state, 'score', 'write', 1)
+
+###############################################################################
+# End of run_pipeline_score_stage function
+###############################################################################
+
+###############################################################################
+# Function      : run_pipeline_write_stage(pipeline_state, op_file_handle)
+# Description   : This function is the write stage of the pipeline. The 
+#                 instances come from scoring workers out of order, so they
+#                 are held until all earlier instances are written. If the
+#                 output can not be written, the error is kept for 
+#                 run_WSD_pipeline to raise and the remaining instances are
+#                 only taken off the queue, so that no stage is left 
+#                 waiting on a full queue.
+# Arguments     : pipeline_state - state of the pipeline
+#                 op_file_handle - handle of output file
+# Returns       : None.
+###############################################################################
+
+def run_pipeline_write_stage(pipeline_state, op_file_handle):
+
+    write_queue = pipeline_state['queues']['write']
+    pending_dict = {}
+    next_instance_counter = 0
+    write_failed_flag = False
+
+    while True:
+
+        write_item = write_queue.get()
+        if write_item is None:
+            break
+
+        if write_failed_flag:
+            continue
+
+        start_time = time.time()
+        pending_dict[write_item[0]] = write_item
+
+        try:
+            while next_instance_counter in pending_dict:
+                instance_counter, instance_id, op_line, error_message = \
+                                    pending_dict.pop(next_instance_counter)
+                if op_line is not None:
+                    op_file_handle.write(op_line)
+                else:
+                    sys.stderr.write(error_message + ", skipping instance " \
+                                     + instance_id + "\n")
+                next_instance_counter = next_instance_counter + 1
+
+            op_file_handle.flush()
+        except Exception:
+            set_pipeline_error(pipeline_state)
+            write_failed_flag = True
+
+        add_pipeline_stage_time(pipeline_state, 'write', start_time)
+
+###############################################################################
+# End of run_pipeline_write_stage function
+###############################################################################
+
+###############################################################################
+# Function      : run_pipeline_monitor(pipeline_state)
+# Description   : This function samples the depth of every pipeline queue 
+#                 every PIPELINE_SAMPLE_SECONDS until the pipeline is done.
+# Arguments     : pipeline_state - state of the pipeline
+# Returns       : None.
+###############################################################################
+
+def run_pipeline_monitor(pipeline_state):
+
+    while not pipeline_state['done_event'].is_set():
+
+        pipeline_state['lock'].acquire()
+        for stage in PIPELINE_STAGES[1:]:
+            queue_depth = pipeline_state['queues'][stage].qsize()
+            stage_stats = pipeline_state['stats'][stage]
+            stage_stats['max_queue_depth'] = \
+                        max(stage_stats['max_queue_depth'], queue_depth)
+            stage_stats['queue_depth_total'] = \
+                        stage_stats['queue_depth_total'] + queue_depth
+            stage_stats['queue_depth_samples'] = \
+                        stage_stats['queue_depth_samples'] + 1
+        pipeline_state['lock'].release()
+
+        pipeline_state['done_event'].wait(PIPELINE_SAMPLE_SECONDS)
+
+###############################################################################
+# End of run_pipeline_monitor function
+###############################################################################
+
+###############################################################################
+# Function      : train_command(args)
+# Description   : This function runs the train sub command. It trains and 
+#                 optionally prunes a model and saves it in plain and/or
+#                 compact format.
+# Arguments     : args - parsed command line arguments
+# Returns       : None.
+###############################################################################
+
+def train_command(args):
+
+    sketch_shape = get_sketch_shape(args)
+
+    model_dict = train_WSD_models(args.train_file_name, args.window_size, \
+                                  args.process_count, args.max_per_sense, \
+                                  args.sample_seed, sketch_shape, \
+                                  args.knn_k, args.knn_lexelt_list, \
+                                  args.decision_lexelt_list)
+
+    if sketch_shape is not None:
+        print_sketch_error_bounds(model_dict)
+
+    for lexelt in model_dict.keys():
+
+        model = model_dict[lexelt]
+
+        if sketch_shape is not None:
+            continue
+
+        print lexelt, "model size :", \
+              get_model_size(model['sense_position_counts_dict'])
+
+        if args.min_count is not None or args.top_k is not None or \
+           args.mi_threshold is not None:
+            model = prune_WSD_model(model, args.min_count, args.top_k, \
+                                    args.mi_threshold)
+            print lexelt, "model size after pruning :", \
+                  get_model_size(model['sense_position_counts_dict'])
+            model_dict[lexelt] = model
+
+    if args.model_file_name is not None:
+        save_WSD_model_dict(model_dict, args.model_file_name, \
+                            save_WSD_model, '.model')
+
+    if args.compact_model_file_name is not None:
+        save_WSD_model_dict(model_dict, args.compact_model_file_name, \
+                            save_compact_model, '.wsdq')
+
+###############################################################################
+# End of train_command function
+###############################################################################
+
+###############################################################################
+# Function      : predict_command(args)
+# Description   : This function runs the predict sub command. It tags the
+#                 instances of test file (or of standard input) with a saved
+#                 model, the models of a model directory or a model trained
+#                 on the fly.
+# Arguments     : args - parsed command line arguments
+# Returns       : None.
+###############################################################################
+
+def predict_command(args):
+
+    registry = None
+
+    if args.model_dir is not None:
+        registry = create_model_registry(args.model_dir, args.memory_cap)
+        model_lookup = lambda lexelt: get_registry_model(registry, lexelt)
+    else:
+        if args.model_file_name is not None and \
+           args.watch_seconds is not None:
             '''
-            Multiply the prior and likelihood prob for each sense to get final
-            Probabilities. Select sense with the maximum final prob as the sense
-            for ambiguous word.
+            Serve the model file from a registry, so that it can be 
+            watched. The model tags instances of any lexelt item.
             '''
+            registry = create_model_registry(None, None)
+            model_lexelt = load_WSD_model(args.model_file_name)\
+                                                    ['ambiguous_word']
+            add_registry_model_file(registry, model_lexelt, \
+                                    args.model_file_name)
+            model_lookup = lambda lexelt: get_registry_model(registry, \
+                                                             model_lexelt)
+        elif args.model_file_name is not None:
+            model = load_WSD_model(args.model_file_name)
+            model_lookup = lambda lexelt: model
+        else:
+            model_dict = train_WSD_models(args.train_file_name, \
+                                          args.window_size, \
+                                          args.process_count, \
+                                          args.max_per_sense, \
+                                          args.sample_seed, \
+                                          get_sketch_shape(args), \
+                                          args.knn_k, args.knn_lexelt_list, \
+                                          args.decision_lexelt_list)
+            if len(model_dict) == 1:
+                model = model_dict.values()[0]
+                model_lookup = lambda lexelt: model
+            else:
+                model_lookup = model_dict.get
 
+    '''
+    Read standard input line by line (and not with the read ahead of file 
+    iteration) so that every instance is tagged as soon as it arrives.
+    '''
+    if args.test_file_name == '-':
+        wsd_data_lines = iter(sys.stdin.readline, '')
+    else:
+        wsd_data_lines = open_corpus_file(args.test_file_name)
 
-            # initialize a dict object to store final Probabilities
-            final_prob_dict = collections.OrderedDict()
-            final_prob_list = []
-            
-            for sense in sense_list:
-                final_prob =  math.log10(sense_to_prior_mapping_dict[sense]) +\
-                              math.log10(sense_to_lkhd_mapping_dict[sense])
-                
-                final_prob_dict[sense] = pow(10,final_prob)
-                final_prob_list.append(pow(10,final_prob))
+    if args.op_file_name == '-':
+        op_file_handle = sys.stdout
+    else:
+        op_file_handle = open(args.op_file_name, 'w')
 
+    if args.deadline_ms is not None:
+        deadline_seconds = args.deadline_ms / 1000.0
+    else:
+        deadline_seconds = None
 
-            max_prob_sense = final_prob_dict.keys()\
-                             [final_prob_list.index(max(final_prob_list))]
-    
-        
-            # write the max prob sense as the final sense into op file
-            op_file_handle.write(test_ambiguous_word + " " +  \
-                                 test_instance_id_list[instance_counter] +\
-                                  " " + max_prob_sense + "\n")
-            
-            instance_counter = instance_counter + 1
-            
+    '''
+    With --watch, reload the models whose files change while predicting.
+    '''
+    if registry is not None and args.watch_seconds is not None:
+        watch_registry_models(registry, args.watch_seconds)
+
+    degradation_stats = None
+
+    if args.tag_worker_count is not None or \
+       args.score_worker_count is not None:
+        pipeline_stats = run_WSD_pipeline(wsd_data_lines, model_lookup, \
+                                op_file_handle, args.tag_worker_count or 1, \
+                                args.score_worker_count or 1, \
+                                args.queue_size)
+
+        '''
+        Report the stats of pipeline stages on standard error.
+        '''
+        sys.stderr.write("Stage  Instances  Busy (s)  Max queue  " \
+                         "Mean queue\n")
+        for stage in PIPELINE_STAGES:
+            stage_stats = pipeline_stats[stage]
+            sys.stderr.write("%-6s %9d %9.3f %10d %11.2f\n" % (stage, \
+                             stage_stats['instance_count'], \
+                             stage_stats['busy_seconds'], \
+                             stage_stats['max_queue_depth'], \
+                             stage_stats['mean_queue_depth']))
+    else:
+        degradation_stats = predict_WSD_stream(wsd_data_lines, \
+                                model_lookup, op_file_handle, \
+                                deadline_seconds)
+
+    '''
+    Report how many instances were classified by each path, on standard 
+    error so that the standard output only has the tagged instances.
+    '''
+    if degradation_stats is not None:
+        for path in CLASSIFICATION_PATHS:
+            sys.stderr.write("Path " + path + " : " + \
+                    str(degradation_stats['path_counts'][path]) + "\n")
+        sys.stderr.write("Deadline misses : " + \
+                    str(degradation_stats['deadline_miss_count']) + "\n")
+
+    if registry is not None and args.watch_seconds is not None:
+        stop_watching_registry(registry)
+        registry_stats = get_registry_stats(registry)
+        sys.stderr.write("Model reloads : " + \
+                         str(registry_stats['reload_count']) + "\n")
+        if registry_stats['reload_count'] > 0:
+            sys.stderr.write("Last reload (s) : " + \
+                    str(registry_stats['last_reload_seconds']) + "\n")
+            sys.stderr.write("Max reload (s) : " + \
+                    str(registry_stats['max_reload_seconds']) + "\n")
+        for lexelt in sorted(registry_stats['model_version_dict'].keys()):
+            sys.stderr.write("Model version " + lexelt + " : " + \
+                str(registry_stats['model_version_dict'][lexelt]) + "\n")
+
+    if args.op_file_name != '-':
         op_file_handle.close()
 
+    if args.test_file_name != '-':
+        wsd_data_lines.close()
+
+###############################################################################
+# End of predict_command function
+###############################################################################
+
+###############################################################################
+# Function      : evaluate_command(args)
+# Description   : This function runs the evaluate sub command. It evaluates
+#                 a tagged output file against the gold std. file, or with
+#                 --compare tests the accuracy differences of several 
+#                 tagged output files with a paired bootstrap.
+# Arguments     : args - parsed command line arguments
+# Returns       : None.
+###############################################################################
+
+def evaluate_command(args):
+
+    if args.compare_file_name_list is not None:
+        compare_taggings([args.op_file_name] + args.compare_file_name_list, \
+                         args.gold_std_file_name, args.resample_count, \
+                         args.confidence, args.resample_seed)
+        return
+
+    evaluate_tagging(args.op_file_name, args.gold_std_file_name)
+
+###############################################################################
+# End of evaluate_command function
+###############################################################################
+
+###############################################################################
+# Function      : get_argument_parser()
+# Description   : This function creates the command line parser for the 
+#                 train, predict and evaluate sub commands.
+# Arguments     : None.
+# Returns       : 1) An argparse.ArgumentParser object
+###############################################################################
+
+def get_argument_parser():
+
+    parser = argparse.ArgumentParser(prog="WSD_naive_bayes.py", \
+                description="Word Sense Disambiguation using naive Bayes")
+    subparsers = parser.add_subparsers()
+
+    # train sub command
+    train_parser = subparsers.add_parser('train', \
+                        help="train a model and save it")
+    train_parser.add_argument('--train', dest='train_file_name', \
+                              required=True, help="training file")
+    train_parser.add_argument('--model', dest='model_file_name', \
+                              help="file to save the model into")
+    train_parser.add_argument('--compact-model', \
+                              dest='compact_model_file_name', \
+                              help="file to save the compact model into")
+    train_parser.add_argument('--window', dest='window_size', type=int, \
+                              default=2, help="window size (default 2)")
+    train_parser.add_argument('--min-count', dest='min_count', type=int, \
+                              help="prune lemmas seen less than this")
+    train_parser.add_argument('--top-k', dest='top_k', type=int, \
+                              help="keep only this many lemmas per sense " \
+                                   "and position")
+    train_parser.add_argument('--mi-threshold', dest='mi_threshold', \
+                              type=float, help="prune lemmas with less " \
+                                               "mutual information (bits)")
+    train_parser.add_argument('--tagger-snapshot', \
+                              dest='tagger_snapshot_file_name', \
+                              help="file to warm-start the tagger from")
+    train_parser.add_argument('--model-cache', dest='model_cache_dir', \
+                              help="directory to cache trained models in")
+    train_parser.add_argument('--lemma-cache', dest='lemma_cache_size', \
+                              type=int, help="number of (word, POS tag) " \
+                              "lemmas to memoise (default " + \
+                              str(LEMMA_CACHE_SIZE) + ", 0 for none)")
+    train_parser.add_argument('--lemma-table', \
+                              dest='lemma_table_file_name', \
+                              help="file to pre-warm the lemma memo from")
+    train_parser.add_argument('--feature-store', dest='feature_store_dir', \
+                              help="directory to keep extracted features in")
+    train_parser.add_argument('--processes', dest='process_count', \
+                              type=int, help="number of processes training " \
+                                             "the models of lexelt items")
+    train_parser.add_argument('--max-per-sense', dest='max_per_sense', \
+                              type=int, help="learn features from a random "\
+                                             "sample of at most this many " \
+                                             "instances of each sense")
+    train_parser.add_argument('--sample-seed', dest='sample_seed', \
+                              type=int, default=0, help="seed of the " \
+                              "sampling with --max-per-sense (default 0)")
+    train_parser.add_argument('--sketch-width', dest='sketch_width', \
+                              type=int, help="count features in count-min "\
+                                             "sketches of this width")
+    train_parser.add_argument('--sketch-depth', dest='sketch_depth', \
+                              type=int, default=SKETCH_DEPTH, \
+                              help="depth of count-min sketches " \
+                                   "(default " + str(SKETCH_DEPTH) + ")")
+    train_parser.add_argument('--knn', dest='knn_k', type=int, nargs='?', \
+                              const=KNN_NEIGHBOUR_COUNT, help="classify " \
+                              "with this many nearest neighbours instead " \
+                              "of naive Bayes (default " + \
+                              str(KNN_NEIGHBOUR_COUNT) + ")")
+    train_parser.add_argument('--knn-lexelts', dest='knn_lexelt_list', \
+                              nargs='+', help="lexelt items to use --knn " \
+                                              "for (default all)")
+    train_parser.add_argument('--decision-list', \
+                              dest='decision_lexelt_list', nargs='*', \
+                              help="classify these lexelt items (all if " \
+                                   "none given) with a decision list")
+    train_parser.set_defaults(command_function=train_command)
+
+    # predict sub command
+    predict_parser = subparsers.add_parser('predict', \
+                        help="tag test instances with senses")
+    model_group = predict_parser.add_mutually_exclusive_group(required=True)
+    model_group.add_argument('--model', dest='model_file_name', \
+                             help="saved model file")
+    model_group.add_argument('--model-dir', dest='model_dir', \
+                             help="directory of saved models, one per " \
+                                  "lexelt item")
+    model_group.add_argument('--train', dest='train_file_name', \
+                             help="training file to train the model from")
+    predict_parser.add_argument('--memory-cap', dest='memory_cap', \
+                                type=int, help="maximum bytes of models " \
+                                               "kept loaded from model dir")
+    predict_parser.add_argument('--window', dest='window_size', type=int, \
+                                default=2, help="window size used with " \
+                                                "--train (default 2)")
+    predict_parser.add_argument('--test', dest='test_file_name', \
+                                default='-', help="test file (default " \
+                                                  "standard input)")
+    predict_parser.add_argument('--output', dest='op_file_name', \
+                                default='-', help="output file (default " \
+                                                  "standard output)")
+    predict_parser.add_argument('--tagger-snapshot', \
+                                dest='tagger_snapshot_file_name', \
+                                help="file to warm-start the tagger from")
+    predict_parser.add_argument('--model-cache', dest='model_cache_dir', \
+                                help="directory to cache models trained " \
+                                     "with --train in")
+    predict_parser.add_argument('--lemma-cache', dest='lemma_cache_size', \
+                                type=int, help="number of (word, POS tag) "\
+                                "lemmas to memoise (default " + \
+                                str(LEMMA_CACHE_SIZE) + ", 0 for none)")
+    predict_parser.add_argument('--lemma-table', \
+                                dest='lemma_table_file_name', \
+                                help="file to pre-warm the lemma memo from")
+    predict_parser.add_argument('--feature-store', \
+                                dest='feature_store_dir', \
+                                help="directory to keep extracted features " \
+                                     "of training file in")
+    predict_parser.add_argument('--deadline-ms', dest='deadline_ms', \
+                                type=float, help="latency budget for each " \
+                                                 "instance in milliseconds")
+    predict_parser.add_argument('--watch', dest='watch_seconds', \
+                                type=float, help="check model files every " \
+                                "this many seconds and reload changed ones")
+    predict_parser.add_argument('--tag-workers', dest='tag_worker_count', \
+                                type=int, help="run as a pipeline with " \
+                                               "this many tagging processes")
+    predict_parser.add_argument('--score-workers', \
+                                dest='score_worker_count', type=int, \
+                                help="run as a pipeline with this many " \
+                                     "scoring threads")
+    predict_parser.add_argument('--queue-size', dest='queue_size', \
+                                type=int, default=64, help="size of queues " \
+                                "between pipeline stages (default 64)")
+    predict_parser.add_argument('--processes', dest='process_count', \
+                                type=int, help="number of processes " \
+                                               "training the models of " \
+                                               "lexelt items with --train")
+    predict_parser.add_argument('--max-per-sense', dest='max_per_sense', \
+                                type=int, help="learn features from a " \
+                                "random sample of at most this many " \
+                                "instances of each sense with --train")
+    predict_parser.add_argument('--sample-seed', dest='sample_seed', \
+                                type=int, default=0, help="seed of the " \
+                                "sampling with --max-per-sense (default 0)")
+    predict_parser.add_argument('--sketch-width', dest='sketch_width', \
+                                type=int, help="count features in " \
+                                "count-min sketches of this width with " \
+                                "--train")
+    predict_parser.add_argument('--sketch-depth', dest='sketch_depth', \
+                                type=int, default=SKETCH_DEPTH, \
+                                help="depth of count-min sketches " \
+                                     "(default " + str(SKETCH_DEPTH) + ")")
+    predict_parser.add_argument('--knn', dest='knn_k', type=int, \
+                                nargs='?', const=KNN_NEIGHBOUR_COUNT, \
+                                help="classify with this many nearest " \
+                                "neighbours with --train (default " + \
+                                str(KNN_NEIGHBOUR_COUNT) + ")")
+    predict_parser.add_argument('--knn-lexelts', dest='knn_lexelt_list', \
+                                nargs='+', help="lexelt items to use " \
+                                                "--knn for (default all)")
+    predict_parser.add_argument('--decision-list', \
+                                dest='decision_lexelt_list', nargs='*', \
+                                help="classify these lexelt items (all if "\
+                                     "none given) with a decision list " \
+                                     "with --train")
+    predict_parser.set_defaults(command_function=predict_command)
+
+    # evaluate sub command
+    evaluate_parser = subparsers.add_parser('evaluate', \
+                        help="evaluate a tagged file against gold std.")
+    evaluate_parser.add_argument('--output', dest='op_file_name', \
+                                 required=True, help="tagged output file")
+    evaluate_parser.add_argument('--key', dest='gold_std_file_name', \
+                                 required=True, help="gold std. file")
+    evaluate_parser.add_argument('--compare', \
+                                 dest='compare_file_name_list', nargs='+', \
+                                 help="tagged output files to compare with "\
+                                      "--output by a paired bootstrap")
+    evaluate_parser.add_argument('--resamples', dest='resample_count', \
+                                 type=int, default=BOOTSTRAP_RESAMPLE_COUNT, \
+                                 help="number of bootstrap resamples " \
+                                      "(default " + \
+                                      str(BOOTSTRAP_RESAMPLE_COUNT) + ")")
+    evaluate_parser.add_argument('--confidence', dest='confidence', \
+                                 type=float, default=BOOTSTRAP_CONFIDENCE, \
+                                 help="confidence level of intervals " \
+                                      "(default " + \
+                                      str(BOOTSTRAP_CONFIDENCE) + ")")
+    evaluate_parser.add_argument('--seed', dest='resample_seed', type=int, \
+                                 default=0, help="seed of the resampling " \
+                                                 "(default 0)")
+    evaluate_parser.set_defaults(command_function=evaluate_command)
+
+    return parser
+
+###############################################################################
+# End of get_argument_parser function
+###############################################################################
+
+###############################################################################
+# Function      : get_legacy_argument_parser()
+# Description   : This function creates the command line parser for the
+#                 original (-tr, -ts, -tk) and raw text (-rw) usages. The
+#                 options can be given in any order.
+# Arguments     : None.
+# Returns       : 1) An argparse.ArgumentParser object
+###############################################################################
+
+def get_legacy_argument_parser():
+
+    parser = argparse.ArgumentParser(prog="WSD_naive_bayes.py")
+
+    parser.add_argument('-tr', dest='train_file_name_list', nargs='+', \
+                        help="training file(s)")
+    parser.add_argument('-ts', dest='test_file_name', help="test file")
+    parser.add_argument('-tk', dest='gold_std_file_name', \
+                        help="gold std. file")
+    parser.add_argument('-rw', dest='raw_file_name_list', nargs='+', \
+                        help="raw text documents to tag")
+    parser.add_argument('-md', dest='model_dir', \
+                        help="directory of saved models for -rw")
+    parser.add_argument('-mc', dest='memory_cap', type=int, \
+                        help="maximum bytes of models kept loaded")
+    parser.add_argument('-ws', dest='window_size', type=int, default=2, \
+                        help="window size (default 2)")
+    parser.add_argument('-pmc', dest='min_count', type=int, \
+                        help="prune lemmas seen less than this")
+    parser.add_argument('-ptk', dest='top_k', type=int, \
+                        help="keep only this many lemmas per sense and " \
+                             "position")
+    parser.add_argument('-pmi', dest='mi_threshold', type=float, \
+                        help="prune lemmas with less mutual information")
+    parser.add_argument('-sm', dest='model_file_name', \
+                        help="file to save the model into")
+    parser.add_argument('-sq', dest='compact_model_file_name', \
+                        help="file to save the compact model into")
+    parser.add_argument('-tg', dest='tagger_snapshot_file_name', \
+                        help="file to warm-start the tagger from")
+    parser.add_argument('-mcd', dest='model_cache_dir', \
+                        help="directory to cache trained models in")
+    parser.add_argument('-lc', dest='lemma_cache_size', type=int, \
+                        help="number of (word, POS tag) lemmas to memoise " \
+                             "(default " + str(LEMMA_CACHE_SIZE) + \
+                             ", 0 for none)")
+    parser.add_argument('-lt', dest='lemma_table_file_name', \
+                        help="file to pre-warm the lemma memo from")
+    parser.add_argument('-fs', dest='feature_store_dir', \
+                        help="directory to keep extracted features in")
+    parser.add_argument('-cp', dest='checkpoint_dir', \
+                        help="directory to checkpoint the test run into")
+    parser.add_argument('-ci', dest='checkpoint_interval', type=int, \
+                        default=100, help="number of test instances " \
+                                          "between checkpoints (default 100)")
+    parser.add_argument('-np', dest='process_count', type=int, \
+                        help="number of processes training the models of " \
+                             "lexelt items (default number of CPUs)")
+    parser.add_argument('-ms', dest='max_per_sense', type=int, \
+                        help="learn features from a random sample of at " \
+                             "most this many instances of each sense")
+    parser.add_argument('-ss', dest='sample_seed', type=int, default=0, \
+                        help="seed of the sampling with -ms (default 0)")
+    parser.add_argument('-cw', dest='sketch_width', type=int, \
+                        help="count features in count-min sketches of " \
+                             "this width")
+    parser.add_argument('-cd', dest='sketch_depth', type=int, \
+                        default=SKETCH_DEPTH, help="depth of count-min " \
+                        "sketches (default " + str(SKETCH_DEPTH) + ")")
+    parser.add_argument('-kn', dest='knn_k', type=int, nargs='?', \
+                        const=KNN_NEIGHBOUR_COUNT, help="classify with " \
+                        "this many nearest neighbours instead of naive " \
+                        "Bayes (default " + str(KNN_NEIGHBOUR_COUNT) + ")")
+    parser.add_argument('-kl', dest='knn_lexelt_list', nargs='+', \
+                        help="lexelt items to use -kn for (default all)")
+    parser.add_argument('-dl', dest='decision_lexelt_list', nargs='*', \
+                        help="classify these lexelt items (all if none " \
+                             "given) with a decision list")
+
+    return parser
+
+###############################################################################
+# End of get_legacy_argument_parser function
+###############################################################################
+
+###############################################################################
+# Function      : check_model_arguments(parser, args)
+# Description   : This function stops the program with an error if count-min
+#                 sketches are asked for together with options which need 
+#                 the exact counts (pruning and compact models), the 
+#                 k-NN classifier together with compact models, which can
+#                 not hold its index, or decision lists together with 
+#                 options changing the counts they are compiled from or 
+#                 classifying in another way. A negative size of the lemma
+#                 memo, bad bootstrap settings and a deadline together with
+#                 the prediction pipeline, which has no deadline, are also
+#                 errors.
+# Arguments     : parser - the argparse.ArgumentParser which parsed args
+#                 args - parsed command line arguments
+# Returns       : None.
+###############################################################################
+
+def check_model_arguments(parser, args):
+
+    if getattr(args, 'knn_k', None) is not None:
+        if args.knn_k < 1:
+            parser.error("number of neighbours must be at least 1")
+        if getattr(args, 'compact_model_file_name', None) is not None:
+            parser.error("k-NN models can not be saved as compact models")
+
+    if getattr(args, 'decision_lexelt_list', None) is not None:
+        for option_name in ['sketch_width', 'knn_k', 'min_count', 'top_k', \
+                            'mi_threshold', 'compact_model_file_name']:
+            if getattr(args, option_name, None) is not None:
+                parser.error("decision lists can not be combined with " \
+                             "sketches, k-NN, pruning or compact models")
+
+    if getattr(args, 'lemma_cache_size', None) is not None and \
+       args.lemma_cache_size < 0:
+        parser.error("lemma cache size can not be negative")
+
+    if getattr(args, 'deadline_ms', None) is not None and \
+       (args.tag_worker_count is not None or \
+        args.score_worker_count is not None):
+        parser.error("--deadline-ms can not be combined with " \
+                     "--tag-workers or --score-workers")
+
+    if getattr(args, 'compare_file_name_list', None) is not None:
+        if args.resample_count < 1:
+            parser.error("number of resamples must be at least 1")
+        if not 0 < args.confidence < 1:
+            parser.error("confidence must be between 0 and 1")
+
+    if getattr(args, 'sketch_width', None) is None:
+        return
+
+    if args.sketch_width < 1 or args.sketch_depth < 1:
+        parser.error("sketch width and depth must be at least 1")
+
+    for option_name in ['min_count', 'top_k', 'mi_threshold', \
+                        'compact_model_file_name']:
+        if getattr(args, option_name, None) is not None:
+            parser.error("count-min sketches can not be pruned or saved " \
+                         "as compact models")
+
+###############################################################################
+# End of check_model_arguments function
+###############################################################################
+
+###############################################################################
+# Function      : set_lemma_cache(args)
+# Description   : This function sets the size of lemma_cache and the lemma
+#                 table asked for on the command line, and pre-warms the 
+#                 memo from the table if the table file exists.
+# Arguments     : args - parsed command line arguments
+# Returns       : None.
+###############################################################################
+
+def set_lemma_cache(args):
+
+    global lemma_table_file_name
+
+    if getattr(args, 'lemma_cache_size', None) is not None:
+        lemma_cache['max_size'] = args.lemma_cache_size
+
+    lemma_table_file_name = getattr(args, 'lemma_table_file_name', None)
+
+    if lemma_table_file_name is not None and \
+       os.path.isfile(lemma_table_file_name):
+        load_lemma_table(lemma_table_file_name)
+
+###############################################################################
+# End of set_lemma_cache function
+###############################################################################
+
+###############################################################################
+# Function      : close_lemma_cache(args)
+# Description   : This function writes the lemma table asked for on the 
+#                 command line from lemma_cache if the table file does not
+#                 exist yet (like the tagger snapshot), and prints the stats
+#                 of the memo if it was asked for with any lemma option.
+# Arguments     : args - parsed command line arguments
+# Returns       : None.
+###############################################################################
+
+def close_lemma_cache(args):
+
+    if lemma_table_file_name is not None and \
+       not os.path.isfile(lemma_table_file_name):
+        save_lemma_table(lemma_table_file_name)
+
+    if getattr(args, 'lemma_cache_size', None) is not None or \
+       lemma_table_file_name is not None:
+        print_lemma_cache_stats()
+
+###############################################################################
+# End of close_lemma_cache function
+###############################################################################
+
+###############################################################################
+# Function      : main()
+# Description   : Entry point for the project.
+# Arguments     : None. Command Line Arguments in Python are retrieved from
+#                 sys.argv variable of sys module.
+# Returns       : None.
+###############################################################################
+def main():
+
+    global tagger_snapshot_file_name
+    global feature_store_dir
+    global model_cache_dir
+    
+    '''
+    Check if any command line argument is passed to program. If not 
+    throw error showing proper sample usage. 
+    '''
+
+    if (len(sys.argv) > 1):
+        if debug:
+            print "At least one parameter passed to program !"
 
         '''
-        Now that we have our final o/p file "op_file", compare it against
-        the gold std file to assess overall accuracy of classifier.
-        For this call evaluate_tagging function. 
-        It takes following parameters:
-        1) Name of the output file
-        2) Name of gold std key file
-
-        This function calculates overall accuracy of the classifier and also
-        outputs the confusion matrix, which shows the percentage of times
-        a word sense is wrongly tagged with other word sense.
+        Run the train, predict or evaluate sub command if one is given.
+        Otherwise parse the original style options.
         '''
+        if sys.argv[1] in SUB_COMMANDS or sys.argv[1] in ('-h', '--help'):
+            parser = get_argument_parser()
+            args = parser.parse_args()
+            check_model_arguments(parser, args)
+            tagger_snapshot_file_name = getattr(args, \
+                                        'tagger_snapshot_file_name', None)
+            feature_store_dir = getattr(args, 'feature_store_dir', None)
+            model_cache_dir = getattr(args, 'model_cache_dir', None)
+            set_lemma_cache(args)
+            args.command_function(args)
+            close_lemma_cache(args)
+            return
+
+        parser = get_legacy_argument_parser()
+        args = parser.parse_args()
+        check_model_arguments(parser, args)
+        tagger_snapshot_file_name = args.tagger_snapshot_file_name
+        feature_store_dir = args.feature_store_dir
+        model_cache_dir = args.model_cache_dir
+        set_lemma_cache(args)
+
+        if args.raw_file_name_list is not None:
+            if args.train_file_name_list is None and args.model_dir is None:
+                parser.error("-rw needs -tr or -md")
+            run_raw_tagging(args)
+
+        elif args.train_file_name_list is not None and \
+             args.test_file_name is not None:
+            run_WSD(args)
+
+        else:
+            parser.error("-tr and -ts (or -rw) are needed")
 
-        evaluate_tagging("op_file",  gold_std_file_name)
+        close_lemma_cache(args)
 
     else:
         if debug:
@@ -1356,6 +7197,16 @@ def main():
         print "\n\tPlease provide proper inputs to the program !"
         print "\tSample usage: "
         print "\tpython WSD_naive_bayes.py -tr hat.xml -ts ha.xml -tk ha.key\n"
+        print "\tpython WSD_naive_bayes.py -rw doc1.txt doc2.txt " + \
+              "-tr hat.xml line.xml\n"
+        print "\tpython WSD_naive_bayes.py -rw doc1.txt doc2.txt " + \
+              "-md models -mc 1000000\n"
+        print "\tpython WSD_naive_bayes.py train --train hat.xml " + \
+              "--model hat.model\n"
+        print "\tcat ha.xml | python WSD_naive_bayes.py predict " + \
+              "--model hat.model\n"
+        print "\tpython WSD_naive_bayes.py evaluate --output op_file " + \
+              "--key ha.key\n"
 ###############################################################################
 # End of main function
 ###############################################################################